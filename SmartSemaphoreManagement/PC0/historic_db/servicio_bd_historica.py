@@ -4,6 +4,14 @@ from pathlib import Path
 
 import zmq
 
+from common.mensajes.codec import (
+    TIPO_COMANDO_SEMAFORO,
+    TIPO_EVENTO_SENSOR,
+    TIPO_SNAPSHOT_OPERATIVO,
+    TIPO_TRAMA_SENSORES,
+    decodificar_mensaje,
+)
+from common.mensajes.estado_operativo import AcumuladorSnapshotsDelta
 from common.utilidades.configuracion import cargar_configuracion
 from common.utilidades.logs import log
 from common.utilidades.persistencia_sqlite import RepositorioSQLite
@@ -18,18 +26,26 @@ def main() -> None:
     contexto = zmq.Context()
     receptor = contexto.socket(zmq.PULL)
     receptor.bind(config["zmq"]["pc0"]["ingesta_historica"])
+    acumulador_snapshots = AcumuladorSnapshotsDelta()
 
     log("PC0-BD", "Servicio de base historica iniciado.")
     while True:
-        mensaje = receptor.recv_json()
-        tipo = mensaje["tipo"]
-        datos = mensaje["datos"]
-        if tipo == "evento_sensor":
-            repositorio.guardar_evento_sensor(datos)
-        elif tipo == "comando_semaforo":
-            repositorio.guardar_comando_semaforo(datos)
-        elif tipo == "snapshot_operativo":
-            repositorio.guardar_snapshot_vehiculos_historico(datos)
+        tipo, mensaje = decodificar_mensaje(receptor.recv())
+        if tipo == TIPO_EVENTO_SENSOR:
+            repositorio.guardar_evento_sensor(mensaje.a_dict())
+        elif tipo == TIPO_TRAMA_SENSORES:
+            repositorio.guardar_eventos_sensores([evento.a_dict() for evento in mensaje.eventos])
+        elif tipo == TIPO_COMANDO_SEMAFORO:
+            repositorio.guardar_comando_semaforo(mensaje.a_dict())
+        elif tipo == TIPO_SNAPSHOT_OPERATIVO:
+            snapshot = acumulador_snapshots.aplicar(mensaje)
+            if snapshot is None:
+                log(
+                    "PC0-BD",
+                    f"Delta del tick {mensaje.tick_actual} descartado por hueco; se espera el siguiente keyframe.",
+                )
+                continue
+            repositorio.guardar_snapshot_vehiculos_historico(snapshot.a_dict())
         log("PC0-BD", f"Persistido mensaje historico de tipo {tipo}.")
 
 
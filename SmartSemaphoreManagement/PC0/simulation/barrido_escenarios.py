@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from PC0.simulation.corrida_acelerada import calcular_ticks_jornada, ejecutar_corrida
+from common.utilidades.configuracion import cargar_configuracion, quitar_comentarios
+from common.utilidades.logs import log
+
+INDICADORES = ("vehiculos_salidos", "cola_promedio_por_via", "ticks_promedio_en_ciudad")
+VERSION_CACHE = 2
+DIRECTORIOS_CODIGO = ("common", "PC0/simulation", "PC1/sensors", "PC2/analytics", "PC2/traffic_ctrl")
+
+
+@dataclass(slots=True, frozen=True)
+class Escenario:
+    semilla: int
+    filas: int
+    columnas: int
+    pesos: tuple[float, float, float]
+    temporizacion: tuple[float, float, float]
+
+    @property
+    def grupo(self) -> tuple[int, int, tuple[float, float, float], tuple[float, float, float]]:
+        return self.filas, self.columnas, self.pesos, self.temporizacion
+
+
+def parsear_cuadricula(texto: str) -> tuple[int, int]:
+    filas, _, columnas = texto.lower().partition("x")
+    return int(filas), int(columnas or filas)
+
+
+def parsear_terna(texto: str) -> tuple[float, float, float]:
+    valores = tuple(float(valor) for valor in texto.split(","))
+    if len(valores) != 3:
+        raise argparse.ArgumentTypeError(f"Se esperaban tres valores separados por coma: {texto}")
+    return valores
+
+
+def construir_config(config_base: dict[str, object], escenario: Escenario) -> dict[str, object]:
+    config = copy.deepcopy(config_base)
+    config["simulacion"]["semilla"] = escenario.semilla
+    config["ciudad"]["tamano_cuadricula"] = {"filas": escenario.filas, "columnas": escenario.columnas}
+    camara, espira, gps = escenario.pesos
+    config["analitica"]["pesos"] = {"camara": camara, "espira_inductiva": espira, "gps": gps}
+    verde_base, verde_por_gap, ciclo_total = escenario.temporizacion
+    config["analitica"]["temporizacion"] = {
+        "verde_base": verde_base,
+        "verde_por_gap": verde_por_gap,
+        "ciclo_total": ciclo_total,
+    }
+    return config
+
+
+def calcular_huella_codigo(raiz: Path) -> str:
+    resumen = hashlib.sha1()
+    for directorio in DIRECTORIOS_CODIGO:
+        for ruta in sorted((raiz / directorio).rglob("*.py")):
+            resumen.update(ruta.relative_to(raiz).as_posix().encode("utf-8"))
+            resumen.update(ruta.read_bytes())
+    return resumen.hexdigest()
+
+
+def calcular_clave(config: dict[str, object], ticks: int, con_analitica: bool, huella_codigo: str) -> str:
+    contenido = {
+        seccion: quitar_comentarios(config[seccion]) for seccion in ("ciudad", "sensores", "analitica", "simulacion")
+    }
+    contenido["ticks"] = ticks
+    contenido["con_analitica"] = con_analitica
+    contenido["version_cache"] = VERSION_CACHE
+    contenido["huella_codigo"] = huella_codigo
+    return hashlib.sha1(json.dumps(contenido, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def correr_escenario(config: dict[str, object], ticks: int, con_analitica: bool) -> dict[str, float | int]:
+    resumen = ejecutar_corrida(config, ticks, con_analitica=con_analitica)
+    return {
+        "vehiculos_salidos": resumen.vehiculos_retirados,
+        "cola_promedio_por_via": resumen.cola_promedio_por_via,
+        "ticks_promedio_en_ciudad": resumen.ticks_promedio_en_ciudad,
+        "segundos": resumen.segundos,
+    }
+
+
+def leer_cache(ruta: Path) -> dict[str, float | int] | None:
+    try:
+        return json.loads(ruta.read_text(encoding="utf-8"))["indicadores"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def escribir_cache(ruta: Path, escenario: Escenario, indicadores: dict[str, float | int]) -> None:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f"{ruta.name}.tmp")
+    temporal.write_text(
+        json.dumps({"escenario": asdict(escenario), "indicadores": indicadores}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    os.replace(temporal, ruta)
+
+
+def ejecutar_barrido(
+    config_base: dict[str, object],
+    escenarios: list[Escenario],
+    ticks: int,
+    con_analitica: bool,
+    procesos: int,
+    directorio_cache: Path | None,
+) -> list[tuple[Escenario, dict[str, float | int]]]:
+    resultados: dict[Escenario, dict[str, float | int]] = {}
+    pendientes: list[tuple[Escenario, dict[str, object], Path | None]] = []
+    huella_codigo = calcular_huella_codigo(Path(__file__).resolve().parents[2]) if directorio_cache is not None else ""
+    for escenario in escenarios:
+        config = construir_config(config_base, escenario)
+        ruta_cache = None
+        if directorio_cache is not None:
+            ruta_cache = directorio_cache / f"{calcular_clave(config, ticks, con_analitica, huella_codigo)}.json"
+            indicadores = leer_cache(ruta_cache)
+            if indicadores is not None:
+                resultados[escenario] = indicadores
+                continue
+        pendientes.append((escenario, config, ruta_cache))
+
+    log(
+        "PC0-Barrido",
+        f"Escenarios: total={len(escenarios)}, en_cache={len(resultados)}, por_correr={len(pendientes)}.",
+    )
+    if pendientes:
+        procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as grupo:
+            futuros = {
+                grupo.submit(correr_escenario, config, ticks, con_analitica): (escenario, ruta_cache)
+                for escenario, config, ruta_cache in pendientes
+            }
+            for terminados, futuro in enumerate(as_completed(futuros), start=1):
+                escenario, ruta_cache = futuros[futuro]
+                indicadores = futuro.result()
+                resultados[escenario] = indicadores
+                if ruta_cache is not None:
+                    escribir_cache(ruta_cache, escenario, indicadores)
+                log(
+                    "PC0-Barrido",
+                    (
+                        f"[{terminados}/{len(pendientes)}] semilla={escenario.semilla}, "
+                        f"cuadricula={escenario.filas}x{escenario.columnas}, pesos={escenario.pesos}, "
+                        f"temporizacion={escenario.temporizacion}, segundos={float(indicadores['segundos']):.2f}."
+                    ),
+                )
+    return [(escenario, resultados[escenario]) for escenario in escenarios]
+
+
+def agregar_resultados(
+    resultados: list[tuple[Escenario, dict[str, float | int]]],
+) -> list[dict[str, object]]:
+    grupos: dict[tuple[object, ...], list[dict[str, float | int]]] = {}
+    for escenario, indicadores in resultados:
+        grupos.setdefault(escenario.grupo, []).append(indicadores)
+
+    filas: list[dict[str, object]] = []
+    for (filas_mapa, columnas_mapa, pesos, temporizacion), corridas in grupos.items():
+        fila: dict[str, object] = {
+            "cuadricula": f"{filas_mapa}x{columnas_mapa}",
+            "pesos": ",".join(f"{peso:g}" for peso in pesos),
+            "temporizacion": ",".join(f"{valor:g}" for valor in temporizacion),
+            "corridas": len(corridas),
+        }
+        for indicador in INDICADORES:
+            valores = [float(corrida[indicador]) for corrida in corridas]
+            fila[indicador] = statistics.fmean(valores)
+            fila[f"{indicador}_desviacion"] = statistics.stdev(valores) if len(valores) > 1 else 0.0
+        filas.append(fila)
+    return filas
+
+
+def formatear_tabla(filas: list[dict[str, object]]) -> str:
+    encabezados = ["cuadricula", "pesos", "temporizacion", "corridas", *INDICADORES]
+    celdas = [
+        [
+            str(fila["cuadricula"]),
+            str(fila["pesos"]),
+            str(fila["temporizacion"]),
+            str(fila["corridas"]),
+            *(f"{fila[indicador]:.2f} ± {fila[f'{indicador}_desviacion']:.2f}" for indicador in INDICADORES),
+        ]
+        for fila in filas
+    ]
+    anchos = [max(len(texto) for texto in columna) for columna in zip(encabezados, *celdas)]
+    return "\n".join(
+        "  ".join(texto.ljust(ancho) for texto, ancho in zip(linea, anchos)).rstrip()
+        for linea in [encabezados, *celdas]
+    )
+
+
+def main() -> None:
+    raiz = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(
+        description=(
+            "Corre en paralelo combinaciones de semilla, pesos de sensores, temporizacion y tamano de cuadricula "
+            "y resume vehiculos salidos, cola promedio y tiempo en la ciudad."
+        )
+    )
+    parser.add_argument("--config", default=str(raiz / "config/system_config.json"))
+    parser.add_argument("--semillas", type=int, nargs="+", default=None)
+    parser.add_argument("--pesos", type=parsear_terna, nargs="+", default=None, help="camara,espira,gps")
+    parser.add_argument(
+        "--temporizaciones",
+        type=parsear_terna,
+        nargs="+",
+        default=None,
+        help="verde_base,verde_por_gap,ciclo_total",
+    )
+    parser.add_argument("--cuadriculas", type=parsear_cuadricula, nargs="+", default=None, help="FILASxCOLUMNAS")
+    parser.add_argument("--ticks", type=int, default=None)
+    parser.add_argument("--motor", choices=("clasico", "vectorizado", "eventos", "particionado"), default=None)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--sin-analitica", action="store_true")
+    parser.add_argument("--sin-cache", action="store_true")
+    parser.add_argument("--csv", default=None)
+    argumentos = parser.parse_args()
+
+    config = cargar_configuracion(argumentos.config)
+    config_barridos = dict(config.get("barridos", {}))
+    if argumentos.motor is not None:
+        config["simulacion"]["motor"] = argumentos.motor
+    pesos_base = config["analitica"]["pesos"]
+    temporizacion_base = dict(config["analitica"].get("temporizacion", {}))
+    cuadricula_base = config["ciudad"]["tamano_cuadricula"]
+
+    semillas = argumentos.semillas or [int(config["simulacion"].get("semilla", 0))]
+    pesos = argumentos.pesos or [
+        (float(pesos_base["camara"]), float(pesos_base["espira_inductiva"]), float(pesos_base["gps"]))
+    ]
+    temporizaciones = argumentos.temporizaciones or [
+        (
+            float(temporizacion_base.get("verde_base", 15)),
+            float(temporizacion_base.get("verde_por_gap", 15)),
+            float(temporizacion_base.get("ciclo_total", 30)),
+        )
+    ]
+    cuadriculas = argumentos.cuadriculas or [(int(cuadricula_base["filas"]), int(cuadricula_base["columnas"]))]
+    escenarios = [
+        Escenario(semilla, filas, columnas, pesos_escenario, temporizacion)
+        for filas, columnas in cuadriculas
+        for pesos_escenario in pesos
+        for temporizacion in temporizaciones
+        for semilla in semillas
+    ]
+    ticks = argumentos.ticks if argumentos.ticks is not None else calcular_ticks_jornada(config["simulacion"])
+    procesos = argumentos.procesos if argumentos.procesos is not None else int(config_barridos.get("procesos", 0))
+    directorio_cache = None
+    if not argumentos.sin_cache:
+        directorio_cache = raiz / str(config_barridos.get("ruta_cache", "PC0/simulation/cache_barridos"))
+
+    resultados = ejecutar_barrido(
+        config,
+        escenarios,
+        ticks=ticks,
+        con_analitica=not argumentos.sin_analitica,
+        procesos=procesos,
+        directorio_cache=directorio_cache,
+    )
+    filas = agregar_resultados(resultados)
+    log("PC0-Barrido", f"Resumen de {len(escenarios)} escenarios de {ticks} ticks:\n{formatear_tabla(filas)}")
+    if argumentos.csv is not None:
+        with open(argumentos.csv, "w", newline="", encoding="utf-8") as archivo:
+            escritor = csv.DictWriter(archivo, fieldnames=list(filas[0]))
+            escritor.writeheader()
+            escritor.writerows(filas)
+        log("PC0-Barrido", f"Tabla agregada guardada en {argumentos.csv}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from common.modelos.simulacion import crear_motor_simulacion
+from common.modelos.trafico import CiudadMapa
+from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.logs import log
+
+
+@dataclass(slots=True)
+class MedicionParticionado:
+    particiones: str
+    regiones: int
+    ticks: int
+    segundos: float
+    segundos_regiones: float
+    segundos_region_mas_lenta: float
+
+    @property
+    def ticks_por_segundo(self) -> float:
+        return self.ticks / self.segundos if self.segundos > 0 else 0.0
+
+    def segundos_serie(self, procesadores: int) -> float:
+        paralelo = self.segundos_regiones if procesadores <= 1 else self.segundos_region_mas_lenta
+        return max(self.segundos - paralelo, 0.0)
+
+    def fraccion_serie(self, procesadores: int) -> float:
+        serie = self.segundos_serie(procesadores)
+        total = serie + self.segundos_regiones
+        return serie / total if total > 0 else 0.0
+
+    def proyectar_ticks_por_segundo(self, procesadores: int, nucleos: int) -> float:
+        paralelo = max(self.segundos_region_mas_lenta, self.segundos_regiones / max(1, nucleos))
+        segundos = self.segundos_serie(procesadores) + paralelo
+        return self.ticks / segundos if segundos > 0 else 0.0
+
+
+def configurar(config: dict[str, object], lado: int, motor: str, particiones: tuple[int, int]) -> dict[str, object]:
+    config = copy.deepcopy(config)
+    config["ciudad"]["tamano_cuadricula"] = {"filas": lado, "columnas": lado}
+    config["simulacion"]["motor"] = motor
+    config["simulacion"]["particiones"] = {"filas": particiones[0], "columnas": particiones[1]}
+    config["simulacion"]["perfilado_activo"] = motor == "particionado"
+    return config
+
+
+def medir_clasico(config: dict[str, object], ticks: int) -> float:
+    motor = crear_motor_simulacion(CiudadMapa.desde_config(config["ciudad"]), config["simulacion"])
+    try:
+        inicio = time.perf_counter()
+        for _ in range(ticks):
+            motor.avanzar_tick()
+        segundos = time.perf_counter() - inicio
+    finally:
+        motor.cerrar()
+    return ticks / segundos if segundos > 0 else 0.0
+
+
+def medir_particionado(config: dict[str, object], ticks: int) -> MedicionParticionado:
+    motor = crear_motor_simulacion(CiudadMapa.desde_config(config["ciudad"]), config["simulacion"])
+    nanosegundos_regiones = 0
+    nanosegundos_region_mas_lenta = 0
+    try:
+        inicio = time.perf_counter()
+        for _ in range(ticks):
+            motor.avanzar_tick()
+            nanosegundos_regiones += sum(motor.nanosegundos_por_region)
+            nanosegundos_region_mas_lenta += max(motor.nanosegundos_por_region)
+        segundos = time.perf_counter() - inicio
+    finally:
+        motor.cerrar()
+    particiones = config["simulacion"]["particiones"]
+    return MedicionParticionado(
+        particiones=f"{particiones['filas']}x{particiones['columnas']}",
+        regiones=motor.cantidad_regiones,
+        ticks=ticks,
+        segundos=segundos,
+        segundos_regiones=nanosegundos_regiones / 1e9,
+        segundos_region_mas_lenta=nanosegundos_region_mas_lenta / 1e9,
+    )
+
+
+def leer_particiones(texto: str) -> list[tuple[int, int]]:
+    particiones: list[tuple[int, int]] = []
+    for parte in texto.split(","):
+        filas, columnas = parte.lower().split("x")
+        particiones.append((int(filas), int(columnas)))
+    return particiones
+
+
+def main() -> None:
+    raiz = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(
+        description="Mide la escalabilidad del motor particionado frente al clasico y proyecta la ley de Amdahl."
+    )
+    parser.add_argument("--config", default=str(raiz / "config/system_config.json"))
+    parser.add_argument("--lados", default="10,20,40")
+    parser.add_argument("--particiones", default="1x2,2x2,2x4")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=None)
+    argumentos = parser.parse_args()
+
+    config = cargar_configuracion(argumentos.config)
+    if argumentos.semilla is not None:
+        config["simulacion"]["semilla"] = argumentos.semilla
+    procesadores = os.cpu_count() or 1
+    log(
+        "PC0-BenchmarkParticionado",
+        (
+            f"Procesadores disponibles: {procesadores}. "
+            + (
+                "Con un solo procesador las regiones se turnan; los ticks por segundo medidos no reflejan "
+                "paralelismo y solo la proyeccion estima la escala con mas nucleos."
+                if procesadores == 1
+                else "Las regiones corren en paralelo hasta agotar los procesadores."
+            )
+        ),
+    )
+    for lado in (int(valor) for valor in argumentos.lados.split(",")):
+        clasico = medir_clasico(configurar(config, lado, "clasico", (1, 1)), argumentos.ticks)
+        log("PC0-BenchmarkParticionado", f"Cuadricula {lado}x{lado}: clasico={clasico:.1f} ticks/s.")
+        for particiones in leer_particiones(argumentos.particiones):
+            medicion = medir_particionado(configurar(config, lado, "particionado", particiones), argumentos.ticks)
+            proyecciones = ", ".join(
+                f"{nucleos}n={medicion.proyectar_ticks_por_segundo(procesadores, nucleos):.1f}"
+                for nucleos in sorted({1, 2, 4, medicion.regiones})
+            )
+            log(
+                "PC0-BenchmarkParticionado",
+                (
+                    f"Cuadricula {lado}x{lado}, particiones {medicion.particiones} ({medicion.regiones} regiones): "
+                    f"medido={medicion.ticks_por_segundo:.1f} ticks/s, "
+                    f"serie={medicion.segundos_serie(procesadores) * 1000 / medicion.ticks:.3f} ms/tick, "
+                    f"regiones={medicion.segundos_regiones * 1000 / medicion.ticks:.3f} ms/tick, "
+                    f"region_mas_lenta={medicion.segundos_region_mas_lenta * 1000 / medicion.ticks:.3f} ms/tick, "
+                    f"fraccion_serie={medicion.fraccion_serie(procesadores):.2f}, "
+                    f"proyeccion_ticks_por_segundo: {proyecciones}."
+                ),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from common.modelos.artefacto_mapa import CLAVE_MAPA_COMPILADO, escribir_mapa_compilado
+from common.modelos.trafico import CiudadMapa
+from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.logs import log
+
+RUTA_POR_DEFECTO = "PC0/simulation/mapa_compilado.bin"
+
+
+def main() -> None:
+    raiz = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compila el mapa de la ciudad, con sus tablas de vias, intersecciones y rutas, en un artefacto "
+            "binario versionado que los servicios cargan con mmap al arrancar."
+        )
+    )
+    parser.add_argument("--config", default=str(raiz / "config/system_config.json"))
+    parser.add_argument("--salida", default=None)
+    argumentos = parser.parse_args()
+
+    config = cargar_configuracion(argumentos.config)
+    config_ciudad = config["ciudad"]
+    salida = argumentos.salida or str(config_ciudad.get(CLAVE_MAPA_COMPILADO, {}).get("ruta") or RUTA_POR_DEFECTO)
+    ruta = raiz / salida
+
+    inicio = time.perf_counter()
+    ciudad_mapa = CiudadMapa.desde_config(config_ciudad)
+    ciudad_mapa.obtener_tabla_rutas()
+    hash_contenido = escribir_mapa_compilado(ruta, ciudad_mapa, config_ciudad)
+    log(
+        "PC0-CompilarMapa",
+        (
+            f"Mapa compilado en {ruta}: intersecciones={len(ciudad_mapa.intersecciones)}, "
+            f"vias={len(ciudad_mapa.vias)}, bytes={ruta.stat().st_size}, "
+            f"milisegundos={(time.perf_counter() - inicio) * 1000:.1f}."
+        ),
+    )
+    log(
+        "PC0-CompilarMapa",
+        (
+            f'Para fijarlo en los servicios use "ciudad.{CLAVE_MAPA_COMPILADO}": '
+            f'{{"ruta": "{salida}", "hash": "{hash_contenido}"}}.'
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from PC1.sensors.simulador_sensores import FiltroBandaMuerta, construir_tramas
+from PC2.analytics.servicio_analitica import ServicioAnalitica
+from common.mensajes.comandos import ComandoSemaforo
+from common.modelos.simulacion import MotorSimulacion, crear_motor_simulacion
+from common.modelos.trafico import CiudadMapa, Via
+from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.logs import log
+
+
+class ControladorSemaforosLocal:
+    def __init__(self) -> None:
+        self.pendientes: list[ComandoSemaforo] = []
+
+    def aplicar_comando(self, comando: ComandoSemaforo) -> None:
+        self.pendientes.append(comando)
+
+    def entregar_pendientes(self) -> list[ComandoSemaforo]:
+        comandos, self.pendientes = self.pendientes, []
+        return comandos
+
+
+@dataclass(slots=True)
+class ResumenCorrida:
+    motor: str
+    ticks: int
+    segundos: float
+    vehiculos_creados: int = 0
+    vehiculos_retirados: int = 0
+    vehiculos_movidos: int = 0
+    comandos_aplicados: int = 0
+    eventos_sensor: int = 0
+    suma_en_espera: int = 0
+    vias_instrumentadas: int = 0
+    retirados_con_recorrido: int = 0
+    suma_ticks_en_ciudad: int = 0
+    indicadores_finales: dict[str, float | int] = field(default_factory=dict)
+    perfil_fases: str = ""
+
+    @property
+    def ticks_por_segundo(self) -> float:
+        return self.ticks / self.segundos if self.segundos > 0 else 0.0
+
+    @property
+    def vehiculos_por_segundo(self) -> float:
+        return self.vehiculos_movidos / self.segundos if self.segundos > 0 else 0.0
+
+    @property
+    def espera_promedio_por_tick(self) -> float:
+        return self.suma_en_espera / self.ticks if self.ticks > 0 else 0.0
+
+    @property
+    def cola_promedio_por_via(self) -> float:
+        return self.espera_promedio_por_tick / self.vias_instrumentadas if self.vias_instrumentadas > 0 else 0.0
+
+    @property
+    def ticks_promedio_en_ciudad(self) -> float:
+        return self.suma_ticks_en_ciudad / self.retirados_con_recorrido if self.retirados_con_recorrido > 0 else 0.0
+
+
+def calcular_ticks_jornada(config_simulacion: dict[str, object]) -> int:
+    inicio = datetime.strptime(str(config_simulacion.get("hora_inicio_simulada", "12:00")), "%H:%M")
+    fin = datetime.strptime(str(config_simulacion.get("hora_fin_simulada", "18:00")), "%H:%M")
+    minutos = int((fin - inicio).total_seconds() // 60)
+    return max(1, minutos // max(1, int(config_simulacion.get("minutos_simulados_por_tick", 1))))
+
+
+def describir_via_sensores(via: Via) -> dict[str, object]:
+    return {
+        "vehiculos_en_espera": via.vehiculos_en_espera,
+        "vehiculos_en_circulacion": via.vehiculos_en_circulacion,
+        "velocidad_promedio": via.velocidad_promedio,
+    }
+
+
+def publicar_eventos_sensores(
+    motor: MotorSimulacion,
+    servicio: ServicioAnalitica,
+    tipos_sensor: list[str],
+    intervalo_espira: int,
+    agrupar_por_interseccion: bool = False,
+    filtro_banda_muerta: FiltroBandaMuerta | None = None,
+) -> int:
+    vias_instrumentadas = motor.ciudad_mapa.obtener_vias_instrumentadas()
+    tramas = construir_tramas(
+        vias_instrumentadas,
+        {via.id_via: describir_via_sensores(via) for via in vias_instrumentadas},
+        tipos_sensor,
+        motor.ciudad_mapa.tick_actual,
+        intervalo_espira,
+    )
+    if filtro_banda_muerta is not None:
+        tramas = filtro_banda_muerta.filtrar(tramas)
+    publicados = 0
+    for trama in tramas:
+        if agrupar_por_interseccion:
+            servicio.procesar_trama(trama)
+        else:
+            for evento in trama.eventos:
+                servicio.procesar_evento(evento)
+        publicados += len(trama.eventos)
+    return publicados
+
+
+def calcular_indicadores_finales(motor: MotorSimulacion) -> dict[str, float | int]:
+    vias = list(motor.ciudad_mapa.iterar_vias())
+    en_circulacion = sum(via.vehiculos_en_circulacion for via in vias)
+    en_espera = sum(via.vehiculos_en_espera for via in vias)
+    suma_centesimas = sum(via.suma_centesimas_velocidad for via in vias)
+    return {
+        "vehiculos_activos": en_circulacion + en_espera,
+        "vehiculos_en_circulacion": en_circulacion,
+        "vehiculos_en_espera": en_espera,
+        "cola_maxima_por_via": max((via.vehiculos_en_espera for via in vias), default=0),
+        "velocidad_promedio": round(suma_centesimas / en_circulacion) / 100 if en_circulacion else 0.0,
+        "vias_congestion_alta": sum(1 for via in vias if via.estado_congestion == "ALTA"),
+    }
+
+
+def ejecutar_corrida(config: dict[str, object], ticks: int, con_analitica: bool = True) -> ResumenCorrida:
+    config_simulacion = config["simulacion"]
+    motor = crear_motor_simulacion(
+        ciudad_mapa=CiudadMapa.desde_config(config["ciudad"]),
+        config_simulacion=config_simulacion,
+    )
+    controlador = ControladorSemaforosLocal()
+    servicio = ServicioAnalitica(
+        config,
+        controlador=controlador,
+        persistir_comandos=False,
+        registrar_eventos=False,
+    )
+    tipos_sensor = list(config["sensores"]["tipos"])
+    intervalo_espira = int(config["sensores"]["intervalo_espira_segundos"])
+    agrupar_por_interseccion = bool(config["sensores"].get("agrupar_por_interseccion", False))
+    filtro_banda_muerta = FiltroBandaMuerta.desde_config(config["sensores"])
+    pasos_por_publicacion = max(
+        1,
+        int(
+            round(
+                float(config["sensores"]["intervalo_publicacion_segundos"])
+                / float(config_simulacion["tick_segundos_reales"])
+            )
+        ),
+    )
+    resumen = ResumenCorrida(
+        motor=str(config_simulacion.get("motor", "clasico")),
+        ticks=ticks,
+        segundos=0.0,
+        vias_instrumentadas=len(motor.ciudad_mapa.obtener_vias_instrumentadas()),
+    )
+    ultimo_tick_publicado = 0
+    tick_creacion: dict[int, int] = {}
+
+    try:
+        inicio = time.perf_counter()
+        for _ in range(ticks):
+            for comando in controlador.entregar_pendientes():
+                motor.aplicar_comando_semaforo(comando)
+                resumen.comandos_aplicados += 1
+            resultado = motor.avanzar_tick()
+            resumen.vehiculos_creados += resultado.creados
+            resumen.vehiculos_retirados += resultado.eliminados
+            resumen.vehiculos_movidos += resultado.movidos
+            for vehiculo in resultado.vehiculos_creados:
+                tick_creacion[vehiculo.id_vehiculo] = resultado.tick
+            for retiro in resultado.vehiculos_eliminados:
+                tick_inicial = tick_creacion.pop(int(retiro["vehiculo_id"]), None)
+                if tick_inicial is not None:
+                    resumen.retirados_con_recorrido += 1
+                    resumen.suma_ticks_en_ciudad += resultado.tick - tick_inicial
+            resumen.suma_en_espera += sum(via.vehiculos_en_espera for via in motor.ciudad_mapa.iterar_vias())
+            if con_analitica and (
+                ultimo_tick_publicado == 0 or resultado.tick - ultimo_tick_publicado >= pasos_por_publicacion
+            ):
+                resumen.eventos_sensor += publicar_eventos_sensores(
+                    motor, servicio, tipos_sensor, intervalo_espira, agrupar_por_interseccion, filtro_banda_muerta
+                )
+                ultimo_tick_publicado = resultado.tick
+        resumen.segundos = time.perf_counter() - inicio
+        resumen.indicadores_finales = calcular_indicadores_finales(motor)
+        resumen.perfil_fases = motor.perfilador.formatear_percentiles()
+    finally:
+        motor.cerrar()
+    return resumen
+
+
+def main() -> None:
+    raiz = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(
+        description="Ejecuta la simulacion sin sockets ni esperas y reporta rendimiento e indicadores."
+    )
+    parser.add_argument("--config", default=str(raiz / "config/system_config.json"))
+    parser.add_argument("--ticks", type=int, default=None)
+    parser.add_argument("--motor", choices=("clasico", "vectorizado", "eventos", "particionado"), default=None)
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--sin-analitica", action="store_true")
+    parser.add_argument("--perfilar", action="store_true")
+    argumentos = parser.parse_args()
+
+    config = cargar_configuracion(argumentos.config)
+    if argumentos.motor is not None:
+        config["simulacion"]["motor"] = argumentos.motor
+    if argumentos.semilla is not None:
+        config["simulacion"]["semilla"] = argumentos.semilla
+    if argumentos.perfilar:
+        config["simulacion"]["perfilado_activo"] = True
+    ticks = argumentos.ticks if argumentos.ticks is not None else calcular_ticks_jornada(config["simulacion"])
+
+    log(
+        "PC0-CorridaAcelerada",
+        f"Iniciando corrida de {ticks} ticks con motor {config['simulacion'].get('motor', 'clasico')}.",
+    )
+    resumen = ejecutar_corrida(config, ticks, con_analitica=not argumentos.sin_analitica)
+    log(
+        "PC0-CorridaAcelerada",
+        (
+            f"Rendimiento: ticks={resumen.ticks}, segundos={resumen.segundos:.3f}, "
+            f"ticks_por_segundo={resumen.ticks_por_segundo:.1f}, "
+            f"vehiculos_por_segundo={resumen.vehiculos_por_segundo:.1f}."
+        ),
+    )
+    log(
+        "PC0-CorridaAcelerada",
+        (
+            f"Totales: creados={resumen.vehiculos_creados}, retirados={resumen.vehiculos_retirados}, "
+            f"movimientos={resumen.vehiculos_movidos}, eventos_sensor={resumen.eventos_sensor}, "
+            f"comandos_aplicados={resumen.comandos_aplicados}, "
+            f"espera_promedio_por_tick={resumen.espera_promedio_por_tick:.2f}, "
+            f"cola_promedio_por_via={resumen.cola_promedio_por_via:.2f}, "
+            f"ticks_promedio_en_ciudad={resumen.ticks_promedio_en_ciudad:.2f}."
+        ),
+    )
+    indicadores = ", ".join(f"{nombre}={valor}" for nombre, valor in resumen.indicadores_finales.items())
+    log("PC0-CorridaAcelerada", f"Indicadores finales: {indicadores}.")
+    if resumen.perfil_fases:
+        log("PC0-CorridaAcelerada", f"Perfil por fase p50/p95/p99: {resumen.perfil_fases}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,29 +2,42 @@ from __future__ import annotations
 
 import time
 from pathlib import Path
+from time import perf_counter_ns
 
 import zmq
 
-from common.mensajes.ambulancias import SolicitudAmbulancia
-from common.mensajes.comandos import ComandoSemaforo
-from common.modelos.simulacion import MotorSimulacion
-from common.modelos.trafico import CiudadMapa
+from common.mensajes.codec import (
+    TIPO_COMANDO_SEMAFORO,
+    TIPO_SNAPSHOT_OPERATIVO,
+    TIPO_SOLICITUD_AMBULANCIA,
+    codificar_sobre,
+    decodificar_mensaje,
+    obtener_formato,
+)
+from common.mensajes.estado_operativo import CodificadorSnapshotsDelta
+from common.modelos.artefacto_mapa import IdentidadMapa, abrir_mapa_del_servicio
+from common.modelos.identificadores import nombre_vehiculo
+from common.modelos.simulacion import MotorSimulacion, crear_motor_simulacion
 from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.consulta_mapa import atender_consultas_mapa
 from common.utilidades.logs import log
 from common.utilidades.mensajeria_zmq import (
     configurar_emisor_mejor_esfuerzo,
-    enviar_json_mejor_esfuerzo,
+    crear_trama,
+    enviar_trama,
+    enviar_trama_mejor_esfuerzo,
 )
+from common.utilidades.planificador_ticks import POLITICA_RECUPERAR, PlanificadorTicks
 
 
 def procesar_comandos_pendientes(receptor_comandos: zmq.Socket, motor: MotorSimulacion) -> int:
     comandos_aplicados = 0
     while True:
         try:
-            carga = receptor_comandos.recv_json(flags=zmq.NOBLOCK)
+            carga = receptor_comandos.recv(flags=zmq.NOBLOCK)
         except zmq.Again:
             break
-        comando = ComandoSemaforo.desde_dict(carga)
+        _, comando = decodificar_mensaje(carga, TIPO_COMANDO_SEMAFORO)
         motor.aplicar_comando_semaforo(comando)
         comandos_aplicados += 1
         log(
@@ -38,10 +51,6 @@ def procesar_comandos_pendientes(receptor_comandos: zmq.Socket, motor: MotorSimu
     return comandos_aplicados
 
 
-def enviar_mensaje(emisor: zmq.Socket, tipo: str, datos: dict[str, object]) -> None:
-    emisor.send_json({"tipo": tipo, "datos": datos})
-
-
 def procesar_solicitudes_ambulancia(
     receptor_ambulancias: zmq.Socket,
     motor: MotorSimulacion,
@@ -49,43 +58,92 @@ def procesar_solicitudes_ambulancia(
     ambulancias_creadas = 0
     while True:
         try:
-            carga = receptor_ambulancias.recv_json(flags=zmq.NOBLOCK)
+            carga = receptor_ambulancias.recv(flags=zmq.NOBLOCK)
         except zmq.Again:
             break
 
-        solicitud = SolicitudAmbulancia.desde_dict(carga)
+        _, solicitud = decodificar_mensaje(carga, TIPO_SOLICITUD_AMBULANCIA)
         ambulancia = motor.inyectar_ambulancia(
             nodo_origen=solicitud.nodo_origen,
             velocidad=solicitud.velocidad,
+            nodo_destino=solicitud.nodo_destino,
         )
         if ambulancia is None:
+            motivo = "no tiene via de entrada"
+            if solicitud.nodo_destino is not None:
+                motivo = f"no tiene via de entrada con ruta hacia {solicitud.nodo_destino}"
             log(
                 "PC0-Simulacion",
-                f"Solicitud de ambulancia descartada: nodo {solicitud.nodo_origen} no tiene via de entrada.",
+                f"Solicitud de ambulancia descartada: nodo {solicitud.nodo_origen} {motivo}.",
             )
             continue
         ambulancias_creadas += 1
         log(
             "PC0-Simulacion",
             (
-                f"Ambulancia {ambulancia.id_vehiculo} creada en {solicitud.nodo_origen} "
-                f"con velocidad {ambulancia.velocidad:.2f}."
+                f"Ambulancia {ambulancia.nombre} creada en {solicitud.nodo_origen} "
+                f"con velocidad {ambulancia.velocidad:.2f} y destino {solicitud.nodo_destino or 'libre'}."
             ),
         )
     return ambulancias_creadas
 
 
+def restaurar_desde_checkpoint(motor: MotorSimulacion, ruta_checkpoint: Path) -> None:
+    inicio = time.perf_counter()
+    try:
+        restaurado = motor.cargar_checkpoint(ruta_checkpoint)
+    except ValueError as error:
+        log("PC0-Simulacion", f"Checkpoint {ruta_checkpoint} ignorado: {error}")
+        return
+    if not restaurado:
+        log("PC0-Simulacion", "No hay checkpoint previo; la simulacion inicia desde el tick 0.")
+        return
+    log(
+        "PC0-Simulacion",
+        (
+            f"Simulacion restaurada desde checkpoint: tick={motor.ciudad_mapa.tick_actual}, "
+            f"vehiculos={motor.contar_vehiculos()}, milisegundos={(time.perf_counter() - inicio) * 1000:.1f}."
+        ),
+    )
+
+
 def main() -> None:
     raiz = Path(__file__).resolve().parents[2]
     config = cargar_configuracion(raiz / "config/system_config.json")
-    ciudad_mapa = CiudadMapa.desde_config(config["ciudad"])
-    motor = MotorSimulacion(ciudad_mapa=ciudad_mapa, config_simulacion=config["simulacion"])
+    ciudad_mapa, identidad_mapa = abrir_mapa_del_servicio(config["ciudad"], raiz, "PC0-Simulacion")
+    motor = crear_motor_simulacion(ciudad_mapa=ciudad_mapa, config_simulacion=config["simulacion"])
+    try:
+        ejecutar_servicio(config, raiz, motor, identidad_mapa)
+    finally:
+        motor.cerrar()
+
+
+def ejecutar_servicio(
+    config: dict[str, object], raiz: Path, motor: MotorSimulacion, identidad_mapa: IdentidadMapa
+) -> None:
+    ciudad_mapa = motor.ciudad_mapa
+    ruta_checkpoint = raiz / str(
+        config["simulacion"].get("ruta_checkpoint", "PC0/simulation/checkpoint_simulacion.bin")
+    )
+    intervalo_checkpoint_ticks = int(config["simulacion"].get("intervalo_checkpoint_ticks", 0))
+    restaurar_desde_checkpoint(motor, ruta_checkpoint)
+    inicio_rutas = time.perf_counter()
+    tabla_rutas = ciudad_mapa.obtener_tabla_rutas()
+    log(
+        "PC0-Simulacion",
+        (
+            f"Tabla de rutas precalculada: nodos={len(tabla_rutas.nodos)}, "
+            f"milisegundos={(time.perf_counter() - inicio_rutas) * 1000:.1f}."
+        ),
+    )
 
     contexto = zmq.Context()
     receptor_comandos = contexto.socket(zmq.PULL)
     receptor_comandos.bind(config["zmq"]["pc0"]["entrada_comandos"])
     receptor_ambulancias = contexto.socket(zmq.PULL)
     receptor_ambulancias.bind(config["zmq"]["pc0"]["solicitudes_ambulancia"])
+    servidor_mapa = contexto.socket(zmq.REP)
+    servidor_mapa.bind(config["zmq"]["pc0"]["consulta_mapa"])
 
     emisor_estado_pc1 = contexto.socket(zmq.PUSH)
     emisor_estado_pc1.connect(config["zmq"]["pc1"]["entrada_estado_operativo"])
@@ -100,26 +158,40 @@ def main() -> None:
     emisor_pc0 = contexto.socket(zmq.PUSH)
     emisor_pc0.connect(config["zmq"]["pc0"]["ingesta_historica"])
 
-    intervalo_tick = float(config["simulacion"]["tick_segundos_reales"])
+    planificador = PlanificadorTicks(
+        intervalo_segundos=float(config["simulacion"]["tick_segundos_reales"]),
+        politica=str(config["simulacion"].get("politica_atraso_ticks", POLITICA_RECUPERAR)),
+        max_ticks_recuperacion=int(config["simulacion"].get("max_ticks_recuperacion", 10)),
+    )
     intervalo_snapshot_ticks = max(1, int(config["simulacion"].get("intervalo_snapshot_ticks", 1)))
     ultimo_tick_snapshot_enviado = 0
+    formato_mensajes = obtener_formato(config)
+    intervalo_reporte_perfilado = max(1, int(config["simulacion"].get("intervalo_reporte_perfilado_ticks", 10)))
+    codificador_snapshots = CodificadorSnapshotsDelta(
+        int(config["simulacion"].get("intervalo_keyframe_ticks", 1))
+    )
 
     log("PC0-Simulacion", "Servicio de simulacion iniciado.")
     while True:
+        ticks_omitidos = planificador.esperar_siguiente_tick()
+        if ticks_omitidos:
+            motor.omitir_ticks(ticks_omitidos)
+        atender_consultas_mapa(servidor_mapa, identidad_mapa)
         comandos_aplicados = procesar_comandos_pendientes(receptor_comandos, motor)
         ambulancias_creadas = procesar_solicitudes_ambulancia(receptor_ambulancias, motor)
         resultado = motor.avanzar_tick()
         hora_inicio_simulada, hora_fin_simulada = motor.obtener_rango_simulado()
         hora_simulada = motor.obtener_hora_simulada_actual()
         snapshot_enviado = False
+        tipo_snapshot_enviado = "NINGUNO"
 
         for vehiculo in resultado.vehiculos_creados:
-            via = motor.ciudad_mapa.vias[vehiculo.via_actual]
+            via = motor.ciudad_mapa.vias_por_indice[vehiculo.via_actual]
             log(
                 "PC0-Simulacion",
                 (
-                    f"Vehiculo creado: id={vehiculo.id_vehiculo}, tipo={vehiculo.tipo}, "
-                    f"via={vehiculo.via_actual}, origen={via.origen}, destino={via.destino}, "
+                    f"Vehiculo creado: id={vehiculo.nombre}, tipo={vehiculo.tipo}, "
+                    f"via={via.id_via}, origen={via.origen}, destino={via.destino}, "
                     f"direccion={vehiculo.direccion_actual}, velocidad={vehiculo.velocidad:.2f}, "
                     f"estado={vehiculo.estado}, tick={resultado.tick}, hora_simulada={hora_simulada}."
                 ),
@@ -129,7 +201,7 @@ def main() -> None:
             log(
                 "PC0-Simulacion",
                 (
-                    f"Vehiculo retirado: id={vehiculo['vehiculo_id']}, tipo={vehiculo['tipo']}, "
+                    f"Vehiculo retirado: id={nombre_vehiculo(vehiculo['vehiculo_id'])}, tipo={vehiculo['tipo']}, "
                     f"via={vehiculo['via_actual']}, nodo_final={vehiculo['nodo_final']}, "
                     f"direccion={vehiculo['direccion_actual']}, velocidad={float(vehiculo['velocidad']):.2f}, "
                     f"motivo={vehiculo['motivo']}, tick={resultado.tick}, hora_simulada={hora_simulada}."
@@ -140,20 +212,34 @@ def main() -> None:
             ultimo_tick_snapshot_enviado == 0
             or resultado.tick - ultimo_tick_snapshot_enviado >= intervalo_snapshot_ticks
         ):
-            snapshot_operativo = motor.generar_snapshot_operativo()
-            snapshot_dict = snapshot_operativo.a_dict()
-
-            enviar_mensaje(emisor_estado_pc1, "snapshot_operativo", snapshot_dict)
-            enviar_json_mejor_esfuerzo(
-                emisor_pc3,
-                {"tipo": "snapshot_operativo", "datos": snapshot_dict},
+            inicio_snapshot = perf_counter_ns()
+            snapshot_operativo = codificador_snapshots.codificar(motor.generar_snapshot_operativo())
+            trama_snapshot = crear_trama(
+                codificar_sobre(TIPO_SNAPSHOT_OPERATIVO, snapshot_operativo, formato_mensajes)
             )
-            enviar_mensaje(emisor_pc2, "snapshot_operativo", snapshot_dict)
-            enviar_mensaje(emisor_pc0, "snapshot_operativo", snapshot_dict)
+            motor.perfilador.registrar("snapshot", perf_counter_ns() - inicio_snapshot)
+
+            enviar_trama(emisor_estado_pc1, trama_snapshot)
+            enviar_trama_mejor_esfuerzo(emisor_pc3, trama_snapshot)
+            enviar_trama(emisor_pc2, trama_snapshot)
+            enviar_trama(emisor_pc0, trama_snapshot)
 
             ultimo_tick_snapshot_enviado = resultado.tick
             snapshot_enviado = True
+            tipo_snapshot_enviado = snapshot_operativo.tipo_snapshot
+
+        if intervalo_checkpoint_ticks > 0 and resultado.tick % intervalo_checkpoint_ticks == 0:
+            inicio_checkpoint = perf_counter_ns()
+            bytes_checkpoint = motor.guardar_checkpoint(ruta_checkpoint)
+            motor.perfilador.registrar("checkpoint", perf_counter_ns() - inicio_checkpoint)
+            log(
+                "PC0-Simulacion",
+                f"Checkpoint del tick {resultado.tick} guardado en {ruta_checkpoint.name} ({bytes_checkpoint} bytes).",
+            )
 
+        perfil = ""
+        if motor.perfilador.activo and resultado.tick % intervalo_reporte_perfilado == 0:
+            perfil = f" Perfil p50/p95/p99: {motor.perfilador.formatear_percentiles()}."
         log(
             "PC0-Simulacion",
             (
@@ -161,10 +247,10 @@ def main() -> None:
                 f"rango={hora_inicio_simulada}-{hora_fin_simulada}, creados={resultado.creados}, "
                 f"movidos={resultado.movidos}, eliminados={resultado.eliminados}, "
                 f"comandos_aplicados={comandos_aplicados}, ambulancias_creadas={ambulancias_creadas}, "
-                f"snapshot_enviado={snapshot_enviado}."
+                f"snapshot_enviado={snapshot_enviado}, tipo_snapshot={tipo_snapshot_enviado}, "
+                f"{planificador.resumir()}.{perfil}"
             ),
         )
-        time.sleep(intervalo_tick)
 
 
 if __name__ == "__main__":
@@ -1,31 +1,241 @@
 from __future__ import annotations
 
+import multiprocessing
+import threading
+import time
+from collections import defaultdict
 from pathlib import Path
 
 import zmq
 
+from common.mensajes.codec import (
+    TIPO_EVENTO_SENSOR,
+    TIPO_TRAMA_SENSORES,
+    codificar_mensaje,
+    decodificar_mensaje,
+    obtener_formato,
+)
+from common.mensajes.eventos import PREFIJO_TOPICO_TRAMA, EventoSensor, obtener_topicos_sensores
 from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.fragmentos_broker import FragmentoBroker, obtener_fragmentos_broker
 from common.utilidades.logs import log
 
+MODO_BASE = "base"
+MODO_PROXY = "proxy"
+ENDPOINT_CAPTURA_POR_DEFECTO = "inproc://captura-broker"
+PREFIJO_TRAMA = PREFIJO_TOPICO_TRAMA.encode("utf-8")
 
-def main() -> None:
-    raiz = Path(__file__).resolve().parents[2]
-    config = cargar_configuracion(raiz / "config/system_config.json")
+
+def agrupar_topico(topico: bytes) -> str:
+    return topico.split(b"/", 1)[0].decode("utf-8", errors="replace")
+
+
+def resumir_estadisticas(
+    mensajes: int, bytes_por_topico: dict[str, int], mensajes_por_topico: dict[str, int], segundos: float
+) -> str:
+    detalle = ", ".join(
+        f"{topico}={mensajes_por_topico[topico]} msg/{bytes_por_topico[topico]} B"
+        for topico in sorted(bytes_por_topico, key=bytes_por_topico.__getitem__, reverse=True)
+    )
+    return f"Reenvio: {mensajes / segundos:.1f} msg/s en {segundos:.1f} s. Por topico: {detalle or 'sin trafico'}."
+
+
+class CacheUltimoValor:
+    def __init__(self, formato_mensajes: str) -> None:
+        self.formato_mensajes = formato_mensajes
+        self.lecturas: dict[tuple[str, str], EventoSensor] = {}
+
+    def actualizar(self, evento: EventoSensor) -> None:
+        clave = (evento.via_id, evento.tipo_sensor)
+        anterior = self.lecturas.get(clave)
+        if anterior is None or anterior.tick_origen <= evento.tick_origen:
+            self.lecturas[clave] = evento
+
+    def registrar_mensaje(self, topico: bytes, carga: bytes) -> None:
+        if topico.startswith(PREFIJO_TRAMA):
+            _, trama = decodificar_mensaje(carga, TIPO_TRAMA_SENSORES)
+            for evento in trama.eventos:
+                self.actualizar(evento)
+        else:
+            _, evento = decodificar_mensaje(carga, TIPO_EVENTO_SENSOR)
+            self.actualizar(evento)
+
+    def instantanea(self) -> list[bytes]:
+        return [codificar_mensaje(evento, self.formato_mensajes) for evento in self.lecturas.values()]
+
+
+def ejecutar_estadisticas(contexto: zmq.Context, endpoint_captura: str, intervalo_segundos: float, origen: str) -> None:
+    captura = contexto.socket(zmq.SUB)
+    captura.connect(endpoint_captura)
+    captura.setsockopt(zmq.SUBSCRIBE, b"")
+    poller = zmq.Poller()
+    poller.register(captura, zmq.POLLIN)
+
+    mensajes = 0
+    bytes_por_topico: dict[str, int] = defaultdict(int)
+    mensajes_por_topico: dict[str, int] = defaultdict(int)
+    inicio = time.monotonic()
+    while True:
+        restante = inicio + intervalo_segundos - time.monotonic()
+        if restante > 0 and poller.poll(restante * 1000):
+            while True:
+                try:
+                    tramas = captura.recv_multipart(zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                topico = agrupar_topico(tramas[0].bytes)
+                mensajes += 1
+                mensajes_por_topico[topico] += 1
+                bytes_por_topico[topico] += sum(len(trama) for trama in tramas)
+            continue
+        ahora = time.monotonic()
+        log(origen, resumir_estadisticas(mensajes, bytes_por_topico, mensajes_por_topico, ahora - inicio))
+        mensajes = 0
+        bytes_por_topico.clear()
+        mensajes_por_topico.clear()
+        inicio = ahora
+
+
+def ejecutar_cache(
+    contexto: zmq.Context, endpoint_captura: str, endpoint_instantaneas: str, cache: CacheUltimoValor, origen: str
+) -> None:
+    captura = contexto.socket(zmq.SUB)
+    captura.setsockopt(zmq.RCVHWM, 0)
+    captura.connect(endpoint_captura)
+    captura.setsockopt(zmq.SUBSCRIBE, b"")
+    atencion = contexto.socket(zmq.ROUTER)
+    atencion.bind(endpoint_instantaneas)
+    poller = zmq.Poller()
+    poller.register(captura, zmq.POLLIN)
+    poller.register(atencion, zmq.POLLIN)
+
+    log(origen, f"Cache de ultimo valor atendiendo instantaneas en {endpoint_instantaneas}.")
+    while True:
+        eventos = dict(poller.poll())
+        if captura in eventos:
+            while True:
+                try:
+                    topico, carga = captura.recv_multipart(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                try:
+                    cache.registrar_mensaje(topico, carga)
+                except (KeyError, TypeError, ValueError) as error:
+                    log(origen, f"Mensaje del topico {topico!r} ignorado por la cache: {error}")
+        if atencion in eventos:
+            tramas = atencion.recv_multipart()
+            if len(tramas) != 3 or tramas[1]:
+                log(origen, f"Solicitud de instantanea con {len(tramas)} tramas ignorada.")
+                continue
+            identidad = tramas[0]
+            lecturas = cache.instantanea()
+            atencion.send_multipart([identidad, b"", str(len(lecturas)).encode("utf-8"), *lecturas])
+            log(origen, f"Instantanea enviada con {len(lecturas)} lecturas.")
+
+
+def abrir_captura(
+    contexto: zmq.Context, config: dict, fragmento: FragmentoBroker, modo: str, origen: str
+) -> zmq.Socket | None:
+    config_broker = dict(config.get("broker", {}))
+    config_captura = dict(config_broker.get("captura", {}))
+    estadisticas_activas = modo == MODO_PROXY and bool(config_captura.get("activa", True))
+    config_cache = dict(config_broker.get("cache_ultimo_valor", {}))
+    cache_activa = bool(config_cache.get("activa", False)) and bool(fragmento.instantaneas)
+    if not estadisticas_activas and not cache_activa:
+        return None
+
+    endpoint_captura = str(config_captura.get("endpoint", ENDPOINT_CAPTURA_POR_DEFECTO))
+    captura = contexto.socket(zmq.PUB)
+    captura.setsockopt(zmq.SNDHWM, 0 if cache_activa else int(config_captura.get("limite_cola", 1000)))
+    captura.bind(endpoint_captura)
+    if estadisticas_activas:
+        threading.Thread(
+            target=ejecutar_estadisticas,
+            args=(
+                contexto,
+                endpoint_captura,
+                float(config_captura.get("intervalo_estadisticas_segundos", 5)),
+                origen,
+            ),
+            name=f"estadisticas-{origen}",
+            daemon=True,
+        ).start()
+    if cache_activa:
+        threading.Thread(
+            target=ejecutar_cache,
+            args=(
+                contexto,
+                endpoint_captura,
+                fragmento.instantaneas,
+                CacheUltimoValor(obtener_formato(config)),
+                origen,
+            ),
+            name=f"cache-{origen}",
+            daemon=True,
+        ).start()
+    return captura
+
+
+def ejecutar_base(suscriptor: zmq.Socket, publicador: zmq.Socket, captura: zmq.Socket | None, origen: str) -> None:
+    log(origen, "Broker base iniciado.")
+    while True:
+        topico, carga = suscriptor.recv_multipart()
+        publicador.send_multipart([topico, carga])
+        if captura is not None:
+            captura.send_multipart([topico, carga])
+        log(origen, f"Reenviado evento del topico {topico.decode('utf-8')}.")
+
+
+def ejecutar_proxy(suscriptor: zmq.Socket, publicador: zmq.Socket, captura: zmq.Socket | None, origen: str) -> None:
+    log(origen, f"Broker proxy iniciado; captura {'activa' if captura is not None else 'inactiva'}.")
+    zmq.proxy(suscriptor, publicador, captura)
+
+
+def ejecutar_fragmento(config: dict, fragmento: FragmentoBroker, origen: str) -> None:
     contexto = zmq.Context()
 
     suscriptor = contexto.socket(zmq.SUB)
-    suscriptor.bind(config["zmq"]["pc1"]["publicador_sensores"])
-    for topico in config["sensores"]["tipos"]:
+    suscriptor.bind(fragmento.entrada)
+    for topico in obtener_topicos_sensores(config["sensores"]):
         suscriptor.setsockopt_string(zmq.SUBSCRIBE, topico)
 
     publicador = contexto.socket(zmq.PUB)
-    publicador.bind(config["zmq"]["pc1"]["salida_broker"])
+    publicador.bind(fragmento.salida)
 
-    log("PC1-Broker", "Broker base iniciado.")
-    while True:
-        topico, carga = suscriptor.recv_multipart()
-        publicador.send_multipart([topico, carga])
-        log("PC1-Broker", f"Reenviado evento del topico {topico.decode('utf-8')}.")
+    modo = str(dict(config.get("broker", {})).get("modo", MODO_BASE))
+    if modo not in (MODO_BASE, MODO_PROXY):
+        raise ValueError(f"Modo de broker no soportado: {modo}")
+    captura = abrir_captura(contexto, config, fragmento, modo, origen)
+    if modo == MODO_PROXY:
+        ejecutar_proxy(suscriptor, publicador, captura, origen)
+    else:
+        ejecutar_base(suscriptor, publicador, captura, origen)
+
+
+def main() -> None:
+    raiz = Path(__file__).resolve().parents[2]
+    config = cargar_configuracion(raiz / "config/system_config.json")
+    fragmentos = obtener_fragmentos_broker(config)
+    if len(fragmentos) == 1:
+        ejecutar_fragmento(config, fragmentos[0], "PC1-Broker")
+        return
+
+    contexto = multiprocessing.get_context("spawn")
+    procesos = [
+        contexto.Process(
+            target=ejecutar_fragmento,
+            args=(config, fragmento, f"PC1-Broker-{fragmento.indice}"),
+            name=f"PC1-Broker-{fragmento.indice}",
+            daemon=True,
+        )
+        for fragmento in fragmentos
+    ]
+    for proceso in procesos:
+        proceso.start()
+    log("PC1-Broker", f"Broker fragmentado iniciado con {len(procesos)} procesos de reenvio.")
+    for proceso in procesos:
+        proceso.join()
+        log("PC1-Broker", f"El proceso {proceso.name} termino con codigo {proceso.exitcode}.")
 
 
 if __name__ == "__main__":
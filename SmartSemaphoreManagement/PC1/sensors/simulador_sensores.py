@@ -4,10 +4,22 @@ from pathlib import Path
 
 import zmq
 
-from common.mensajes.eventos import EventoSensor
-from common.mensajes.estado_operativo import SnapshotOperativo
-from common.modelos.trafico import CiudadMapa
+from common.mensajes.codec import (
+    TIPO_EVENTO_SENSOR,
+    TIPO_SNAPSHOT_OPERATIVO,
+    TIPO_TRAMA_SENSORES,
+    codificar_mensaje,
+    codificar_sobre,
+    decodificar_mensaje,
+    obtener_formato,
+)
+from common.mensajes.eventos import EventoSensor, TramaSensores, topico_trama
+from common.mensajes.estado_operativo import AcumuladorSnapshotsDelta
+from common.modelos.artefacto_mapa import abrir_mapa_del_servicio
+from common.modelos.trafico import Via
 from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.consulta_mapa import verificar_mapa_con_simulacion
+from common.utilidades.fragmentos_broker import fragmento_de_interseccion, obtener_fragmentos_broker
 from common.utilidades.logs import log
 from common.utilidades.normalizacion_sensores import (
     clasificar_nota_trafico,
@@ -17,10 +29,6 @@ from common.utilidades.normalizacion_sensores import (
 )
 
 
-def enviar_mensaje_persistencia(emisor: zmq.Socket, tipo: str, datos: dict[str, object]) -> None:
-    emisor.send_json({"tipo": tipo, "datos": datos})
-
-
 def construir_datos(
     tipo_sensor: str,
     via: dict[str, object],
@@ -57,39 +65,128 @@ def construir_datos(
     }
 
 
+class FiltroBandaMuerta:
+    def __init__(self, umbral_nota: float, intervalo_keyframe: int, por_lectura: bool) -> None:
+        self.umbral_nota = umbral_nota
+        self.intervalo_keyframe = max(1, intervalo_keyframe)
+        self.por_lectura = por_lectura
+        self.publicaciones = 0
+        self.ultimo_fue_keyframe = False
+        self.ultimas_notas: dict[tuple[str, str], float] = {}
+
+    @classmethod
+    def desde_config(cls, config_sensores: dict[str, object]) -> "FiltroBandaMuerta | None":
+        config_banda = dict(config_sensores.get("banda_muerta", {}))
+        if not bool(config_banda.get("activa", False)):
+            return None
+        return cls(
+            umbral_nota=float(config_banda.get("umbral_nota", 0.0)),
+            intervalo_keyframe=int(config_banda.get("intervalo_keyframe", 10)),
+            por_lectura=bool(config_sensores.get("agrupar_por_interseccion", False)),
+        )
+
+    def cambio(self, evento: EventoSensor) -> bool:
+        ultima = self.ultimas_notas.get((evento.via_id, evento.tipo_sensor))
+        return ultima is None or abs(float(evento.datos["nota"]) - ultima) > self.umbral_nota
+
+    def filtrar(self, tramas: list[TramaSensores]) -> list[TramaSensores]:
+        self.ultimo_fue_keyframe = self.publicaciones % self.intervalo_keyframe == 0
+        self.publicaciones += 1
+        resultado: list[TramaSensores] = []
+        for trama in tramas:
+            cambiadas = [evento for evento in trama.eventos if self.ultimo_fue_keyframe or self.cambio(evento)]
+            if not cambiadas:
+                continue
+            if self.por_lectura:
+                trama.eventos = cambiadas
+            for evento in trama.eventos:
+                self.ultimas_notas[(evento.via_id, evento.tipo_sensor)] = float(evento.datos["nota"])
+            resultado.append(trama)
+        return resultado
+
+
+def construir_tramas(
+    vias_instrumentadas: list[Via],
+    vias_snapshot: dict[str, dict[str, object]],
+    tipos_sensor: list[str],
+    tick_actual: int,
+    intervalo_espira_segundos: int,
+) -> list[TramaSensores]:
+    tramas: dict[int, TramaSensores] = {}
+    for via_instrumentada in vias_instrumentadas:
+        via_id = via_instrumentada.id_via
+        via = vias_snapshot.get(via_id)
+        if via is None:
+            continue
+        trama = tramas.get(via_instrumentada.indice_destino)
+        if trama is None:
+            trama = tramas[via_instrumentada.indice_destino] = TramaSensores.crear(
+                via_instrumentada.destino, tick_actual, via_instrumentada.indice_destino
+            )
+        sufijo = via_id.replace("VIA-", "")
+        for tipo_sensor in tipos_sensor:
+            trama.agregar(
+                sensor_id=f"{tipo_sensor.upper()}-{sufijo}",
+                tipo_sensor=tipo_sensor,
+                via_id=via_id,
+                datos=construir_datos(
+                    tipo_sensor=tipo_sensor,
+                    via=via,
+                    intervalo_espira_segundos=intervalo_espira_segundos,
+                ),
+                indice_via=via_instrumentada.indice,
+            )
+    return list(tramas.values())
+
+
 def main() -> None:
     raiz = Path(__file__).resolve().parents[2]
     config = cargar_configuracion(raiz / "config/system_config.json")
-    ciudad_mapa = CiudadMapa.desde_config(config["ciudad"])
+    ciudad_mapa, identidad_mapa = abrir_mapa_del_servicio(config["ciudad"], raiz, "PC1-Sensores")
     contexto = zmq.Context()
-    publicador = contexto.socket(zmq.PUB)
-    publicador.connect(config["zmq"]["pc1"]["publicador_sensores"])
+    publicadores = []
+    for fragmento in obtener_fragmentos_broker(config):
+        publicador = contexto.socket(zmq.PUB)
+        publicador.connect(fragmento.entrada)
+        publicadores.append(publicador)
     receptor_estado = contexto.socket(zmq.PULL)
     receptor_estado.bind(config["zmq"]["pc1"]["entrada_estado_operativo"])
     emisor_pc0 = contexto.socket(zmq.PUSH)
     emisor_pc0.connect(config["zmq"]["pc0"]["ingesta_historica"])
+    verificar_mapa_con_simulacion(contexto, config["zmq"]["pc0"]["consulta_mapa"], identidad_mapa, "PC1-Sensores")
 
-    vias_instrumentadas = {via.id_via: via.destino for via in ciudad_mapa.obtener_vias_instrumentadas()}
+    vias_instrumentadas = ciudad_mapa.obtener_vias_instrumentadas()
+    ids_instrumentados = {via.id_via for via in vias_instrumentadas}
     intervalo = int(config["sensores"]["intervalo_publicacion_segundos"])
     intervalo_espira = config["sensores"]["intervalo_espira_segundos"]
     tick_segundos = float(config["simulacion"]["tick_segundos_reales"])
     pasos_por_publicacion = max(1, int(round(intervalo / tick_segundos)))
     ultimo_tick_publicado = 0
+    acumulador_snapshots = AcumuladorSnapshotsDelta()
+    formato_mensajes = obtener_formato(config)
+    agrupar_por_interseccion = bool(config["sensores"].get("agrupar_por_interseccion", False))
+    filtro_banda_muerta = FiltroBandaMuerta.desde_config(config["sensores"])
 
     log("PC1-Sensores", "Servicio de sensores iniciado.")
     while True:
-        mensaje = receptor_estado.recv_json()
-        if mensaje["tipo"] != "snapshot_operativo":
+        tipo, recibido = decodificar_mensaje(receptor_estado.recv())
+        if tipo != TIPO_SNAPSHOT_OPERATIVO:
             continue
 
-        snapshot_operativo = SnapshotOperativo.desde_dict(mensaje["datos"])
+        snapshot_operativo = acumulador_snapshots.aplicar(recibido)
+        if snapshot_operativo is None:
+            log(
+                "PC1-Sensores",
+                f"Delta del tick {recibido.tick_actual} descartado por hueco; se espera el siguiente keyframe.",
+            )
+            continue
         tick_actual = snapshot_operativo.tick_actual
         if tick_actual - ultimo_tick_publicado < pasos_por_publicacion:
             continue
         ultimo_tick_publicado = tick_actual
 
         vias_snapshot = {
-            str(via["via_id"]): via for via in snapshot_operativo.vias if str(via["via_id"]) in vias_instrumentadas
+            str(via["via_id"]): via for via in snapshot_operativo.vias if str(via["via_id"]) in ids_instrumentados
         }
         log(
             "PC1-Sensores",
@@ -100,33 +197,52 @@ def main() -> None:
             ),
         )
 
-        for via_id, interseccion in vias_instrumentadas.items():
-            via = vias_snapshot.get(via_id)
-            if via is None:
-                continue
-            sufijo = via_id.replace("VIA-", "")
-            for tipo_sensor in config["sensores"]["tipos"]:
-                evento = EventoSensor.crear(
-                    sensor_id=f"{tipo_sensor.upper()}-{sufijo}",
-                    tipo_sensor=tipo_sensor,
-                    interseccion=interseccion,
-                    via_id=via_id,
-                    tick_origen=tick_actual,
-                    datos=construir_datos(
-                        tipo_sensor=tipo_sensor,
-                        via=via,
-                        intervalo_espira_segundos=intervalo_espira,
+        tramas = construir_tramas(
+            vias_instrumentadas,
+            vias_snapshot,
+            config["sensores"]["tipos"],
+            tick_actual,
+            intervalo_espira,
+        )
+        if filtro_banda_muerta is not None:
+            lecturas = sum(len(trama.eventos) for trama in tramas)
+            tramas = filtro_banda_muerta.filtrar(tramas)
+            publicadas = sum(len(trama.eventos) for trama in tramas)
+            log(
+                "PC1-Sensores",
+                (
+                    f"Banda muerta en tick {tick_actual}: keyframe={filtro_banda_muerta.ultimo_fue_keyframe}, "
+                    f"lecturas_publicadas={publicadas}, lecturas_suprimidas={lecturas - publicadas}."
+                ),
+            )
+
+        for trama in tramas:
+            publicador = publicadores[fragmento_de_interseccion(trama.interseccion, len(publicadores))]
+            if agrupar_por_interseccion:
+                publicador.send_multipart(
+                    [topico_trama(trama.interseccion).encode("utf-8"), codificar_mensaje(trama, formato_mensajes)]
+                )
+                emisor_pc0.send(codificar_sobre(TIPO_TRAMA_SENSORES, trama, formato_mensajes))
+                log(
+                    "PC1-Sensores",
+                    (
+                        f"Publicada trama de {trama.interseccion} con {len(trama.eventos)} lecturas "
+                        f"del tick {tick_actual}."
                     ),
                 )
+                continue
+            for evento in trama.eventos:
                 publicador.send_multipart(
-                    [tipo_sensor.encode("utf-8"), zmq.utils.jsonapi.dumps(evento.a_dict())]
+                    [evento.tipo_sensor.encode("utf-8"), codificar_mensaje(evento, formato_mensajes)]
                 )
-                enviar_mensaje_persistencia(emisor_pc0, "evento_sensor", evento.a_dict())
+                emisor_pc0.send(codificar_sobre(TIPO_EVENTO_SENSOR, evento, formato_mensajes))
                 log(
                     "PC1-Sensores",
-                    f"Publicado evento {tipo_sensor} para {via_id} -> {interseccion}: {evento.datos}",
+                    (
+                        f"Publicado evento {evento.tipo_sensor} para {evento.via_id} -> {evento.interseccion}: "
+                        f"{evento.datos}"
+                    ),
                 )
 
-
 if __name__ == "__main__":
     main()
@@ -6,11 +6,23 @@ from pathlib import Path
 import zmq
 
 from PC2.traffic_ctrl.controlador_semaforos import ControladorSemaforos
+from common.mensajes.codec import (
+    TIPO_COMANDO_SEMAFORO,
+    TIPO_EVENTO_SENSOR,
+    TIPO_SOLICITUD_CONTROL_MANUAL,
+    TIPO_TRAMA_SENSORES,
+    codificar_sobre,
+    decodificar_mensaje,
+    obtener_formato,
+)
 from common.mensajes.comandos import ComandoSemaforo
 from common.mensajes.control_manual import SolicitudControlManual
-from common.mensajes.eventos import EventoSensor
+from common.mensajes.eventos import PREFIJO_TOPICO_TRAMA, EventoSensor, TramaSensores, obtener_topicos_sensores
+from common.modelos.artefacto_mapa import abrir_mapa_del_servicio
 from common.modelos.trafico import CiudadMapa
 from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.consulta_mapa import verificar_mapa_con_simulacion
+from common.utilidades.fragmentos_broker import obtener_fragmentos_broker, seleccionar_fragmentos
 from common.utilidades.logs import log
 from common.utilidades.normalizacion_sensores import (
     clasificar_nota_trafico,
@@ -19,27 +31,73 @@ from common.utilidades.normalizacion_sensores import (
     normalizar_gps,
 )
 
+SENSORES_REQUERIDOS = ("camara", "espira_inductiva", "gps")
+
 
 class ServicioAnalitica:
-    def __init__(self, config: dict[str, object]) -> None:
+    def __init__(
+        self,
+        config: dict[str, object],
+        controlador: ControladorSemaforos | None = None,
+        persistir_comandos: bool = True,
+        registrar_eventos: bool = True,
+        ciudad_mapa: CiudadMapa | None = None,
+    ) -> None:
         self.config = config
-        self.controlador = ControladorSemaforos(config)
-        self.eventos_por_interseccion_tick: dict[str, dict[int, dict[str, dict[str, EventoSensor]]]] = defaultdict(
+        self.controlador = controlador if controlador is not None else ControladorSemaforos(config)
+        self.registrar_eventos = registrar_eventos
+        self.eventos_por_interseccion_tick: dict[int, dict[int, dict[int, dict[str, EventoSensor]]]] = defaultdict(
             lambda: defaultdict(lambda: defaultdict(dict))
         )
+        self.ultimas_lecturas_por_via: dict[int, dict[str, EventoSensor]] = defaultdict(dict)
         self.ultimo_comando_por_interseccion: dict[str, tuple[str, float, float]] = {}
         self.ultimo_tick_decidido_por_interseccion: dict[str, int] = {}
         self.controles_manuales_por_interseccion: dict[str, dict[str, int | str]] = {}
         self.ultimo_tick_observado = 0
+        self.lecturas_conflacionadas = 0
+        self.ticks_conflacionados = 0
         self.pesos = config["analitica"]["pesos"]
-        self.ciudad_mapa = CiudadMapa.desde_config(config["ciudad"])
-        self.contexto = zmq.Context.instance()
-        self.emisor_pc0 = self.contexto.socket(zmq.PUSH)
-        self.emisor_pc0.connect(config["zmq"]["pc0"]["ingesta_historica"])
+        temporizacion = dict(config["analitica"].get("temporizacion", {}))
+        self.verde_base = float(temporizacion.get("verde_base", 15))
+        self.verde_por_gap = float(temporizacion.get("verde_por_gap", 15))
+        self.ciclo_total = float(temporizacion.get("ciclo_total", 30))
+        self.ciudad_mapa = ciudad_mapa if ciudad_mapa is not None else CiudadMapa.desde_config(config["ciudad"])
+        self.cantidad_nodos = len(self.ciudad_mapa.entradas_por_nodo)
+        self.cantidad_vias = len(self.ciudad_mapa.vias_por_indice)
+        self.mascaras_por_interseccion_tick: dict[int, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.bits_por_via: dict[int, tuple[int, dict[str, int]]] = {}
+        self.mascara_completa_por_interseccion: dict[int, int] = {}
+        self.indexar_lecturas_requeridas()
+        self.formato_mensajes = obtener_formato(config)
+        self.emisor_pc0: zmq.Socket | None = None
+        if persistir_comandos:
+            self.emisor_pc0 = zmq.Context.instance().socket(zmq.PUSH)
+            self.emisor_pc0.connect(config["zmq"]["pc0"]["ingesta_historica"])
+
+    def indexar_lecturas_requeridas(self) -> None:
+        for interseccion in self.ciudad_mapa.intersecciones.values():
+            vias_entrada = self.ciudad_mapa.obtener_vias_de_entrada(interseccion.id_interseccion)
+            for posicion, via in enumerate(vias_entrada):
+                self.bits_por_via[via.indice] = (
+                    interseccion.indice,
+                    {
+                        tipo_sensor: 1 << (posicion * len(SENSORES_REQUERIDOS) + desplazamiento)
+                        for desplazamiento, tipo_sensor in enumerate(SENSORES_REQUERIDOS)
+                    },
+                )
+            self.mascara_completa_por_interseccion[interseccion.indice] = (
+                1 << len(vias_entrada) * len(SENSORES_REQUERIDOS)
+            ) - 1
+
+    def marcar_lectura(self, indice_interseccion: int, tick_origen: int, indice_via: int, tipo_sensor: str) -> None:
+        interseccion_via, bits = self.bits_por_via.get(indice_via, (-1, {}))
+        if interseccion_via == indice_interseccion:
+            self.mascaras_por_interseccion_tick[indice_interseccion][tick_origen] |= bits.get(tipo_sensor, 0)
 
     def persistir_comando(self, comando: ComandoSemaforo) -> None:
-        carga = {"tipo": "comando_semaforo", "datos": comando.a_dict()}
-        self.emisor_pc0.send_json(carga)
+        if self.emisor_pc0 is None:
+            return
+        self.emisor_pc0.send(codificar_sobre(TIPO_COMANDO_SEMAFORO, comando, self.formato_mensajes))
 
     def control_manual_activo(self, interseccion: str, tick_origen: int) -> bool:
         control = self.controles_manuales_por_interseccion.get(interseccion)
@@ -119,13 +177,7 @@ class ServicioAnalitica:
             return float(datos["nota"])
         return normalizar_gps(float(datos["velocidad_promedio"]))
 
-    def calcular_score_via(
-        self,
-        interseccion: str,
-        tick_origen: int,
-        via_id: str,
-    ) -> tuple[float, dict[str, float]]:
-        eventos = self.eventos_por_interseccion_tick[interseccion][tick_origen][via_id]
+    def calcular_score_via(self, eventos: dict[str, EventoSensor]) -> tuple[float, dict[str, float]]:
         nota_camara = self.obtener_nota_camara(eventos["camara"].datos)
         nota_espira = self.obtener_nota_espira(eventos["espira_inductiva"].datos)
         nota_gps = self.obtener_nota_gps(eventos["gps"].datos)
@@ -141,16 +193,16 @@ class ServicioAnalitica:
         }
 
     def calcular_scores_por_eje(
-        self, interseccion: str, tick_origen: int
+        self, indice_interseccion: int, buffer_tick: dict[int, dict[str, EventoSensor]]
     ) -> tuple[dict[str, float], dict[str, tuple[float, dict[str, float]]]]:
-        vias_entrada = self.ciudad_mapa.obtener_vias_de_entrada(interseccion)
+        vias_entrada = self.ciudad_mapa.entradas_por_nodo[indice_interseccion]
         scores_via: dict[str, tuple[float, dict[str, float]]] = {}
         scores_por_eje: dict[str, list[float]] = {"HORIZONTAL": [], "VERTICAL": []}
         for via in vias_entrada:
-            resultado = self.calcular_score_via(interseccion, tick_origen, via.id_via)
+            resultado = self.calcular_score_via(buffer_tick[via.indice])
             scores_via[via.id_via] = resultado
             score_via, _ = resultado
-            self.ciudad_mapa.vias[via.id_via].score = score_via
+            via.score = score_via
             scores_por_eje[via.eje].append(score_via)
 
         agregados = {
@@ -159,18 +211,17 @@ class ServicioAnalitica:
         }
         return agregados, scores_via
 
-    def tick_listo_para_interseccion(self, interseccion: str, tick_origen: int) -> bool:
-        requeridos = {"camara", "espira_inductiva", "gps"}
-        buffer_tick = self.eventos_por_interseccion_tick[interseccion][tick_origen]
-        for via in self.ciudad_mapa.obtener_vias_de_entrada(interseccion):
-            if not requeridos.issubset(buffer_tick.get(via.id_via, {}).keys()):
-                return False
-        return True
+    def tick_listo_para_interseccion(self, indice_interseccion: int, tick_origen: int) -> bool:
+        mascara = self.mascaras_por_interseccion_tick[indice_interseccion].get(tick_origen, 0)
+        return mascara == self.mascara_completa_por_interseccion.get(indice_interseccion, 0)
 
-    def depurar_ticks_antiguos(self, interseccion: str, tick_origen: int) -> None:
-        ticks = self.eventos_por_interseccion_tick[interseccion]
+    def depurar_ticks_antiguos(self, indice_interseccion: int, tick_origen: int) -> None:
+        ticks = self.eventos_por_interseccion_tick[indice_interseccion]
         for tick in [tick_existente for tick_existente in ticks if tick_existente < tick_origen]:
             del ticks[tick]
+        mascaras = self.mascaras_por_interseccion_tick[indice_interseccion]
+        for tick in [tick_existente for tick_existente in mascaras if tick_existente < tick_origen]:
+            del mascaras[tick]
 
     def decidir_fase(
         self, interseccion: str, score_horizontal: float, score_vertical: float
@@ -186,114 +237,308 @@ class ServicioAnalitica:
         else:
             fase = fase_actual
             razon = "Empate de scores por eje; se mantiene la fase actual."
-        tiempo_verde = 15 + 15 * gap
-        tiempo_opuesto = 30 - tiempo_verde
+        tiempo_verde = self.verde_base + self.verde_por_gap * gap
+        tiempo_opuesto = self.ciclo_total - tiempo_verde
         return fase, round(tiempo_verde, 2), round(tiempo_opuesto, 2), razon
 
-    def procesar_evento(self, evento: EventoSensor) -> None:
+    def almacenar_evento(self, evento: EventoSensor) -> tuple[int, dict[int, dict[str, EventoSensor]]] | None:
         self.ultimo_tick_observado = max(self.ultimo_tick_observado, evento.tick_origen)
-        buffer_tick = self.eventos_por_interseccion_tick[evento.interseccion][evento.tick_origen]
-        buffer_tick[evento.via_id][evento.tipo_sensor] = evento
-        log(
-            "PC2-Analitica",
-            (
-                f"Evento recibido en {evento.interseccion}, via {evento.via_id}, "
-                f"sensor {evento.tipo_sensor}, tick={evento.tick_origen}."
-            ),
-        )
+        indice_interseccion = evento.indice_interseccion
+        if not 0 <= indice_interseccion < self.cantidad_nodos:
+            indice_interseccion = self.ciudad_mapa.nombres_nodos.buscar(evento.interseccion)
+        indice_via = evento.indice_via
+        if not 0 <= indice_via < self.cantidad_vias:
+            indice_via = self.ciudad_mapa.nombres_vias.buscar(evento.via_id)
+        if indice_interseccion < 0 or indice_via < 0:
+            log(
+                "PC2-Analitica",
+                f"Evento ignorado: {evento.interseccion} o {evento.via_id} no existe en el mapa.",
+            )
+            return None
+        buffer_tick = self.eventos_por_interseccion_tick[indice_interseccion][evento.tick_origen]
+        buffer_tick[indice_via][evento.tipo_sensor] = evento
+        self.marcar_lectura(indice_interseccion, evento.tick_origen, indice_via, evento.tipo_sensor)
+        ultimas_lecturas = self.ultimas_lecturas_por_via[indice_via]
+        anterior = ultimas_lecturas.get(evento.tipo_sensor)
+        if anterior is None or anterior.tick_origen <= evento.tick_origen:
+            ultimas_lecturas[evento.tipo_sensor] = evento
+        return indice_interseccion, buffer_tick
+
+    def arrastrar_ultimas_lecturas(
+        self,
+        tick_origen: int,
+        indice_interseccion: int,
+        buffer_tick: dict[int, dict[str, EventoSensor]],
+    ) -> None:
+        for via in self.ciudad_mapa.entradas_por_nodo[indice_interseccion]:
+            lecturas_tick = buffer_tick[via.indice]
+            for tipo_sensor, evento in self.ultimas_lecturas_por_via.get(via.indice, {}).items():
+                if tipo_sensor not in lecturas_tick:
+                    lecturas_tick[tipo_sensor] = evento
+                    self.marcar_lectura(indice_interseccion, tick_origen, via.indice, tipo_sensor)
+
+    def procesar_evento(self, evento: EventoSensor) -> None:
+        almacenado = self.almacenar_evento(evento)
+        if almacenado is None:
+            return
+        if self.registrar_eventos:
+            log(
+                "PC2-Analitica",
+                (
+                    f"Evento recibido en {evento.interseccion}, via {evento.via_id}, "
+                    f"sensor {evento.tipo_sensor}, tick={evento.tick_origen}."
+                ),
+            )
+        self.evaluar_tick(evento.interseccion, evento.tick_origen, *almacenado)
+
+    def procesar_trama(self, trama: TramaSensores) -> None:
+        almacenado = None
+        for evento in trama.eventos:
+            almacenado = self.almacenar_evento(evento) or almacenado
+        if almacenado is None:
+            return
+        if self.registrar_eventos:
+            log(
+                "PC2-Analitica",
+                (
+                    f"Trama recibida de {trama.interseccion} con {len(trama.eventos)} lecturas, "
+                    f"tick={trama.tick_origen}."
+                ),
+            )
+        self.arrastrar_ultimas_lecturas(trama.tick_origen, *almacenado)
+        self.evaluar_tick(trama.interseccion, trama.tick_origen, *almacenado)
+
+    def procesar_mensaje(self, mensaje: EventoSensor | TramaSensores) -> None:
+        if isinstance(mensaje, TramaSensores):
+            self.procesar_trama(mensaje)
+        else:
+            self.procesar_evento(mensaje)
+
+    def procesar_lote(self, mensajes: list[EventoSensor | TramaSensores]) -> None:
+        mensajes_por_interseccion: dict[str, list[EventoSensor | TramaSensores]] = defaultdict(list)
+        for mensaje in mensajes:
+            mensajes_por_interseccion[mensaje.interseccion].append(mensaje)
+        for interseccion, pendientes in mensajes_por_interseccion.items():
+            ticks = {mensaje.tick_origen for mensaje in pendientes}
+            if len(ticks) == 1:
+                for mensaje in pendientes:
+                    self.procesar_mensaje(mensaje)
+                continue
+            almacenados: dict[int, tuple[int, dict[int, dict[str, EventoSensor]]]] = {}
+            lecturas_por_tick: dict[int, int] = defaultdict(int)
+            for mensaje in sorted(pendientes, key=lambda mensaje: mensaje.tick_origen):
+                eventos = mensaje.eventos if isinstance(mensaje, TramaSensores) else (mensaje,)
+                lecturas_por_tick[mensaje.tick_origen] += len(eventos)
+                almacenado = None
+                for evento in eventos:
+                    almacenado = self.almacenar_evento(evento) or almacenado
+                if almacenado is None:
+                    continue
+                almacenados[mensaje.tick_origen] = almacenado
+                if isinstance(mensaje, TramaSensores):
+                    self.arrastrar_ultimas_lecturas(mensaje.tick_origen, *almacenado)
+            ultimo_tick_decidido = self.ultimo_tick_decidido_por_interseccion.get(interseccion, -1)
+            tick_completo = next(
+                (
+                    tick
+                    for tick in sorted(almacenados, reverse=True)
+                    if tick > ultimo_tick_decidido and self.tick_listo_para_interseccion(almacenados[tick][0], tick)
+                ),
+                None,
+            )
+            if tick_completo is None:
+                continue
+            self.evaluar_tick(interseccion, tick_completo, *almacenados[tick_completo])
+            if self.ultimo_tick_decidido_por_interseccion.get(interseccion) != tick_completo:
+                continue
+            descartados = [tick for tick in ticks if tick < tick_completo]
+            self.ticks_conflacionados += len(descartados)
+            self.lecturas_conflacionadas += sum(lecturas_por_tick[tick] for tick in descartados)
+
+    def calentar(self, eventos: list[EventoSensor]) -> int:
+        lecturas_por_interseccion: dict[str, list[EventoSensor]] = defaultdict(list)
+        for evento in eventos:
+            lecturas_por_interseccion[evento.interseccion].append(evento)
+        for interseccion, lecturas in lecturas_por_interseccion.items():
+            lecturas.sort(key=lambda evento: evento.tick_origen)
+            trama = TramaSensores.crear(interseccion, lecturas[-1].tick_origen)
+            trama.eventos = lecturas
+            self.procesar_trama(trama)
+        return len(lecturas_por_interseccion)
 
-        ultimo_tick_decidido = self.ultimo_tick_decidido_por_interseccion.get(evento.interseccion, -1)
-        if evento.tick_origen <= ultimo_tick_decidido:
+    def evaluar_tick(
+        self,
+        interseccion: str,
+        tick_origen: int,
+        indice_interseccion: int,
+        buffer_tick: dict[int, dict[str, EventoSensor]],
+    ) -> None:
+        ultimo_tick_decidido = self.ultimo_tick_decidido_por_interseccion.get(interseccion, -1)
+        if tick_origen <= ultimo_tick_decidido:
             return
 
-        if self.control_manual_activo(evento.interseccion, evento.tick_origen):
+        if self.control_manual_activo(interseccion, tick_origen):
             return
 
-        if not self.tick_listo_para_interseccion(evento.interseccion, evento.tick_origen):
+        if not self.tick_listo_para_interseccion(indice_interseccion, tick_origen):
             return
 
-        scores_eje, scores_via = self.calcular_scores_por_eje(evento.interseccion, evento.tick_origen)
+        scores_eje, scores_via = self.calcular_scores_por_eje(indice_interseccion, buffer_tick)
         score_horizontal = scores_eje["HORIZONTAL"]
         score_vertical = scores_eje["VERTICAL"]
         score_global = max(score_horizontal, score_vertical)
 
         fase, tiempo_verde, tiempo_opuesto, razon = self.decidir_fase(
-            evento.interseccion,
+            interseccion,
             score_horizontal,
             score_vertical,
         )
-        self.ultimo_tick_decidido_por_interseccion[evento.interseccion] = evento.tick_origen
-        self.depurar_ticks_antiguos(evento.interseccion, evento.tick_origen)
+        self.ultimo_tick_decidido_por_interseccion[interseccion] = tick_origen
+        self.depurar_ticks_antiguos(indice_interseccion, tick_origen)
         firma_comando = (fase, tiempo_verde, tiempo_opuesto)
-        if self.ultimo_comando_por_interseccion.get(evento.interseccion) == firma_comando:
+        if self.ultimo_comando_por_interseccion.get(interseccion) == firma_comando:
             return
 
         comando = ComandoSemaforo.crear(
-            interseccion=evento.interseccion,
+            interseccion=interseccion,
             fase_ganadora=fase,
             tiempo_verde=tiempo_verde,
             tiempo_opuesto=tiempo_opuesto,
             razon=(
-                f"{razon} Tick={evento.tick_origen}. Scores por eje -> horizontal={score_horizontal:.4f}, "
+                f"{razon} Tick={tick_origen}. Scores por eje -> horizontal={score_horizontal:.4f}, "
                 f"vertical={score_vertical:.4f}. "
                 f"Categoria global={clasificar_nota_trafico(score_global)}"
             ),
-            tick_origen=evento.tick_origen,
+            tick_origen=tick_origen,
         )
         self.ciudad_mapa.aplicar_programacion_semaforo(
-            interseccion_id=evento.interseccion,
+            interseccion_id=interseccion,
             fase_ganadora=fase,
             tiempo_verde=tiempo_verde,
             tiempo_opuesto=tiempo_opuesto,
         )
-        self.ultimo_comando_por_interseccion[evento.interseccion] = firma_comando
+        self.ultimo_comando_por_interseccion[interseccion] = firma_comando
 
-        detalle_vias = ", ".join(
-            (
-                f"{via_id}={score_via:.4f}"
-                f"(c={notas['camara']:.4f},e={notas['espira_inductiva']:.4f},g={notas['gps']:.4f})"
+        if self.registrar_eventos:
+            detalle_vias = ", ".join(
+                (
+                    f"{via_id}={score_via:.4f}"
+                    f"(c={notas['camara']:.4f},e={notas['espira_inductiva']:.4f},g={notas['gps']:.4f})"
+                )
+                for via_id, (score_via, notas) in sorted(scores_via.items())
+            )
+            log(
+                "PC2-Analitica",
+                (
+                    f"Interseccion {interseccion} en tick {tick_origen}: "
+                    f"score_horizontal={score_horizontal:.4f}, "
+                    f"score_vertical={score_vertical:.4f}. "
+                    f"Detalle por via: {detalle_vias}"
+                ),
             )
-            for via_id, (score_via, notas) in sorted(scores_via.items())
-        )
-        log(
-            "PC2-Analitica",
-            (
-                f"Interseccion {evento.interseccion} en tick {evento.tick_origen}: "
-                f"score_horizontal={score_horizontal:.4f}, "
-                f"score_vertical={score_vertical:.4f}. "
-                f"Detalle por via: {detalle_vias}"
-            ),
-        )
         self.controlador.aplicar_comando(comando)
         self.persistir_comando(comando)
 
 
+def decodificar_sensores(topico: bytes, carga: bytes) -> EventoSensor | TramaSensores:
+    if topico.startswith(PREFIJO_TOPICO_TRAMA.encode("utf-8")):
+        return decodificar_mensaje(carga, TIPO_TRAMA_SENSORES)[1]
+    return decodificar_mensaje(carga, TIPO_EVENTO_SENSOR)[1]
+
+
+def solicitar_instantanea(contexto: zmq.Context, endpoint: str, espera_milisegundos: int) -> list[EventoSensor] | None:
+    solicitante = contexto.socket(zmq.REQ)
+    solicitante.setsockopt(zmq.LINGER, 0)
+    solicitante.setsockopt(zmq.RCVTIMEO, espera_milisegundos)
+    solicitante.connect(endpoint)
+    try:
+        solicitante.send(b"")
+        _, *cargas = solicitante.recv_multipart()
+    except zmq.Again:
+        return None
+    finally:
+        solicitante.close()
+    return [decodificar_mensaje(carga, TIPO_EVENTO_SENSOR)[1] for carga in cargas]
+
+
 def main() -> None:
     raiz = Path(__file__).resolve().parents[2]
     config = cargar_configuracion(raiz / "config/system_config.json")
-    servicio = ServicioAnalitica(config)
+    ciudad_mapa, identidad_mapa = abrir_mapa_del_servicio(config["ciudad"], raiz, "PC2-Analitica")
+    servicio = ServicioAnalitica(config, ciudad_mapa=ciudad_mapa)
 
     contexto = zmq.Context()
+    verificar_mapa_con_simulacion(contexto, config["zmq"]["pc0"]["consulta_mapa"], identidad_mapa, "PC2-Analitica")
     suscriptor = contexto.socket(zmq.SUB)
-    suscriptor.connect(config["zmq"]["pc1"]["salida_broker"])
-    for topico in config["sensores"]["tipos"]:
+    fragmentos = seleccionar_fragmentos(
+        obtener_fragmentos_broker(config), list(config["analitica"].get("fragmentos_suscritos", []))
+    )
+    for fragmento in fragmentos:
+        suscriptor.connect(fragmento.salida)
+    for topico in obtener_topicos_sensores(config["sensores"]):
         suscriptor.setsockopt_string(zmq.SUBSCRIBE, topico)
+    config_conflacion = dict(config["analitica"].get("conflacion", {}))
+    conflacion_activa = bool(config_conflacion.get("activa", False))
+    lote_maximo = max(1, int(config_conflacion.get("lote_maximo", 1000)))
     receptor_control_manual = contexto.socket(zmq.PULL)
     receptor_control_manual.bind(config["zmq"]["pc2"]["entrada_control_manual"])
     poller = zmq.Poller()
     poller.register(suscriptor, zmq.POLLIN)
     poller.register(receptor_control_manual, zmq.POLLIN)
 
-    log("PC2-Analitica", "Servicio de analitica iniciado.")
+    log(
+        "PC2-Analitica",
+        f"Servicio de analitica iniciado; fragmentos del broker={[fragmento.indice for fragmento in fragmentos]}.",
+    )
+    config_calentamiento = dict(config["analitica"].get("calentamiento", {}))
+    if bool(config_calentamiento.get("activo", False)):
+        for fragmento in fragmentos:
+            if not fragmento.instantaneas:
+                continue
+            lecturas = solicitar_instantanea(
+                contexto, fragmento.instantaneas, int(config_calentamiento.get("espera_milisegundos", 2000))
+            )
+            if lecturas is None:
+                log(
+                    "PC2-Analitica",
+                    f"Sin instantanea del fragmento {fragmento.indice}; se espera el siguiente ciclo de sensores.",
+                )
+                continue
+            intersecciones = servicio.calentar(lecturas)
+            log(
+                "PC2-Analitica",
+                (
+                    f"Calentamiento desde el fragmento {fragmento.indice}: lecturas={len(lecturas)}, "
+                    f"intersecciones={intersecciones}."
+                ),
+            )
     while True:
         eventos = dict(poller.poll())
         if receptor_control_manual in eventos:
-            solicitud = SolicitudControlManual.desde_dict(receptor_control_manual.recv_json())
+            _, solicitud = decodificar_mensaje(receptor_control_manual.recv(), TIPO_SOLICITUD_CONTROL_MANUAL)
             servicio.aplicar_control_manual(solicitud)
         if suscriptor in eventos:
-            _, carga = suscriptor.recv_multipart()
-            evento = EventoSensor.desde_dict(zmq.utils.jsonapi.loads(carga))
-            servicio.procesar_evento(evento)
+            mensajes = [decodificar_sensores(*suscriptor.recv_multipart())]
+            if not conflacion_activa:
+                servicio.procesar_mensaje(mensajes[0])
+                continue
+            while len(mensajes) < lote_maximo:
+                try:
+                    mensajes.append(decodificar_sensores(*suscriptor.recv_multipart(zmq.NOBLOCK)))
+                except zmq.Again:
+                    break
+            descartadas_antes = servicio.lecturas_conflacionadas
+            servicio.procesar_lote(mensajes)
+            if servicio.lecturas_conflacionadas > descartadas_antes:
+                log(
+                    "PC2-Analitica",
+                    (
+                        f"Sobrecarga: lote de {len(mensajes)} mensajes conflacionado; "
+                        f"lecturas_descartadas={servicio.lecturas_conflacionadas - descartadas_antes}, "
+                        f"total_lecturas_descartadas={servicio.lecturas_conflacionadas}, "
+                        f"total_ticks_descartados={servicio.ticks_conflacionados}."
+                    ),
+                )
 
 
 if __name__ == "__main__":
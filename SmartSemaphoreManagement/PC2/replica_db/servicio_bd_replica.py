@@ -4,6 +4,7 @@ from pathlib import Path
 
 import zmq
 
+from common.mensajes.codec import TIPO_SNAPSHOT_OPERATIVO, decodificar_mensaje
 from common.utilidades.configuracion import cargar_configuracion
 from common.utilidades.logs import log
 from common.utilidades.persistencia_sqlite import RepositorioSQLite
@@ -28,12 +29,15 @@ def main() -> None:
     while True:
         eventos = dict(poller.poll())
         if receptor in eventos:
-            mensaje = receptor.recv_json()
-            tipo = mensaje["tipo"]
-            datos = mensaje["datos"]
-            if tipo == "snapshot_operativo":
-                repositorio.guardar_snapshot_operativo(datos)
-                log("PC2-ReplicaDB", "Snapshot operativo replicado.")
+            tipo, mensaje = decodificar_mensaje(receptor.recv())
+            if tipo == TIPO_SNAPSHOT_OPERATIVO:
+                if repositorio.guardar_snapshot_operativo(mensaje.a_dict()):
+                    log("PC2-ReplicaDB", "Snapshot operativo replicado.")
+                else:
+                    log(
+                        "PC2-ReplicaDB",
+                        f"Delta del tick {mensaje.tick_actual} descartado por hueco; se espera el siguiente keyframe.",
+                    )
 
         if sincronizador in eventos:
             solicitud = sincronizador.recv_json()
@@ -4,6 +4,7 @@ from pathlib import Path
 
 import zmq
 
+from common.mensajes.codec import codificar_mensaje, obtener_formato
 from common.mensajes.comandos import ComandoSemaforo
 from common.utilidades.configuracion import cargar_configuracion
 from common.utilidades.logs import log
@@ -14,12 +15,13 @@ class ControladorSemaforos:
         if config is None:
             raiz = Path(__file__).resolve().parents[2]
             config = cargar_configuracion(raiz / "config/system_config.json")
+        self.formato_mensajes = obtener_formato(config)
         self.contexto = zmq.Context.instance()
         self.emisor = self.contexto.socket(zmq.PUSH)
         self.emisor.connect(config["zmq"]["pc0"]["entrada_comandos"])
 
     def aplicar_comando(self, comando: ComandoSemaforo) -> None:
-        self.emisor.send_json(comando.a_dict())
+        self.emisor.send(codificar_mensaje(comando, self.formato_mensajes))
         log(
             "PC2-Semaforos",
             (
@@ -4,6 +4,7 @@ from pathlib import Path
 
 import zmq
 
+from common.mensajes.codec import TIPO_SNAPSHOT_OPERATIVO, decodificar_mensaje
 from common.utilidades.configuracion import cargar_configuracion
 from common.utilidades.logs import log
 from common.utilidades.persistencia_sqlite import RepositorioSQLite
@@ -53,11 +54,14 @@ def main() -> None:
 
     log("PC3-MainDB", "Servicio de base principal iniciado.")
     while True:
-        mensaje = receptor.recv_json()
-        tipo = mensaje["tipo"]
-        datos = mensaje["datos"]
-        if tipo == "snapshot_operativo":
-            repositorio.guardar_snapshot_operativo(datos)
+        tipo, mensaje = decodificar_mensaje(receptor.recv())
+        if tipo == TIPO_SNAPSHOT_OPERATIVO:
+            if not repositorio.guardar_snapshot_operativo(mensaje.a_dict()):
+                log(
+                    "PC3-MainDB",
+                    f"Delta del tick {mensaje.tick_actual} descartado por hueco; se espera el siguiente keyframe.",
+                )
+                continue
             log("PC3-MainDB", f"Persistido mensaje de tipo {tipo}.")
 
 
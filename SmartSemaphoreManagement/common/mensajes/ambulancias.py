@@ -9,6 +9,7 @@ class SolicitudAmbulancia:
     nodo_origen: str
     velocidad: float | None
     timestamp: str
+    nodo_destino: str | None = None
 
     def a_dict(self) -> dict[str, object]:
         return asdict(self)
@@ -18,18 +19,22 @@ class SolicitudAmbulancia:
         cls,
         nodo_origen: str,
         velocidad: float | None = None,
+        nodo_destino: str | None = None,
     ) -> "SolicitudAmbulancia":
         return cls(
             nodo_origen=nodo_origen,
             velocidad=velocidad,
             timestamp=datetime.now(timezone.utc).isoformat(),
+            nodo_destino=nodo_destino,
         )
 
     @classmethod
     def desde_dict(cls, datos: dict[str, object]) -> "SolicitudAmbulancia":
         velocidad = datos.get("velocidad")
+        nodo_destino = datos.get("nodo_destino")
         return cls(
             nodo_origen=str(datos["nodo_origen"]),
             velocidad=float(velocidad) if velocidad is not None else None,
             timestamp=str(datos["timestamp"]),
+            nodo_destino=str(nodo_destino) if nodo_destino is not None else None,
         )
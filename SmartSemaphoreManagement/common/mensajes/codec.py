@@ -0,0 +1,565 @@
+from __future__ import annotations
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from common.mensajes.ambulancias import SolicitudAmbulancia
+from common.mensajes.comandos import ComandoSemaforo
+from common.mensajes.control_manual import SolicitudControlManual
+from common.mensajes.estado_operativo import SnapshotOperativo
+from common.mensajes.eventos import EventoSensor, TramaSensores
+
+FORMATO_JSON = "json"
+FORMATO_BINARIO = "binario"
+MARCA_JSON = ord("{")
+MARCA_BINARIA = 0xB1
+ESCAPE = 0xFF
+SIN_MARCA_TIEMPO = -(2**63)
+EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+TIPO_EVENTO_SENSOR = "evento_sensor"
+TIPO_COMANDO_SEMAFORO = "comando_semaforo"
+TIPO_SNAPSHOT_OPERATIVO = "snapshot_operativo"
+TIPO_SOLICITUD_AMBULANCIA = "solicitud_ambulancia"
+TIPO_SOLICITUD_CONTROL_MANUAL = "solicitud_control_manual"
+TIPO_TRAMA_SENSORES = "trama_sensores"
+
+EJES = ("HORIZONTAL", "VERTICAL")
+DIRECCIONES = ("NORTE", "SUR", "ESTE", "OESTE")
+ESTADOS_VEHICULO = ("CIRCULANDO", "EN_COLA")
+TIPOS_VEHICULO = ("NORMAL", "AMBULANCIA")
+ESTADOS_CONGESTION = ("BAJA", "NORMAL", "ALTA")
+TIPOS_SENSOR = ("camara", "espira_inductiva", "gps")
+TIPOS_SNAPSHOT = ("KEYFRAME", "DELTA")
+CLAVES_DATOS = (
+    "volumen",
+    "velocidad_promedio",
+    "nota",
+    "categoria_trafico",
+    "vehiculos_en_transito",
+    "intervalo_segundos",
+    "nivel_congestion",
+)
+TEXTOS_DATOS = ("BAJO", "MODERADO", "INTENSO")
+
+ENTERO = struct.Struct("<q")
+FLOTANTE = struct.Struct("<d")
+NUMEROS_INTERSECCION = struct.Struct("<iii")
+NUMEROS_VIA = struct.Struct("<diidid")
+NUMEROS_VEHICULO = struct.Struct("<dd")
+NUMEROS_COMANDO = struct.Struct("<ddq")
+
+ETIQUETA_NULO = 0
+ETIQUETA_FALSO = 1
+ETIQUETA_VERDADERO = 2
+ETIQUETA_ENTERO = 3
+ETIQUETA_FLOTANTE = 4
+ETIQUETA_TEXTO = 5
+ETIQUETA_TEXTO_INTERNADO = 6
+ETIQUETA_LISTA = 7
+ETIQUETA_DICCIONARIO = 8
+
+
+def obtener_formato(config: dict[str, Any]) -> str:
+    formato = str(config.get("mensajeria", {}).get("formato", FORMATO_JSON))
+    if formato not in (FORMATO_JSON, FORMATO_BINARIO):
+        raise ValueError(f"Formato de mensajeria no soportado: {formato}")
+    return formato
+
+
+def indexar_tabla(tabla: tuple[str, ...]) -> dict[str, int]:
+    return {valor: indice for indice, valor in enumerate(tabla)}
+
+
+INDICE_EJES = indexar_tabla(EJES)
+INDICE_DIRECCIONES = indexar_tabla(DIRECCIONES)
+INDICE_ESTADOS_VEHICULO = indexar_tabla(ESTADOS_VEHICULO)
+INDICE_TIPOS_VEHICULO = indexar_tabla(TIPOS_VEHICULO)
+INDICE_ESTADOS_CONGESTION = indexar_tabla(ESTADOS_CONGESTION)
+INDICE_TIPOS_SENSOR = indexar_tabla(TIPOS_SENSOR)
+INDICE_TIPOS_SNAPSHOT = indexar_tabla(TIPOS_SNAPSHOT)
+INDICE_CLAVES_DATOS = indexar_tabla(CLAVES_DATOS)
+INDICE_TEXTOS_DATOS = indexar_tabla(TEXTOS_DATOS)
+
+
+class EscritorBinario:
+    def __init__(self) -> None:
+        self.salida = bytearray()
+
+    def byte(self, valor: int) -> None:
+        self.salida.append(valor)
+
+    def natural(self, valor: int) -> None:
+        while valor >= 0x80:
+            self.salida.append((valor & 0x7F) | 0x80)
+            valor >>= 7
+        self.salida.append(valor)
+
+    def entero(self, valor: int) -> None:
+        self.salida += ENTERO.pack(valor)
+
+    def flotante(self, valor: float) -> None:
+        self.salida += FLOTANTE.pack(valor)
+
+    def bloque(self, datos: bytes) -> None:
+        self.salida += datos
+
+    def texto(self, valor: str) -> None:
+        datos = valor.encode("utf-8")
+        self.natural(len(datos))
+        self.salida += datos
+
+    def enumerado(self, valor: str, indices: dict[str, int]) -> None:
+        indice = indices.get(valor)
+        if indice is None:
+            self.salida.append(ESCAPE)
+            self.texto(valor)
+            return
+        self.salida.append(indice)
+
+    def marca_tiempo(self, valor: str) -> None:
+        try:
+            instante = datetime.fromisoformat(valor)
+        except ValueError:
+            instante = None
+        if instante is not None and instante.utcoffset() == timedelta(0):
+            micros = (instante - EPOCA) // timedelta(microseconds=1)
+            if (EPOCA + timedelta(microseconds=micros)).isoformat() == valor:
+                self.entero(micros)
+                return
+        self.entero(SIN_MARCA_TIEMPO)
+        self.texto(valor)
+
+    def valor(self, valor: Any) -> None:
+        if valor is None:
+            self.salida.append(ETIQUETA_NULO)
+        elif valor is True:
+            self.salida.append(ETIQUETA_VERDADERO)
+        elif valor is False:
+            self.salida.append(ETIQUETA_FALSO)
+        elif isinstance(valor, int):
+            self.salida.append(ETIQUETA_ENTERO)
+            self.entero(valor)
+        elif isinstance(valor, float):
+            self.salida.append(ETIQUETA_FLOTANTE)
+            self.flotante(valor)
+        elif isinstance(valor, str):
+            indice = INDICE_TEXTOS_DATOS.get(valor)
+            if indice is None:
+                self.salida.append(ETIQUETA_TEXTO)
+                self.texto(valor)
+            else:
+                self.salida.append(ETIQUETA_TEXTO_INTERNADO)
+                self.salida.append(indice)
+        elif isinstance(valor, (list, tuple)):
+            self.salida.append(ETIQUETA_LISTA)
+            self.natural(len(valor))
+            for elemento in valor:
+                self.valor(elemento)
+        elif isinstance(valor, dict):
+            self.salida.append(ETIQUETA_DICCIONARIO)
+            self.natural(len(valor))
+            for clave, elemento in valor.items():
+                self.enumerado(str(clave), INDICE_CLAVES_DATOS)
+                self.valor(elemento)
+        else:
+            raise TypeError(f"Valor no serializable en formato binario: {type(valor).__name__}")
+
+
+class LectorBinario:
+    def __init__(self, carga: bytes, posicion: int = 0) -> None:
+        self.carga = memoryview(carga)
+        self.posicion = posicion
+
+    def byte(self) -> int:
+        valor = self.carga[self.posicion]
+        self.posicion += 1
+        return valor
+
+    def natural(self) -> int:
+        resultado = 0
+        desplazamiento = 0
+        while True:
+            valor = self.byte()
+            resultado |= (valor & 0x7F) << desplazamiento
+            if valor < 0x80:
+                return resultado
+            desplazamiento += 7
+
+    def estructura(self, formato: struct.Struct) -> tuple[Any, ...]:
+        valores = formato.unpack_from(self.carga, self.posicion)
+        self.posicion += formato.size
+        return valores
+
+    def entero(self) -> int:
+        return self.estructura(ENTERO)[0]
+
+    def flotante(self) -> float:
+        return self.estructura(FLOTANTE)[0]
+
+    def bloque(self, longitud: int) -> memoryview:
+        inicio = self.posicion
+        self.posicion += longitud
+        return self.carga[inicio : self.posicion]
+
+    def texto(self) -> str:
+        longitud = self.natural()
+        inicio = self.posicion
+        self.posicion += longitud
+        return str(self.carga[inicio : self.posicion], "utf-8")
+
+    def enumerado(self, tabla: tuple[str, ...]) -> str:
+        indice = self.byte()
+        if indice == ESCAPE:
+            return self.texto()
+        return tabla[indice]
+
+    def marca_tiempo(self) -> str:
+        micros = self.entero()
+        if micros == SIN_MARCA_TIEMPO:
+            return self.texto()
+        return (EPOCA + timedelta(microseconds=micros)).isoformat()
+
+    def valor(self) -> Any:
+        etiqueta = self.byte()
+        if etiqueta == ETIQUETA_NULO:
+            return None
+        if etiqueta == ETIQUETA_FALSO:
+            return False
+        if etiqueta == ETIQUETA_VERDADERO:
+            return True
+        if etiqueta == ETIQUETA_ENTERO:
+            return self.entero()
+        if etiqueta == ETIQUETA_FLOTANTE:
+            return self.flotante()
+        if etiqueta == ETIQUETA_TEXTO:
+            return self.texto()
+        if etiqueta == ETIQUETA_TEXTO_INTERNADO:
+            return TEXTOS_DATOS[self.byte()]
+        if etiqueta == ETIQUETA_LISTA:
+            return [self.valor() for _ in range(self.natural())]
+        if etiqueta == ETIQUETA_DICCIONARIO:
+            return {self.enumerado(CLAVES_DATOS): self.valor() for _ in range(self.natural())}
+        raise ValueError(f"Etiqueta binaria desconocida: {etiqueta}")
+
+
+def escribir_evento_sensor(escritor: EscritorBinario, evento: EventoSensor) -> None:
+    escritor.texto(evento.sensor_id)
+    escritor.enumerado(evento.tipo_sensor, INDICE_TIPOS_SENSOR)
+    escritor.texto(evento.interseccion)
+    escritor.texto(evento.via_id)
+    escritor.natural(evento.indice_interseccion + 1)
+    escritor.natural(evento.indice_via + 1)
+    escritor.entero(evento.tick_origen)
+    escritor.valor(evento.datos)
+    escritor.marca_tiempo(evento.timestamp)
+
+
+def leer_evento_sensor(lector: LectorBinario) -> EventoSensor:
+    return EventoSensor(
+        sensor_id=lector.texto(),
+        tipo_sensor=lector.enumerado(TIPOS_SENSOR),
+        interseccion=lector.texto(),
+        via_id=lector.texto(),
+        indice_interseccion=lector.natural() - 1,
+        indice_via=lector.natural() - 1,
+        tick_origen=lector.entero(),
+        datos=lector.valor(),
+        timestamp=lector.marca_tiempo(),
+    )
+
+
+def escribir_trama_sensores(escritor: EscritorBinario, trama: TramaSensores) -> None:
+    escritor.texto(trama.interseccion)
+    escritor.natural(trama.indice_interseccion + 1)
+    escritor.entero(trama.tick_origen)
+    escritor.marca_tiempo(trama.timestamp)
+    escritor.natural(len(trama.eventos))
+    for evento in trama.eventos:
+        escritor.texto(evento.sensor_id)
+        escritor.enumerado(evento.tipo_sensor, INDICE_TIPOS_SENSOR)
+        escritor.texto(evento.via_id)
+        escritor.natural(evento.indice_via + 1)
+        escritor.valor(evento.datos)
+
+
+def leer_trama_sensores(lector: LectorBinario) -> TramaSensores:
+    trama = TramaSensores(
+        interseccion=lector.texto(),
+        indice_interseccion=lector.natural() - 1,
+        tick_origen=lector.entero(),
+        eventos=[],
+        timestamp=lector.marca_tiempo(),
+    )
+    for _ in range(lector.natural()):
+        trama.agregar(
+            sensor_id=lector.texto(),
+            tipo_sensor=lector.enumerado(TIPOS_SENSOR),
+            via_id=lector.texto(),
+            indice_via=lector.natural() - 1,
+            datos=lector.valor(),
+        )
+    return trama
+
+
+def escribir_comando_semaforo(escritor: EscritorBinario, comando: ComandoSemaforo) -> None:
+    escritor.texto(comando.interseccion)
+    escritor.enumerado(comando.fase_ganadora, INDICE_EJES)
+    escritor.salida += NUMEROS_COMANDO.pack(comando.tiempo_verde, comando.tiempo_opuesto, comando.tick_origen)
+    escritor.texto(comando.razon)
+    escritor.marca_tiempo(comando.timestamp)
+
+
+def leer_comando_semaforo(lector: LectorBinario) -> ComandoSemaforo:
+    interseccion = lector.texto()
+    fase_ganadora = lector.enumerado(EJES)
+    tiempo_verde, tiempo_opuesto, tick_origen = lector.estructura(NUMEROS_COMANDO)
+    return ComandoSemaforo(
+        interseccion=interseccion,
+        fase_ganadora=fase_ganadora,
+        tiempo_verde=tiempo_verde,
+        tiempo_opuesto=tiempo_opuesto,
+        razon=lector.texto(),
+        tick_origen=tick_origen,
+        timestamp=lector.marca_tiempo(),
+    )
+
+
+def escribir_solicitud_ambulancia(escritor: EscritorBinario, solicitud: SolicitudAmbulancia) -> None:
+    escritor.texto(solicitud.nodo_origen)
+    if solicitud.velocidad is None:
+        escritor.byte(0)
+    else:
+        escritor.byte(1)
+        escritor.flotante(float(solicitud.velocidad))
+    if solicitud.nodo_destino is None:
+        escritor.byte(0)
+    else:
+        escritor.byte(1)
+        escritor.texto(solicitud.nodo_destino)
+    escritor.marca_tiempo(solicitud.timestamp)
+
+
+def leer_solicitud_ambulancia(lector: LectorBinario) -> SolicitudAmbulancia:
+    nodo_origen = lector.texto()
+    velocidad = lector.flotante() if lector.byte() else None
+    nodo_destino = lector.texto() if lector.byte() else None
+    return SolicitudAmbulancia(
+        nodo_origen=nodo_origen,
+        velocidad=velocidad,
+        timestamp=lector.marca_tiempo(),
+        nodo_destino=nodo_destino,
+    )
+
+
+def escribir_solicitud_control_manual(escritor: EscritorBinario, solicitud: SolicitudControlManual) -> None:
+    escritor.texto(solicitud.interseccion)
+    escritor.enumerado(solicitud.fase_ganadora, INDICE_EJES)
+    escritor.entero(solicitud.duracion_ticks)
+    escritor.marca_tiempo(solicitud.timestamp)
+
+
+def leer_solicitud_control_manual(lector: LectorBinario) -> SolicitudControlManual:
+    return SolicitudControlManual(
+        interseccion=lector.texto(),
+        fase_ganadora=lector.enumerado(EJES),
+        duracion_ticks=lector.entero(),
+        timestamp=lector.marca_tiempo(),
+    )
+
+
+def escribir_snapshot_operativo(escritor: EscritorBinario, snapshot: SnapshotOperativo) -> None:
+    escritor.marca_tiempo(snapshot.timestamp)
+    escritor.entero(snapshot.tick_actual)
+    escritor.texto(snapshot.fuente)
+    escritor.natural(snapshot.version_contrato)
+    escritor.enumerado(snapshot.tipo_snapshot, INDICE_TIPOS_SNAPSHOT)
+    if snapshot.tick_base is None:
+        escritor.byte(0)
+    else:
+        escritor.byte(1)
+        escritor.entero(snapshot.tick_base)
+
+    escritor.natural(len(snapshot.intersecciones))
+    for interseccion in snapshot.intersecciones:
+        escritor.texto(interseccion["interseccion_id"])
+        escritor.enumerado(interseccion["fase_activa"], INDICE_EJES)
+        escritor.enumerado(interseccion["fase_alterna"], INDICE_EJES)
+        escritor.salida += NUMEROS_INTERSECCION.pack(
+            interseccion["duracion_fase_activa"],
+            interseccion["duracion_fase_alterna"],
+            interseccion["ticks_restantes_fase"],
+        )
+
+    escritor.natural(len(snapshot.vias))
+    for via in snapshot.vias:
+        escritor.texto(via["via_id"])
+        escritor.texto(via["origen"])
+        escritor.texto(via["destino"])
+        escritor.enumerado(via["direccion"], INDICE_DIRECCIONES)
+        escritor.enumerado(via["eje"], INDICE_EJES)
+        escritor.salida += NUMEROS_VIA.pack(
+            via["longitud"],
+            via["vehiculos_en_circulacion"],
+            via["vehiculos_en_espera"],
+            via["velocidad_promedio"],
+            via["flujo_vehicular"],
+            via["score"],
+        )
+        escritor.enumerado(via["estado_congestion"], INDICE_ESTADOS_CONGESTION)
+
+    escritor.natural(len(snapshot.vehiculos))
+    for vehiculo in snapshot.vehiculos:
+        escritor.natural(vehiculo["vehiculo_id"])
+        escritor.texto(vehiculo["via_actual"])
+        escritor.salida += NUMEROS_VEHICULO.pack(vehiculo["posicion_en_via"], vehiculo["velocidad"])
+        escritor.enumerado(vehiculo["direccion_actual"], INDICE_DIRECCIONES)
+        escritor.enumerado(vehiculo["estado"], INDICE_ESTADOS_VEHICULO)
+        escritor.enumerado(vehiculo["tipo"], INDICE_TIPOS_VEHICULO)
+
+    escritor.natural(len(snapshot.vehiculos_eliminados))
+    for vehiculo_id in snapshot.vehiculos_eliminados:
+        escritor.natural(vehiculo_id)
+
+
+def leer_snapshot_operativo(lector: LectorBinario) -> SnapshotOperativo:
+    timestamp = lector.marca_tiempo()
+    tick_actual = lector.entero()
+    fuente = lector.texto()
+    version_contrato = lector.natural()
+    tipo_snapshot = lector.enumerado(TIPOS_SNAPSHOT)
+    tick_base = lector.entero() if lector.byte() else None
+
+    intersecciones: list[dict[str, Any]] = []
+    for _ in range(lector.natural()):
+        interseccion_id = lector.texto()
+        fase_activa = lector.enumerado(EJES)
+        fase_alterna = lector.enumerado(EJES)
+        duracion_activa, duracion_alterna, ticks_restantes = lector.estructura(NUMEROS_INTERSECCION)
+        intersecciones.append(
+            {
+                "interseccion_id": interseccion_id,
+                "fase_activa": fase_activa,
+                "fase_alterna": fase_alterna,
+                "duracion_fase_activa": duracion_activa,
+                "duracion_fase_alterna": duracion_alterna,
+                "ticks_restantes_fase": ticks_restantes,
+            }
+        )
+
+    vias: list[dict[str, Any]] = []
+    for _ in range(lector.natural()):
+        via_id = lector.texto()
+        origen = lector.texto()
+        destino = lector.texto()
+        direccion = lector.enumerado(DIRECCIONES)
+        eje = lector.enumerado(EJES)
+        longitud, en_circulacion, en_espera, velocidad_promedio, flujo, score = lector.estructura(NUMEROS_VIA)
+        vias.append(
+            {
+                "via_id": via_id,
+                "origen": origen,
+                "destino": destino,
+                "direccion": direccion,
+                "eje": eje,
+                "longitud": longitud,
+                "vehiculos_en_circulacion": en_circulacion,
+                "vehiculos_en_espera": en_espera,
+                "velocidad_promedio": velocidad_promedio,
+                "flujo_vehicular": flujo,
+                "score": score,
+                "estado_congestion": lector.enumerado(ESTADOS_CONGESTION),
+            }
+        )
+
+    vehiculos: list[dict[str, Any]] = []
+    for _ in range(lector.natural()):
+        vehiculo_id = lector.natural()
+        via_actual = lector.texto()
+        posicion, velocidad = lector.estructura(NUMEROS_VEHICULO)
+        vehiculos.append(
+            {
+                "vehiculo_id": vehiculo_id,
+                "via_actual": via_actual,
+                "posicion_en_via": posicion,
+                "velocidad": velocidad,
+                "direccion_actual": lector.enumerado(DIRECCIONES),
+                "estado": lector.enumerado(ESTADOS_VEHICULO),
+                "tipo": lector.enumerado(TIPOS_VEHICULO),
+            }
+        )
+
+    return SnapshotOperativo(
+        timestamp=timestamp,
+        tick_actual=tick_actual,
+        fuente=fuente,
+        version_contrato=version_contrato,
+        intersecciones=intersecciones,
+        vias=vias,
+        vehiculos=vehiculos,
+        tipo_snapshot=tipo_snapshot,
+        tick_base=tick_base,
+        vehiculos_eliminados=[lector.natural() for _ in range(lector.natural())],
+    )
+
+
+CONTRATOS: dict[str, tuple[int, type, Callable[[EscritorBinario, Any], None], Callable[[LectorBinario], Any]]] = {
+    TIPO_EVENTO_SENSOR: (1, EventoSensor, escribir_evento_sensor, leer_evento_sensor),
+    TIPO_COMANDO_SEMAFORO: (2, ComandoSemaforo, escribir_comando_semaforo, leer_comando_semaforo),
+    TIPO_SNAPSHOT_OPERATIVO: (3, SnapshotOperativo, escribir_snapshot_operativo, leer_snapshot_operativo),
+    TIPO_SOLICITUD_AMBULANCIA: (4, SolicitudAmbulancia, escribir_solicitud_ambulancia, leer_solicitud_ambulancia),
+    TIPO_SOLICITUD_CONTROL_MANUAL: (
+        5,
+        SolicitudControlManual,
+        escribir_solicitud_control_manual,
+        leer_solicitud_control_manual,
+    ),
+    TIPO_TRAMA_SENSORES: (6, TramaSensores, escribir_trama_sensores, leer_trama_sensores),
+}
+TIPO_POR_CLASE = {clase: tipo for tipo, (_, clase, _, _) in CONTRATOS.items()}
+TIPO_POR_CODIGO = {codigo: tipo for tipo, (codigo, _, _, _) in CONTRATOS.items()}
+
+
+def codificar_binario(tipo: str, mensaje: Any) -> bytes:
+    codigo, _, escribir, _ = CONTRATOS[tipo]
+    escritor = EscritorBinario()
+    escritor.byte(MARCA_BINARIA)
+    escritor.byte(codigo)
+    escribir(escritor, mensaje)
+    return bytes(escritor.salida)
+
+
+def codificar_json(datos: dict[str, Any]) -> bytes:
+    return json.dumps(datos, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def codificar_mensaje(mensaje: Any, formato: str) -> bytes:
+    tipo = TIPO_POR_CLASE[type(mensaje)]
+    if formato == FORMATO_BINARIO:
+        return codificar_binario(tipo, mensaje)
+    return codificar_json(mensaje.a_dict())
+
+
+def codificar_sobre(tipo: str, mensaje: Any, formato: str) -> bytes:
+    if formato == FORMATO_BINARIO:
+        return codificar_binario(tipo, mensaje)
+    return codificar_json({"tipo": tipo, "datos": mensaje.a_dict()})
+
+
+def decodificar_mensaje(carga: bytes, tipo_por_defecto: str | None = None) -> tuple[str, Any]:
+    if not carga:
+        raise ValueError("Mensaje vacio.")
+    if carga[0] == MARCA_BINARIA:
+        tipo = TIPO_POR_CODIGO[carga[1]]
+        return tipo, CONTRATOS[tipo][3](LectorBinario(carga, 2))
+    if carga[0] != MARCA_JSON:
+        raise ValueError(f"Cabecera de mensaje desconocida: {carga[0]:#04x}")
+    datos = json.loads(carga)
+    tipo = datos.get("tipo")
+    if tipo in CONTRATOS and "datos" in datos:
+        return tipo, CONTRATOS[tipo][1].desde_dict(datos["datos"])
+    if tipo_por_defecto is None:
+        raise ValueError("Mensaje JSON sin tipo de contrato.")
+    return tipo_por_defecto, CONTRATOS[tipo_por_defecto][1].desde_dict(datos)
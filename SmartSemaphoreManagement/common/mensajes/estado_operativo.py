@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
+VERSION_CONTRATO_COMPLETO = 1
+VERSION_CONTRATO_DELTA = 2
+TIPO_KEYFRAME = "KEYFRAME"
+TIPO_DELTA = "DELTA"
+CLAVE_INTERSECCION = "interseccion_id"
+CLAVE_VIA = "via_id"
+CLAVE_VEHICULO = "vehiculo_id"
+
 
 @dataclass(slots=True)
 class SnapshotOperativo:
@@ -13,9 +21,27 @@ class SnapshotOperativo:
     intersecciones: list[dict[str, Any]]
     vias: list[dict[str, Any]]
     vehiculos: list[dict[str, Any]]
+    tipo_snapshot: str = TIPO_KEYFRAME
+    tick_base: int | None = None
+    vehiculos_eliminados: list[int] = field(default_factory=list)
+
+    @property
+    def es_delta(self) -> bool:
+        return self.version_contrato >= VERSION_CONTRATO_DELTA and self.tipo_snapshot == TIPO_DELTA
 
     def a_dict(self) -> dict[str, Any]:
-        return asdict(self)
+        return {
+            "timestamp": self.timestamp,
+            "tick_actual": self.tick_actual,
+            "fuente": self.fuente,
+            "version_contrato": self.version_contrato,
+            "tipo_snapshot": self.tipo_snapshot,
+            "tick_base": self.tick_base,
+            "intersecciones": self.intersecciones,
+            "vias": self.vias,
+            "vehiculos": self.vehiculos,
+            "vehiculos_eliminados": self.vehiculos_eliminados,
+        }
 
     @classmethod
     def crear(
@@ -26,7 +52,10 @@ class SnapshotOperativo:
         vias: list[dict[str, Any]],
         vehiculos: list[dict[str, Any]],
         fuente: str = "PC0",
-        version_contrato: int = 1,
+        version_contrato: int = VERSION_CONTRATO_COMPLETO,
+        tipo_snapshot: str = TIPO_KEYFRAME,
+        tick_base: int | None = None,
+        vehiculos_eliminados: list[int] | None = None,
     ) -> "SnapshotOperativo":
         return cls(
             timestamp=timestamp,
@@ -36,16 +65,127 @@ class SnapshotOperativo:
             intersecciones=intersecciones,
             vias=vias,
             vehiculos=vehiculos,
+            tipo_snapshot=tipo_snapshot,
+            tick_base=tick_base,
+            vehiculos_eliminados=list(vehiculos_eliminados or []),
         )
 
     @classmethod
     def desde_dict(cls, datos: dict[str, Any]) -> "SnapshotOperativo":
+        tick_base = datos.get("tick_base")
         return cls(
             timestamp=str(datos["timestamp"]),
             tick_actual=int(datos["tick_actual"]),
             fuente=str(datos.get("fuente", "PC0")),
-            version_contrato=int(datos.get("version_contrato", 1)),
+            version_contrato=int(datos.get("version_contrato", VERSION_CONTRATO_COMPLETO)),
             intersecciones=list(datos["intersecciones"]),
             vias=list(datos["vias"]),
             vehiculos=list(datos["vehiculos"]),
+            tipo_snapshot=str(datos.get("tipo_snapshot", TIPO_KEYFRAME)),
+            tick_base=int(tick_base) if tick_base is not None else None,
+            vehiculos_eliminados=[int(vehiculo_id) for vehiculo_id in datos.get("vehiculos_eliminados", [])],
+        )
+
+
+def indexar_registros(registros: list[dict[str, Any]], clave: str) -> dict[Any, dict[str, Any]]:
+    return {registro[clave]: registro for registro in registros}
+
+
+def registros_modificados(
+    anteriores: dict[Any, dict[str, Any]],
+    actuales: dict[Any, dict[str, Any]],
+) -> list[dict[str, Any]]:
+    return [registro for clave, registro in actuales.items() if anteriores.get(clave) != registro]
+
+
+class CodificadorSnapshotsDelta:
+    def __init__(self, intervalo_keyframe: int) -> None:
+        self.intervalo_keyframe = max(1, intervalo_keyframe)
+        self.tick_ultimo_keyframe: int | None = None
+        self.tick_ultimo_snapshot: int | None = None
+        self.intersecciones: dict[str, dict[str, Any]] = {}
+        self.vias: dict[str, dict[str, Any]] = {}
+        self.vehiculos: dict[int, dict[str, Any]] = {}
+
+    def codificar(self, snapshot: SnapshotOperativo) -> SnapshotOperativo:
+        intersecciones = indexar_registros(snapshot.intersecciones, CLAVE_INTERSECCION)
+        vias = indexar_registros(snapshot.vias, CLAVE_VIA)
+        vehiculos = indexar_registros(snapshot.vehiculos, CLAVE_VEHICULO)
+        requiere_keyframe = (
+            self.tick_ultimo_keyframe is None
+            or snapshot.tick_actual - self.tick_ultimo_keyframe >= self.intervalo_keyframe
+        )
+        if requiere_keyframe:
+            codificado = SnapshotOperativo.crear(
+                timestamp=snapshot.timestamp,
+                tick_actual=snapshot.tick_actual,
+                intersecciones=snapshot.intersecciones,
+                vias=snapshot.vias,
+                vehiculos=snapshot.vehiculos,
+                fuente=snapshot.fuente,
+                version_contrato=VERSION_CONTRATO_DELTA,
+            )
+            self.tick_ultimo_keyframe = snapshot.tick_actual
+        else:
+            codificado = SnapshotOperativo.crear(
+                timestamp=snapshot.timestamp,
+                tick_actual=snapshot.tick_actual,
+                intersecciones=registros_modificados(self.intersecciones, intersecciones),
+                vias=registros_modificados(self.vias, vias),
+                vehiculos=registros_modificados(self.vehiculos, vehiculos),
+                fuente=snapshot.fuente,
+                version_contrato=VERSION_CONTRATO_DELTA,
+                tipo_snapshot=TIPO_DELTA,
+                tick_base=self.tick_ultimo_snapshot,
+                vehiculos_eliminados=[vehiculo_id for vehiculo_id in self.vehiculos if vehiculo_id not in vehiculos],
+            )
+        self.intersecciones = intersecciones
+        self.vias = vias
+        self.vehiculos = vehiculos
+        self.tick_ultimo_snapshot = snapshot.tick_actual
+        return codificado
+
+
+class AcumuladorSnapshotsDelta:
+    def __init__(self) -> None:
+        self.tick_actual: int | None = None
+        self.timestamp = ""
+        self.fuente = "PC0"
+        self.intersecciones: dict[str, dict[str, Any]] = {}
+        self.vias: dict[str, dict[str, Any]] = {}
+        self.vehiculos: dict[int, dict[str, Any]] = {}
+
+    def admite(self, snapshot: SnapshotOperativo) -> bool:
+        return not snapshot.es_delta or (
+            self.tick_actual is not None and snapshot.tick_base == self.tick_actual
+        )
+
+    def aplicar(self, snapshot: SnapshotOperativo) -> SnapshotOperativo | None:
+        if not self.admite(snapshot):
+            self.tick_actual = None
+            return None
+        if snapshot.es_delta:
+            self.intersecciones.update(indexar_registros(snapshot.intersecciones, CLAVE_INTERSECCION))
+            self.vias.update(indexar_registros(snapshot.vias, CLAVE_VIA))
+            for vehiculo_id in snapshot.vehiculos_eliminados:
+                self.vehiculos.pop(vehiculo_id, None)
+            self.vehiculos.update(indexar_registros(snapshot.vehiculos, CLAVE_VEHICULO))
+        else:
+            self.intersecciones = indexar_registros(snapshot.intersecciones, CLAVE_INTERSECCION)
+            self.vias = indexar_registros(snapshot.vias, CLAVE_VIA)
+            self.vehiculos = indexar_registros(snapshot.vehiculos, CLAVE_VEHICULO)
+        self.tick_actual = snapshot.tick_actual
+        self.timestamp = snapshot.timestamp
+        self.fuente = snapshot.fuente
+        return self.estado_actual()
+
+    def estado_actual(self) -> SnapshotOperativo:
+        return SnapshotOperativo.crear(
+            timestamp=self.timestamp,
+            tick_actual=self.tick_actual or 0,
+            intersecciones=list(self.intersecciones.values()),
+            vias=list(self.vias.values()),
+            vehiculos=list(self.vehiculos.values()),
+            fuente=self.fuente,
+            version_contrato=VERSION_CONTRATO_DELTA,
         )
@@ -14,6 +14,8 @@ class EventoSensor:
     tick_origen: int
     datos: dict[str, Any]
     timestamp: str
+    indice_interseccion: int = -1
+    indice_via: int = -1
 
     def a_dict(self) -> dict[str, Any]:
         return asdict(self)
@@ -27,6 +29,8 @@ class EventoSensor:
         via_id: str,
         tick_origen: int,
         datos: dict[str, Any],
+        indice_interseccion: int = -1,
+        indice_via: int = -1,
     ) -> "EventoSensor":
         return cls(
             sensor_id=sensor_id,
@@ -36,6 +40,8 @@ class EventoSensor:
             tick_origen=tick_origen,
             datos=datos,
             timestamp=datetime.now(timezone.utc).isoformat(),
+            indice_interseccion=indice_interseccion,
+            indice_via=indice_via,
         )
 
     @classmethod
@@ -48,4 +54,97 @@ class EventoSensor:
             tick_origen=int(datos.get("tick_origen", 0)),
             datos=datos["datos"],
             timestamp=datos["timestamp"],
+            indice_interseccion=int(datos.get("indice_interseccion", -1)),
+            indice_via=int(datos.get("indice_via", -1)),
         )
+
+
+PREFIJO_TOPICO_TRAMA = "trama/"
+
+
+def topico_trama(interseccion: str) -> str:
+    return f"{PREFIJO_TOPICO_TRAMA}{interseccion}"
+
+
+def obtener_topicos_sensores(config_sensores: dict[str, Any]) -> list[str]:
+    if bool(config_sensores.get("agrupar_por_interseccion", False)):
+        return [PREFIJO_TOPICO_TRAMA]
+    return [str(tipo) for tipo in config_sensores["tipos"]]
+
+
+@dataclass(slots=True)
+class TramaSensores:
+    interseccion: str
+    tick_origen: int
+    eventos: list[EventoSensor]
+    timestamp: str
+    indice_interseccion: int = -1
+
+    def a_dict(self) -> dict[str, Any]:
+        return {
+            "interseccion": self.interseccion,
+            "indice_interseccion": self.indice_interseccion,
+            "tick_origen": self.tick_origen,
+            "eventos": [
+                {
+                    "sensor_id": evento.sensor_id,
+                    "tipo_sensor": evento.tipo_sensor,
+                    "via_id": evento.via_id,
+                    "indice_via": evento.indice_via,
+                    "datos": evento.datos,
+                }
+                for evento in self.eventos
+            ],
+            "timestamp": self.timestamp,
+        }
+
+    @classmethod
+    def crear(cls, interseccion: str, tick_origen: int, indice_interseccion: int = -1) -> "TramaSensores":
+        return cls(
+            interseccion=interseccion,
+            tick_origen=tick_origen,
+            eventos=[],
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            indice_interseccion=indice_interseccion,
+        )
+
+    def agregar(
+        self,
+        sensor_id: str,
+        tipo_sensor: str,
+        via_id: str,
+        datos: dict[str, Any],
+        indice_via: int = -1,
+    ) -> None:
+        self.eventos.append(
+            EventoSensor(
+                sensor_id=sensor_id,
+                tipo_sensor=tipo_sensor,
+                interseccion=self.interseccion,
+                via_id=via_id,
+                tick_origen=self.tick_origen,
+                datos=datos,
+                timestamp=self.timestamp,
+                indice_interseccion=self.indice_interseccion,
+                indice_via=indice_via,
+            )
+        )
+
+    @classmethod
+    def desde_dict(cls, datos: dict[str, Any]) -> "TramaSensores":
+        trama = cls(
+            interseccion=datos["interseccion"],
+            tick_origen=int(datos["tick_origen"]),
+            eventos=[],
+            timestamp=datos["timestamp"],
+            indice_interseccion=int(datos.get("indice_interseccion", -1)),
+        )
+        for evento in datos["eventos"]:
+            trama.agregar(
+                evento["sensor_id"],
+                evento["tipo_sensor"],
+                evento["via_id"],
+                evento["datos"],
+                int(evento.get("indice_via", -1)),
+            )
+        return trama
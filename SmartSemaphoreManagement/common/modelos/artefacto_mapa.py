@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from common.mensajes.codec import (
+    DIRECCIONES,
+    EJES,
+    INDICE_DIRECCIONES,
+    INDICE_EJES,
+    EscritorBinario,
+    LectorBinario,
+)
+from common.modelos.rutas import TablaRutas
+from common.modelos.trafico import CiudadMapa, Interseccion, NodoBorde, Via
+from common.utilidades.configuracion import quitar_comentarios
+from common.utilidades.logs import log
+
+MAGIA_MAPA = b"SSMMAP"
+VERSION_MAPA = 1
+SEPARADOR_NOMBRES = "\n"
+LONGITUD_HASH = 32
+CLAVE_MAPA_COMPILADO = "mapa_compilado"
+TIPO_RUTAS = np.dtype("<i4")
+
+
+@dataclass(slots=True)
+class IdentidadMapa:
+    hash_contenido: str
+    huella_config: str
+
+    def coincide_con(self, otra: IdentidadMapa) -> bool:
+        if self.hash_contenido and otra.hash_contenido:
+            return self.hash_contenido == otra.hash_contenido
+        return self.huella_config == otra.huella_config
+
+    def describir(self) -> str:
+        return f"hash={self.hash_contenido[:12] or 'sin_artefacto'}, huella_config={self.huella_config[:12]}"
+
+    def a_dict(self) -> dict[str, str]:
+        return {"hash_contenido": self.hash_contenido, "huella_config": self.huella_config}
+
+    @classmethod
+    def desde_dict(cls, datos: dict[str, object]) -> IdentidadMapa:
+        return cls(
+            hash_contenido=str(datos.get("hash_contenido", "")),
+            huella_config=str(datos.get("huella_config", "")),
+        )
+
+
+def calcular_huella_config(config_ciudad: dict[str, object]) -> str:
+    contenido = {
+        clave: valor for clave, valor in quitar_comentarios(config_ciudad).items() if clave != CLAVE_MAPA_COMPILADO
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def escribir_nombres(escritor: EscritorBinario, nombres: list[str]) -> None:
+    escritor.natural(len(nombres))
+    escritor.texto(SEPARADOR_NOMBRES.join(nombres))
+
+
+def leer_nombres(lector: LectorBinario) -> list[str]:
+    cantidad = lector.natural()
+    nombres = lector.texto()
+    return nombres.split(SEPARADOR_NOMBRES) if cantidad else []
+
+
+def escribir_arreglo(escritor: EscritorBinario, tipo: str, valores: list[int] | list[float]) -> None:
+    escritor.bloque(array(tipo, valores).tobytes())
+
+
+def leer_arreglo(lector: LectorBinario, tipo: str, cantidad: int) -> list[int] | list[float]:
+    valores = array(tipo)
+    valores.frombytes(lector.bloque(cantidad * valores.itemsize))
+    return valores.tolist()
+
+
+def alinear(escritor: EscritorBinario) -> None:
+    escritor.bloque(bytes(-(len(escritor.salida) + LONGITUD_HASH) % TIPO_RUTAS.itemsize))
+
+
+def compilar_mapa(ciudad_mapa: CiudadMapa, huella_config: str) -> bytes:
+    nodos = ciudad_mapa.nombres_nodos
+    intersecciones = list(ciudad_mapa.intersecciones.values())
+    bordes = list(ciudad_mapa.nodos_borde.values())
+    vias = list(ciudad_mapa.iterar_vias())
+
+    escritor = EscritorBinario()
+    escritor.bloque(MAGIA_MAPA)
+    escritor.byte(VERSION_MAPA)
+    escritor.texto(huella_config)
+
+    escribir_nombres(escritor, [interseccion.id_interseccion for interseccion in intersecciones])
+    escribir_arreglo(escritor, "i", [interseccion.fila for interseccion in intersecciones])
+    escribir_arreglo(escritor, "i", [interseccion.columna for interseccion in intersecciones])
+    escritor.bloque(bytes(INDICE_EJES[interseccion.fase_activa] for interseccion in intersecciones))
+
+    escribir_nombres(escritor, [borde.id_nodo for borde in bordes])
+    escritor.bloque(bytes(INDICE_DIRECCIONES[borde.lado] for borde in bordes))
+    escribir_arreglo(escritor, "i", [-1 if borde.fila is None else borde.fila for borde in bordes])
+    escribir_arreglo(escritor, "i", [-1 if borde.columna is None else borde.columna for borde in bordes])
+
+    escribir_nombres(escritor, [via.id_via for via in vias])
+    escribir_arreglo(escritor, "I", [nodos.indice(via.origen) for via in vias])
+    escribir_arreglo(escritor, "I", [nodos.indice(via.destino) for via in vias])
+    escritor.bloque(bytes(INDICE_DIRECCIONES[via.direccion] for via in vias))
+    escritor.bloque(bytes(INDICE_EJES[via.eje] for via in vias))
+    escribir_arreglo(escritor, "d", [via.longitud for via in vias])
+
+    siguientes = ciudad_mapa.obtener_tabla_rutas().siguientes
+    escritor.natural(len(siguientes))
+    alinear(escritor)
+    escritor.bloque(np.ascontiguousarray(siguientes, dtype=TIPO_RUTAS).tobytes())
+
+    cuerpo = bytes(escritor.salida)
+    return hashlib.sha256(cuerpo).digest() + cuerpo
+
+
+def escribir_mapa_compilado(ruta: str | Path, ciudad_mapa: CiudadMapa, config_ciudad: dict[str, object]) -> str:
+    contenido = compilar_mapa(ciudad_mapa, calcular_huella_config(config_ciudad))
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f"{ruta.name}.tmp")
+    with temporal.open("wb") as archivo:
+        archivo.write(contenido)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+    return contenido[:LONGITUD_HASH].hex()
+
+
+class MapaCompilado:
+    def __init__(self, ruta: str | Path) -> None:
+        self.ruta = Path(ruta)
+        with self.ruta.open("rb") as archivo:
+            self.memoria = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        vista = memoryview(self.memoria)
+        self.hash_contenido = bytes(vista[:LONGITUD_HASH]).hex()
+        if bytes(vista[LONGITUD_HASH : LONGITUD_HASH + len(MAGIA_MAPA)]) != MAGIA_MAPA:
+            raise ValueError(f"El archivo {self.ruta} no es un mapa compilado.")
+        if hashlib.sha256(vista[LONGITUD_HASH:]).hexdigest() != self.hash_contenido:
+            raise ValueError(f"El mapa compilado {self.ruta} esta corrupto: su hash no coincide con el contenido.")
+        self.lector = LectorBinario(self.memoria, LONGITUD_HASH + len(MAGIA_MAPA))
+        version = self.lector.byte()
+        if version != VERSION_MAPA:
+            raise ValueError(f"Version de mapa compilado no soportada: {version}")
+        self.huella_config = self.lector.texto()
+
+    def construir_ciudad(self) -> CiudadMapa:
+        lector = self.lector
+        ciudad = CiudadMapa()
+
+        nombres_intersecciones = leer_nombres(lector)
+        cantidad = len(nombres_intersecciones)
+        filas = leer_arreglo(lector, "i", cantidad)
+        columnas = leer_arreglo(lector, "i", cantidad)
+        fases = lector.bloque(cantidad)
+        for nombre, fila, columna, fase in zip(nombres_intersecciones, filas, columnas, fases):
+            ciudad.intersecciones[nombre] = Interseccion(
+                id_interseccion=nombre,
+                fila=fila,
+                columna=columna,
+                fase_activa=EJES[fase],
+                fase_alterna=EJES[1 - fase],
+            )
+
+        nombres_bordes = leer_nombres(lector)
+        cantidad = len(nombres_bordes)
+        lados = lector.bloque(cantidad)
+        filas = leer_arreglo(lector, "i", cantidad)
+        columnas = leer_arreglo(lector, "i", cantidad)
+        for nombre, lado, fila, columna in zip(nombres_bordes, lados, filas, columnas):
+            ciudad.nodos_borde[nombre] = NodoBorde(
+                id_nodo=nombre,
+                lado=DIRECCIONES[lado],
+                fila=None if fila < 0 else fila,
+                columna=None if columna < 0 else columna,
+            )
+
+        nodos = [*nombres_intersecciones, *nombres_bordes]
+        nombres_vias = leer_nombres(lector)
+        cantidad = len(nombres_vias)
+        origenes = leer_arreglo(lector, "I", cantidad)
+        destinos = leer_arreglo(lector, "I", cantidad)
+        direcciones = lector.bloque(cantidad)
+        ejes = lector.bloque(cantidad)
+        longitudes = leer_arreglo(lector, "d", cantidad)
+        for nombre, origen, destino, direccion, eje, longitud in zip(
+            nombres_vias, origenes, destinos, direcciones, ejes, longitudes
+        ):
+            ciudad.vias[nombre] = Via(
+                id_via=nombre,
+                origen=nodos[origen],
+                destino=nodos[destino],
+                direccion=DIRECCIONES[direccion],
+                eje=EJES[eje],
+                longitud=longitud,
+            )
+        ciudad.indexar_vias()
+
+        cantidad = lector.natural()
+        lector.posicion += -lector.posicion % TIPO_RUTAS.itemsize
+        siguientes = np.frombuffer(
+            self.memoria, dtype=TIPO_RUTAS, count=cantidad * cantidad, offset=lector.posicion
+        ).reshape(cantidad, cantidad)
+        ciudad.tabla_rutas = TablaRutas(ciudad, siguientes)
+        return ciudad
+
+
+def cargar_ciudad_mapa(config_ciudad: dict[str, object], raiz: str | Path) -> tuple[CiudadMapa, str | None]:
+    config_mapa = dict(config_ciudad.get(CLAVE_MAPA_COMPILADO, {}))
+    ruta = str(config_mapa.get("ruta", ""))
+    if not ruta:
+        return CiudadMapa.desde_config(config_ciudad), None
+    mapa = MapaCompilado(Path(raiz) / ruta)
+    if mapa.huella_config != calcular_huella_config(config_ciudad):
+        raise ValueError(
+            f"El mapa compilado {mapa.ruta} se genero con otra configuracion de ciudad; vuelva a compilarlo."
+        )
+    hash_esperado = str(config_mapa.get("hash", ""))
+    if hash_esperado and hash_esperado != mapa.hash_contenido:
+        raise ValueError(
+            f"El hash del mapa compilado {mapa.ruta} ({mapa.hash_contenido[:12]}) no coincide con el de la "
+            f"simulacion ({hash_esperado[:12]})."
+        )
+    return mapa.construir_ciudad(), mapa.hash_contenido
+
+
+def abrir_mapa_del_servicio(
+    config_ciudad: dict[str, object], raiz: str | Path, origen: str
+) -> tuple[CiudadMapa, IdentidadMapa]:
+    try:
+        ciudad_mapa, hash_contenido = cargar_ciudad_mapa(config_ciudad, raiz)
+    except (OSError, ValueError) as error:
+        log(origen, f"Arranque rechazado: {error}")
+        raise SystemExit(1) from error
+    if hash_contenido is not None:
+        log(
+            origen,
+            (
+                f"Mapa compilado cargado: hash={hash_contenido[:12]}, "
+                f"intersecciones={len(ciudad_mapa.intersecciones)}, vias={len(ciudad_mapa.vias)}."
+            ),
+        )
+    return ciudad_mapa, IdentidadMapa(hash_contenido or "", calcular_huella_config(config_ciudad))
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from common.mensajes.codec import (
+    DIRECCIONES,
+    EJES,
+    ESTADOS_VEHICULO,
+    INDICE_DIRECCIONES,
+    INDICE_EJES,
+    INDICE_ESTADOS_VEHICULO,
+    INDICE_TIPOS_VEHICULO,
+    NUMEROS_INTERSECCION,
+    TIPOS_VEHICULO,
+    EscritorBinario,
+    LectorBinario,
+)
+from common.modelos.trafico import CiudadMapa
+from common.modelos.vehiculos import Vehiculo
+
+MAGIA_CHECKPOINT = b"SSMCHK"
+VERSION_CHECKPOINT = 7
+COLA_CHECKPOINT = struct.Struct("<QI")
+
+
+@dataclass(slots=True)
+class EstadoMotor:
+    tick_actual: int
+    contador_vehiculos: int
+    contador_ambulancias: int
+    estado_aleatorio: tuple[Any, ...]
+    intersecciones: list[tuple[str, str, str, int, int, int]]
+    ticks_omitidos: int = 0
+    estado_generador_masivo: str = ""
+    ids_vehiculo: list[int] = field(default_factory=list)
+    vias_vehiculo: list[int] = field(default_factory=list)
+    posiciones: list[float] = field(default_factory=list)
+    velocidades: list[float] = field(default_factory=list)
+    direcciones: list[str] = field(default_factory=list)
+    estados: list[str] = field(default_factory=list)
+    tipos: list[str] = field(default_factory=list)
+    destinos: list[int] = field(default_factory=list)
+    colas: dict[int, list[int]] = field(default_factory=dict)
+
+    def iterar_vehiculos(self) -> Iterator[Vehiculo]:
+        for valores in zip(
+            self.ids_vehiculo,
+            self.vias_vehiculo,
+            self.posiciones,
+            self.velocidades,
+            self.direcciones,
+            self.estados,
+            self.tipos,
+            self.destinos,
+        ):
+            yield Vehiculo(*valores)
+
+
+@dataclass(slots=True)
+class CheckpointSimulacion:
+    firma_mapa: str
+    tipo_motor: str
+    estados: list[EstadoMotor]
+
+
+def calcular_firma_mapa(ciudad_mapa: CiudadMapa) -> str:
+    contenido = "\n".join(f"{via.id_via}:{via.longitud!r}" for via in ciudad_mapa.iterar_vias())
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+
+def escribir_numeros(escritor: EscritorBinario, numeros: list[int]) -> None:
+    escritor.natural(len(numeros))
+    escritor.bloque(array("q", numeros).tobytes())
+
+
+def leer_numeros(lector: LectorBinario) -> list[int]:
+    return leer_arreglo(lector, "q", lector.natural()).tolist()
+
+
+def escribir_estado(escritor: EscritorBinario, estado: EstadoMotor) -> None:
+    escritor.entero(estado.tick_actual)
+    escritor.entero(estado.contador_vehiculos)
+    escritor.entero(estado.contador_ambulancias)
+    escritor.entero(estado.ticks_omitidos)
+
+    version, interno, gauss = estado.estado_aleatorio
+    escritor.natural(version)
+    escritor.natural(len(interno))
+    escritor.bloque(array("I", interno).tobytes())
+    if gauss is None:
+        escritor.byte(0)
+    else:
+        escritor.byte(1)
+        escritor.flotante(gauss)
+    escritor.texto(estado.estado_generador_masivo)
+
+    escritor.natural(len(estado.intersecciones))
+    for interseccion_id, fase_activa, fase_alterna, duracion_activa, duracion_alterna, restantes in (
+        estado.intersecciones
+    ):
+        escritor.texto(interseccion_id)
+        escritor.enumerado(fase_activa, INDICE_EJES)
+        escritor.enumerado(fase_alterna, INDICE_EJES)
+        escritor.bloque(NUMEROS_INTERSECCION.pack(duracion_activa, duracion_alterna, restantes))
+
+    escribir_numeros(escritor, estado.ids_vehiculo)
+    if estado.ids_vehiculo:
+        escritor.bloque(array("I", estado.vias_vehiculo).tobytes())
+        escritor.bloque(array("d", estado.posiciones).tobytes())
+        escritor.bloque(array("d", estado.velocidades).tobytes())
+        escritor.bloque(bytes(INDICE_DIRECCIONES[direccion] for direccion in estado.direcciones))
+        escritor.bloque(bytes(INDICE_ESTADOS_VEHICULO[valor] for valor in estado.estados))
+        escritor.bloque(bytes(INDICE_TIPOS_VEHICULO[tipo] for tipo in estado.tipos))
+        escritor.bloque(array("i", estado.destinos).tobytes())
+
+    escritor.natural(len(estado.colas))
+    for indice_via, ids in estado.colas.items():
+        escritor.natural(indice_via)
+        escribir_numeros(escritor, ids)
+
+
+def leer_arreglo(lector: LectorBinario, tipo: str, cantidad: int) -> array:
+    valores = array(tipo)
+    valores.frombytes(lector.bloque(cantidad * valores.itemsize))
+    return valores
+
+
+def leer_estado(lector: LectorBinario) -> EstadoMotor:
+    tick_actual = lector.entero()
+    contador_vehiculos = lector.entero()
+    contador_ambulancias = lector.entero()
+    ticks_omitidos = lector.entero()
+
+    version = lector.natural()
+    interno = tuple(leer_arreglo(lector, "I", lector.natural()))
+    gauss = lector.flotante() if lector.byte() else None
+    estado_generador_masivo = lector.texto()
+
+    intersecciones: list[tuple[str, str, str, int, int, int]] = []
+    for _ in range(lector.natural()):
+        interseccion_id = lector.texto()
+        fase_activa = lector.enumerado(EJES)
+        fase_alterna = lector.enumerado(EJES)
+        intersecciones.append(
+            (interseccion_id, fase_activa, fase_alterna, *lector.estructura(NUMEROS_INTERSECCION))
+        )
+
+    estado = EstadoMotor(
+        tick_actual=tick_actual,
+        contador_vehiculos=contador_vehiculos,
+        contador_ambulancias=contador_ambulancias,
+        ticks_omitidos=ticks_omitidos,
+        estado_aleatorio=(version, interno, gauss),
+        intersecciones=intersecciones,
+        estado_generador_masivo=estado_generador_masivo,
+        ids_vehiculo=leer_numeros(lector),
+    )
+    cantidad = len(estado.ids_vehiculo)
+    if cantidad:
+        estado.vias_vehiculo = leer_arreglo(lector, "I", cantidad).tolist()
+        estado.posiciones = leer_arreglo(lector, "d", cantidad).tolist()
+        estado.velocidades = leer_arreglo(lector, "d", cantidad).tolist()
+        estado.direcciones = [DIRECCIONES[indice] for indice in lector.bloque(cantidad)]
+        estado.estados = [ESTADOS_VEHICULO[indice] for indice in lector.bloque(cantidad)]
+        estado.tipos = [TIPOS_VEHICULO[indice] for indice in lector.bloque(cantidad)]
+        estado.destinos = leer_arreglo(lector, "i", cantidad).tolist()
+
+    for _ in range(lector.natural()):
+        indice_via = lector.natural()
+        estado.colas[indice_via] = leer_numeros(lector)
+    return estado
+
+
+def escribir_checkpoint(ruta: str | Path, checkpoint: CheckpointSimulacion) -> int:
+    escritor = EscritorBinario()
+    escritor.bloque(MAGIA_CHECKPOINT)
+    escritor.byte(VERSION_CHECKPOINT)
+    escritor.texto(checkpoint.firma_mapa)
+    escritor.texto(checkpoint.tipo_motor)
+    escritor.natural(len(checkpoint.estados))
+    for estado in checkpoint.estados:
+        escribir_estado(escritor, estado)
+
+    cuerpo = bytes(escritor.salida)
+    contenido = cuerpo + COLA_CHECKPOINT.pack(len(cuerpo), zlib.crc32(cuerpo))
+
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f"{ruta.name}.tmp")
+    with temporal.open("wb") as archivo:
+        archivo.write(contenido)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+    return len(contenido)
+
+
+def leer_checkpoint(ruta: str | Path) -> CheckpointSimulacion | None:
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    contenido = ruta.read_bytes()
+    if not contenido.startswith(MAGIA_CHECKPOINT):
+        raise ValueError(f"El archivo {ruta} no es un checkpoint de simulacion.")
+    if len(contenido) < len(MAGIA_CHECKPOINT) + 1 + COLA_CHECKPOINT.size:
+        raise ValueError(f"El checkpoint {ruta} esta truncado: {len(contenido)} bytes.")
+    version = contenido[len(MAGIA_CHECKPOINT)]
+    if version != VERSION_CHECKPOINT:
+        raise ValueError(f"Version de checkpoint no soportada: {version}")
+    carga = contenido[: -COLA_CHECKPOINT.size]
+    longitud, crc = COLA_CHECKPOINT.unpack_from(contenido, len(carga))
+    if longitud != len(carga) or crc != zlib.crc32(carga):
+        raise ValueError(f"El checkpoint {ruta} esta truncado o corrupto: su longitud o su CRC no coinciden.")
+    lector = LectorBinario(carga, len(MAGIA_CHECKPOINT) + 1)
+    try:
+        firma_mapa = lector.texto()
+        tipo_motor = lector.texto()
+        estados = [leer_estado(lector) for _ in range(lector.natural())]
+    except (IndexError, KeyError, struct.error, UnicodeDecodeError) as error:
+        raise ValueError(f"El checkpoint {ruta} no se pudo interpretar: {error!r}") from error
+    if lector.posicion != len(carga):
+        raise ValueError(f"El checkpoint {ruta} tiene {len(carga) - lector.posicion} bytes sobrantes.")
+    return CheckpointSimulacion(firma_mapa=firma_mapa, tipo_motor=tipo_motor, estados=estados)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+from bisect import bisect_right
+
+import numpy as np
+
+MODO_SECUENCIAL = "secuencial"
+MODO_MASIVO = "masiva"
+MODOS_GENERACION = (MODO_SECUENCIAL, MODO_MASIVO)
+
+
+def hora_a_minutos(hora: str) -> int:
+    horas, _, minutos = hora.partition(":")
+    return int(horas) * 60 + int(minutos)
+
+
+class PerfilDemanda:
+    def __init__(self, tramos: list[tuple[int, float]]) -> None:
+        tramos = sorted(tramos)
+        self.inicios = [inicio for inicio, _ in tramos]
+        self.factores = [factor for _, factor in tramos]
+
+    @classmethod
+    def desde_config(cls, tramos: list[dict[str, object]]) -> "PerfilDemanda":
+        return cls([(hora_a_minutos(str(tramo["desde"])), float(tramo["factor"])) for tramo in tramos])
+
+    @property
+    def activo(self) -> bool:
+        return bool(self.factores)
+
+    def factor(self, hora: str) -> float:
+        if not self.factores:
+            return 1.0
+        return self.factores[bisect_right(self.inicios, hora_a_minutos(hora)) - 1]
+
+
+class GeneradorMasivo:
+    def __init__(self, semilla: int, flujo: int = 0) -> None:
+        self.aleatorio = np.random.default_rng([semilla, flujo])
+
+    def sortear(
+        self,
+        cantidad_vias: int,
+        probabilidad: float,
+        cupo: int,
+        velocidad_min: float,
+        velocidad_max: float,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        elegidas = np.flatnonzero(self.aleatorio.random(cantidad_vias) < probabilidad)
+        if elegidas.size > cupo:
+            elegidas = np.sort(self.aleatorio.choice(elegidas, size=max(0, cupo), replace=False))
+        velocidades = np.round(self.aleatorio.uniform(velocidad_min, velocidad_max, size=elegidas.size), 2)
+        return elegidas, velocidades
+
+    def obtener_estado(self) -> str:
+        return json.dumps(self.aleatorio.bit_generator.state)
+
+    def restaurar_estado(self, estado: str) -> None:
+        self.aleatorio.bit_generator.state = json.loads(estado)
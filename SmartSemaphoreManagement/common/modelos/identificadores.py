@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+PREFIJOS_VEHICULO = ("VEH", "AMB")
+
+
+class TablaNombres:
+    def __init__(self, nombres: Iterable[str] = ()) -> None:
+        self.nombres: list[str] = []
+        self.indices: dict[str, int] = {}
+        for nombre in nombres:
+            self.registrar(nombre)
+
+    def __len__(self) -> int:
+        return len(self.nombres)
+
+    def registrar(self, nombre: str) -> int:
+        indice = self.indices.get(nombre)
+        if indice is None:
+            indice = self.indices[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+        return indice
+
+    def indice(self, nombre: str) -> int:
+        return self.indices[nombre]
+
+    def buscar(self, nombre: str | None) -> int:
+        return self.indices.get(nombre, -1)
+
+    def nombre(self, indice: int) -> str:
+        return self.nombres[indice]
+
+
+def componer_id_vehiculo(numero: int, ambulancia: bool = False) -> int:
+    return numero << 1 | ambulancia
+
+
+def nombre_vehiculo(id_vehiculo: int) -> str:
+    return f"{PREFIJOS_VEHICULO[id_vehiculo & 1]}-{id_vehiculo >> 1:05d}"
+
+
+def normalizar_nombre_vehiculo(valor: int | str) -> str:
+    return valor if isinstance(valor, str) else nombre_vehiculo(valor)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import heapq
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from common.modelos.trafico import CiudadMapa
+
+SIN_RUTA = -1
+
+
+class TablaRutas:
+    def __init__(self, ciudad_mapa: CiudadMapa, siguientes: np.ndarray | None = None) -> None:
+        self.version_topologia = ciudad_mapa.version_topologia
+        self.nombres_nodos = ciudad_mapa.nombres_nodos
+        self.nombres_vias = ciudad_mapa.nombres_vias
+        self.siguientes = siguientes if siguientes is not None else self._calcular_siguientes(ciudad_mapa)
+
+    @property
+    def nodos(self) -> list[str]:
+        return self.nombres_nodos.nombres
+
+    def _calcular_siguientes(self, ciudad_mapa: CiudadMapa) -> np.ndarray:
+        cantidad = len(self.nombres_nodos)
+        entradas = [
+            [(via.indice_origen, via.indice, via.longitud) for via in vias_entrada]
+            for vias_entrada in ciudad_mapa.entradas_por_nodo
+        ]
+        siguientes = np.full((cantidad, cantidad), SIN_RUTA, dtype=np.int32)
+        for destino in range(cantidad):
+            fila = [SIN_RUTA] * cantidad
+            distancias = [float("inf")] * cantidad
+            distancias[destino] = 0.0
+            pendientes = [(0.0, destino)]
+            while pendientes:
+                distancia, nodo = heapq.heappop(pendientes)
+                if distancia > distancias[nodo]:
+                    continue
+                for origen, indice_via, longitud in entradas[nodo]:
+                    candidata = distancia + longitud
+                    if candidata < distancias[origen]:
+                        distancias[origen] = candidata
+                        fila[origen] = indice_via
+                        heapq.heappush(pendientes, (candidata, origen))
+            siguientes[destino] = fila
+        return siguientes
+
+    def siguiente_via(self, indice_nodo_actual: int, indice_destino: int) -> int:
+        return int(self.siguientes[indice_destino, indice_nodo_actual])
+
+    def siguiente_via_id(self, nodo_actual: str, destino: str) -> str | None:
+        indice_destino = self.nombres_nodos.buscar(destino)
+        indice_actual = self.nombres_nodos.buscar(nodo_actual)
+        if indice_destino < 0 or indice_actual < 0:
+            return None
+        indice_via = self.siguiente_via(indice_actual, indice_destino)
+        return self.nombres_vias.nombre(indice_via) if indice_via != SIN_RUTA else None
+
+    def es_alcanzable(self, nodo_actual: str, destino: str) -> bool:
+        return nodo_actual == destino or self.siguiente_via_id(nodo_actual, destino) is not None
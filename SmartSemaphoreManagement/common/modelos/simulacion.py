@@ -1,13 +1,31 @@
 from __future__ import annotations
 
 import random
-from dataclasses import dataclass
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from time import perf_counter_ns
 
 from common.mensajes.comandos import ComandoSemaforo
 from common.mensajes.estado_operativo import SnapshotOperativo
+from common.modelos.checkpoint import (
+    CheckpointSimulacion,
+    EstadoMotor,
+    calcular_firma_mapa,
+    escribir_checkpoint,
+    leer_checkpoint,
+)
+from common.modelos.generacion import MODO_MASIVO, MODOS_GENERACION, GeneradorMasivo, PerfilDemanda
+from common.modelos.identificadores import componer_id_vehiculo
+from common.modelos.rutas import SIN_RUTA, TablaRutas
 from common.modelos.trafico import CiudadMapa, Via
 from common.modelos.vehiculos import Vehiculo
+from common.utilidades.perfilado import PerfiladorFases
+
+
+def a_centesimas(velocidad: float) -> int:
+    return round(velocidad * 100)
 
 
 @dataclass(slots=True)
@@ -17,7 +35,8 @@ class ResultadoTick:
     eliminados: int
     movidos: int
     vehiculos_creados: list[Vehiculo]
-    vehiculos_eliminados: list[dict[str, str | float]]
+    vehiculos_eliminados: list[dict[str, int | str | float]]
+    duraciones_fases: dict[str, int] = field(default_factory=dict)
 
 
 class MotorSimulacion:
@@ -25,81 +44,69 @@ class MotorSimulacion:
         self.ciudad_mapa = ciudad_mapa
         self.config = config_simulacion
         self.randomizador = random.Random(int(config_simulacion.get("semilla", 0)))
-        self.vehiculos: dict[str, Vehiculo] = {}
+        modo_generacion = str(config_simulacion.get("generacion", "secuencial"))
+        if modo_generacion not in MODOS_GENERACION:
+            raise ValueError(f"Modo de generacion no soportado: {modo_generacion}")
+        self.generador_masivo = (
+            GeneradorMasivo(int(config_simulacion.get("semilla", 0))) if modo_generacion == MODO_MASIVO else None
+        )
+        self.perfil_demanda = PerfilDemanda.desde_config(list(config_simulacion.get("perfil_demanda", [])))
+        self.perfilador = PerfiladorFases(
+            activo=bool(config_simulacion.get("perfilado_activo", False)),
+            ventana=int(config_simulacion.get("ventana_perfilado_ticks", 500)),
+        )
+        self._inicializar_flota()
         self.contador_vehiculos = 0
         self.contador_ambulancias = 0
+        self.ticks_omitidos = 0
         self.minutos_simulados_por_tick = int(config_simulacion.get("minutos_simulados_por_tick", 1))
         self.hora_inicio_simulada = str(config_simulacion.get("hora_inicio_simulada", "12:00"))
         self.hora_fin_simulada = str(config_simulacion.get("hora_fin_simulada", "18:00"))
+        self.descarga_cola_por_tick = int(config_simulacion.get("descarga_cola_por_tick", 0))
         self.vias_entrada = [
             via for via in self.ciudad_mapa.iterar_vias() if self.ciudad_mapa.es_nodo_borde(via.origen)
         ]
 
+    def _inicializar_flota(self) -> None:
+        self.vehiculos: dict[int, Vehiculo] = {}
+
     def avanzar_tick(self) -> ResultadoTick:
+        self.perfilador.iniciar()
         self.ciudad_mapa.tick_actual += 1
         for via in self.ciudad_mapa.iterar_vias():
             via.flujo_vehicular = 0
         vehiculos_creados = self._generar_vehiculos()
+        self.perfilador.marcar("generacion")
         movidos = 0
-        eliminados = 0
-        vehiculos_eliminados: list[dict[str, str | float]] = []
+        vehiculos_eliminados: list[dict[str, int | str | float]] = []
 
         for vehiculo in list(self.vehiculos.values()):
-            if vehiculo.estado == "CIRCULANDO":
-                vehiculo.posicion_en_via += vehiculo.velocidad
-                movidos += 1
-
-            via_actual = self.ciudad_mapa.vias[vehiculo.via_actual]
-            if vehiculo.posicion_en_via < via_actual.longitud:
+            if vehiculo.estado == "EN_COLA":
                 continue
+            vehiculo.posicion_en_via += vehiculo.velocidad
+            movidos += 1
 
-            if self.ciudad_mapa.es_nodo_borde(via_actual.destino):
-                vehiculos_eliminados.append(
-                    {
-                        "vehiculo_id": vehiculo.id_vehiculo,
-                        "tipo": vehiculo.tipo,
-                        "via_actual": vehiculo.via_actual,
-                        "direccion_actual": vehiculo.direccion_actual,
-                        "velocidad": vehiculo.velocidad,
-                        "motivo": "SALIDA_DE_LA_CIUDAD",
-                        "nodo_final": via_actual.destino,
-                    }
-                )
-                del self.vehiculos[vehiculo.id_vehiculo]
-                eliminados += 1
+            via_actual = self.ciudad_mapa.vias_por_indice[vehiculo.via_actual]
+            if vehiculo.posicion_en_via < via_actual.longitud:
                 continue
 
-            interseccion = self.ciudad_mapa.intersecciones[via_actual.destino]
-            if interseccion.fase_activa != via_actual.eje:
-                vehiculo.estado = "EN_COLA"
-                vehiculo.posicion_en_via = via_actual.longitud
+            motivo = self._motivo_retiro_al_llegar(vehiculo, via_actual)
+            if motivo is not None:
+                vehiculos_eliminados.append(self._describir_retiro(vehiculo, via_actual, motivo))
+                self._eliminar_vehiculo(vehiculo, via_actual)
                 continue
 
-            siguiente_via = self._escoger_siguiente_via(via_actual)
-            if siguiente_via is None:
-                vehiculos_eliminados.append(
-                    {
-                        "vehiculo_id": vehiculo.id_vehiculo,
-                        "tipo": vehiculo.tipo,
-                        "via_actual": vehiculo.via_actual,
-                        "direccion_actual": vehiculo.direccion_actual,
-                        "velocidad": vehiculo.velocidad,
-                        "motivo": "SIN_SALIDA_DISPONIBLE",
-                        "nodo_final": via_actual.destino,
-                    }
-                )
-                del self.vehiculos[vehiculo.id_vehiculo]
-                eliminados += 1
-                continue
+            self._encolar_vehiculo(vehiculo, via_actual)
+        self.perfilador.marcar("movimiento")
 
-            via_actual.flujo_vehicular += 1
-            vehiculo.via_actual = siguiente_via.id_via
-            vehiculo.direccion_actual = siguiente_via.direccion
-            vehiculo.posicion_en_via = 0.0
-            vehiculo.estado = "CIRCULANDO"
+        vehiculos_eliminados.extend(self._descargar_colas())
+        eliminados = len(vehiculos_eliminados)
+        self.perfilador.marcar("descarga_colas")
 
         self._actualizar_metricas_vias()
+        self.perfilador.marcar("metricas")
         self._actualizar_fases_semaforicas()
+        self.perfilador.marcar("semaforos")
         return ResultadoTick(
             tick=self.ciudad_mapa.tick_actual,
             creados=len(vehiculos_creados),
@@ -107,6 +114,7 @@ class MotorSimulacion:
             movidos=movidos,
             vehiculos_creados=vehiculos_creados,
             vehiculos_eliminados=vehiculos_eliminados,
+            duraciones_fases=self.perfilador.cerrar(),
         )
 
     def aplicar_comando_semaforo(self, comando: ComandoSemaforo) -> None:
@@ -122,83 +130,266 @@ class MotorSimulacion:
         return SnapshotOperativo.crear(
             timestamp=timestamp,
             tick_actual=self.ciudad_mapa.tick_actual,
-            intersecciones=[
-                {
-                    "interseccion_id": interseccion.id_interseccion,
-                    "fase_activa": interseccion.fase_activa,
-                    "fase_alterna": interseccion.fase_alterna,
-                    "duracion_fase_activa": interseccion.duracion_fase_activa,
-                    "duracion_fase_alterna": interseccion.duracion_fase_alterna,
-                    "ticks_restantes_fase": interseccion.ticks_restantes_fase,
-                }
-                for interseccion in self.ciudad_mapa.intersecciones.values()
-            ],
-            vias=[
-                {
-                    "via_id": via.id_via,
-                    "origen": via.origen,
-                    "destino": via.destino,
-                    "direccion": via.direccion,
-                    "eje": via.eje,
-                    "longitud": via.longitud,
-                    "vehiculos_en_circulacion": via.vehiculos_en_circulacion,
-                    "vehiculos_en_espera": via.vehiculos_en_espera,
-                    "velocidad_promedio": via.velocidad_promedio,
-                    "flujo_vehicular": via.flujo_vehicular,
-                    "score": via.score,
-                    "estado_congestion": via.estado_congestion,
-                }
-                for via in self.ciudad_mapa.iterar_vias()
-            ],
-            vehiculos=[
-                {
-                    "vehiculo_id": vehiculo.id_vehiculo,
-                    "via_actual": vehiculo.via_actual,
-                    "posicion_en_via": vehiculo.posicion_en_via,
-                    "velocidad": vehiculo.velocidad,
-                    "direccion_actual": vehiculo.direccion_actual,
-                    "estado": vehiculo.estado,
-                    "tipo": vehiculo.tipo,
-                }
-                for vehiculo in self.vehiculos.values()
-            ],
+            intersecciones=self._describir_intersecciones(),
+            vias=self._describir_vias(),
+            vehiculos=self._describir_vehiculos(),
         )
 
-    def inyectar_ambulancia(self, nodo_origen: str, velocidad: float | None = None) -> Vehiculo | None:
+    def _describir_intersecciones(self) -> list[dict[str, object]]:
+        return [
+            {
+                "interseccion_id": interseccion.id_interseccion,
+                "fase_activa": interseccion.fase_activa,
+                "fase_alterna": interseccion.fase_alterna,
+                "duracion_fase_activa": interseccion.duracion_fase_activa,
+                "duracion_fase_alterna": interseccion.duracion_fase_alterna,
+                "ticks_restantes_fase": interseccion.ticks_restantes_fase,
+            }
+            for interseccion in self.ciudad_mapa.intersecciones.values()
+        ]
+
+    def _describir_vias(self) -> list[dict[str, object]]:
+        return [
+            {
+                "via_id": via.id_via,
+                "origen": via.origen,
+                "destino": via.destino,
+                "direccion": via.direccion,
+                "eje": via.eje,
+                "longitud": via.longitud,
+                "vehiculos_en_circulacion": via.vehiculos_en_circulacion,
+                "vehiculos_en_espera": via.vehiculos_en_espera,
+                "velocidad_promedio": via.velocidad_promedio,
+                "flujo_vehicular": via.flujo_vehicular,
+                "score": via.score,
+                "estado_congestion": via.estado_congestion,
+            }
+            for via in self.ciudad_mapa.iterar_vias()
+        ]
+
+    def _describir_vehiculos(self) -> list[dict[str, object]]:
+        return self._describir_flota(self.vehiculos.values())
+
+    def _describir_flota(self, vehiculos: Iterable[Vehiculo]) -> list[dict[str, object]]:
+        nombres_vias = self.ciudad_mapa.nombres_vias.nombres
+        return [
+            {
+                "vehiculo_id": vehiculo.id_vehiculo,
+                "via_actual": nombres_vias[vehiculo.via_actual],
+                "posicion_en_via": vehiculo.posicion_en_via,
+                "velocidad": vehiculo.velocidad,
+                "direccion_actual": vehiculo.direccion_actual,
+                "estado": vehiculo.estado,
+                "tipo": vehiculo.tipo,
+            }
+            for vehiculo in vehiculos
+        ]
+
+    def _describir_retiro(self, vehiculo: Vehiculo, via: Via, motivo: str) -> dict[str, int | str | float]:
+        return {
+            "vehiculo_id": vehiculo.id_vehiculo,
+            "tipo": vehiculo.tipo,
+            "via_actual": via.id_via,
+            "direccion_actual": vehiculo.direccion_actual,
+            "velocidad": vehiculo.velocidad,
+            "motivo": motivo,
+            "nodo_final": via.destino,
+        }
+
+    def _motivo_retiro_al_llegar(self, vehiculo: Vehiculo, via: Via) -> str | None:
+        if vehiculo.destino == via.indice_destino:
+            return "LLEGADA_A_DESTINO"
+        if self.ciudad_mapa.nodo_es_borde[via.indice_destino]:
+            return "SALIDA_DE_LA_CIUDAD"
+        return None
+
+    def inyectar_ambulancia(
+        self,
+        nodo_origen: str,
+        velocidad: float | None = None,
+        nodo_destino: str | None = None,
+    ) -> Vehiculo | None:
         opciones = [via for via in self.vias_entrada if via.origen == nodo_origen]
+        if nodo_destino is not None:
+            tabla_rutas = self._obtener_tabla_rutas()
+            opciones = [via for via in opciones if tabla_rutas.es_alcanzable(via.destino, nodo_destino)]
         if not opciones:
             return None
 
         velocidad_config = float(self.config.get("ambulancias", {}).get("velocidad_constante", 45))
         via = self.randomizador.choice(opciones)
         self.contador_ambulancias += 1
-        vehiculo_id = f"AMB-{self.contador_ambulancias:05d}"
+        vehiculo_id = componer_id_vehiculo(self.contador_ambulancias, ambulancia=True)
         vehiculo = Vehiculo(
             id_vehiculo=vehiculo_id,
-            via_actual=via.id_via,
+            via_actual=via.indice,
             posicion_en_via=0.0,
             velocidad=float(velocidad if velocidad is not None else velocidad_config),
             direccion_actual=via.direccion,
             estado="CIRCULANDO",
             tipo="AMBULANCIA",
+            destino=self.ciudad_mapa.nombres_nodos.buscar(nodo_destino),
         )
-        self.vehiculos[vehiculo_id] = vehiculo
+        self._registrar_vehiculo(vehiculo)
         return vehiculo
 
+    def contar_vehiculos(self) -> int:
+        return len(self.vehiculos)
+
+    def omitir_ticks(self, cantidad: int) -> None:
+        self.ticks_omitidos += cantidad
+
     def obtener_hora_simulada_actual(self) -> str:
         hora_base = datetime.strptime(self.hora_inicio_simulada, "%H:%M")
-        desplazamiento = timedelta(minutes=self.ciudad_mapa.tick_actual * self.minutos_simulados_por_tick)
+        ticks_transcurridos = self.ciudad_mapa.tick_actual + self.ticks_omitidos
+        desplazamiento = timedelta(minutes=ticks_transcurridos * self.minutos_simulados_por_tick)
         hora_actual = hora_base + desplazamiento
         return hora_actual.strftime("%H:%M")
 
     def obtener_rango_simulado(self) -> tuple[str, str]:
         return self.hora_inicio_simulada, self.hora_fin_simulada
 
-    def _generar_vehiculos(self) -> list[Vehiculo]:
-        max_nuevos = int(self.config["max_nuevos_por_tick"])
+    def cerrar(self) -> None:
+        return None
+
+    def guardar_checkpoint(self, ruta: str | Path) -> int:
+        return escribir_checkpoint(
+            ruta,
+            CheckpointSimulacion(
+                firma_mapa=calcular_firma_mapa(self.ciudad_mapa),
+                tipo_motor=self._tipo_checkpoint(),
+                estados=self.exportar_estado(),
+            ),
+        )
+
+    def cargar_checkpoint(self, ruta: str | Path) -> bool:
+        checkpoint = leer_checkpoint(ruta)
+        if checkpoint is None:
+            return False
+        if checkpoint.firma_mapa != calcular_firma_mapa(self.ciudad_mapa):
+            raise ValueError("El checkpoint corresponde a otro mapa de ciudad.")
+        if checkpoint.tipo_motor != self._tipo_checkpoint():
+            raise ValueError(
+                f"El checkpoint es de un motor {checkpoint.tipo_motor} y el motor actual es {self._tipo_checkpoint()}."
+            )
+        self.restaurar_estado(checkpoint.estados)
+        return True
+
+    def exportar_estado(self) -> list[EstadoMotor]:
+        return [self._exportar_estado_local()]
+
+    def restaurar_estado(self, estados: list[EstadoMotor]) -> None:
+        if len(estados) != 1:
+            raise ValueError(f"El checkpoint tiene {len(estados)} partes y el motor espera 1.")
+        self._restaurar_estado_local(estados[0])
+
+    def _tipo_checkpoint(self) -> str:
+        return "unico"
+
+    def _exportar_estado_local(self) -> EstadoMotor:
+        estado = EstadoMotor(
+            tick_actual=self.ciudad_mapa.tick_actual,
+            contador_vehiculos=self.contador_vehiculos,
+            contador_ambulancias=self.contador_ambulancias,
+            ticks_omitidos=self.ticks_omitidos,
+            estado_aleatorio=self.randomizador.getstate(),
+            estado_generador_masivo=(
+                self.generador_masivo.obtener_estado() if self.generador_masivo is not None else ""
+            ),
+            intersecciones=self._resumir_intersecciones(),
+        )
+        self._exportar_flota(estado)
+        return estado
+
+    def _resumir_intersecciones(self) -> list[tuple[str, str, str, int, int, int]]:
+        return [
+            (
+                interseccion.id_interseccion,
+                interseccion.fase_activa,
+                interseccion.fase_alterna,
+                interseccion.duracion_fase_activa,
+                interseccion.duracion_fase_alterna,
+                interseccion.ticks_restantes_fase,
+            )
+            for interseccion in self.ciudad_mapa.intersecciones.values()
+        ]
+
+    def _restaurar_intersecciones(self, intersecciones: list[tuple[str, str, str, int, int, int]]) -> None:
+        for (
+            interseccion_id,
+            fase_activa,
+            fase_alterna,
+            duracion_activa,
+            duracion_alterna,
+            ticks_restantes,
+        ) in intersecciones:
+            interseccion = self.ciudad_mapa.intersecciones[interseccion_id]
+            interseccion.fase_activa = fase_activa
+            interseccion.fase_alterna = fase_alterna
+            interseccion.duracion_fase_activa = duracion_activa
+            interseccion.duracion_fase_alterna = duracion_alterna
+            interseccion.ticks_restantes_fase = ticks_restantes
+
+    def _exportar_flota(self, estado: EstadoMotor) -> None:
+        for vehiculo in self.vehiculos.values():
+            estado.ids_vehiculo.append(vehiculo.id_vehiculo)
+            estado.vias_vehiculo.append(vehiculo.via_actual)
+            estado.posiciones.append(vehiculo.posicion_en_via)
+            estado.velocidades.append(vehiculo.velocidad)
+            estado.direcciones.append(vehiculo.direccion_actual)
+            estado.estados.append(vehiculo.estado)
+            estado.tipos.append(vehiculo.tipo)
+            estado.destinos.append(vehiculo.destino)
+        estado.colas = {via.indice: list(via.cola) for via in self.ciudad_mapa.iterar_vias() if via.cola}
+
+    def _restaurar_estado_local(self, estado: EstadoMotor) -> None:
+        self.ciudad_mapa.tick_actual = estado.tick_actual
+        self.contador_vehiculos = estado.contador_vehiculos
+        self.contador_ambulancias = estado.contador_ambulancias
+        self.ticks_omitidos = estado.ticks_omitidos
+        self.randomizador.setstate(estado.estado_aleatorio)
+        if self.generador_masivo is not None and estado.estado_generador_masivo:
+            self.generador_masivo.restaurar_estado(estado.estado_generador_masivo)
+        self._restaurar_intersecciones(estado.intersecciones)
+        for via in self.ciudad_mapa.iterar_vias():
+            via.vehiculos_en_circulacion = 0
+            via.vehiculos_en_espera = 0
+            via.suma_centesimas_velocidad = 0
+            via.flujo_vehicular = 0
+            via.cola.clear()
+        self._inicializar_flota()
+        self._restaurar_flota(estado)
+        self._actualizar_metricas_vias()
+
+    def _restaurar_flota(self, estado: EstadoMotor) -> None:
+        for vehiculo in estado.iterar_vehiculos():
+            vehiculo.estado = "CIRCULANDO"
+            self._registrar_vehiculo(vehiculo)
+        for indice_via, ids_en_cola in estado.colas.items():
+            via = self.ciudad_mapa.vias_por_indice[indice_via]
+            for vehiculo_id in ids_en_cola:
+                self._encolar_vehiculo(self.vehiculos[vehiculo_id], via)
+
+    def _cupo_generacion(self) -> int:
+        return int(self.config["max_nuevos_por_tick"])
+
+    def _nuevo_id_vehiculo(self) -> int:
+        self.contador_vehiculos += 1
+        return componer_id_vehiculo(self.contador_vehiculos)
+
+    def _probabilidad_generacion(self) -> float:
         probabilidad = float(self.config["probabilidad_generacion_por_via"])
+        if not self.perfil_demanda.activo:
+            return probabilidad
+        return min(1.0, probabilidad * self.perfil_demanda.factor(self.obtener_hora_simulada_actual()))
+
+    def _generar_vehiculos(self) -> list[Vehiculo]:
+        max_nuevos = self._cupo_generacion()
+        probabilidad = self._probabilidad_generacion()
         velocidad_min = float(self.config["velocidad_inicial"]["min"])
         velocidad_max = float(self.config["velocidad_inicial"]["max"])
+        if self.generador_masivo is not None:
+            return self._generar_vehiculos_masivo(max_nuevos, probabilidad, velocidad_min, velocidad_max)
         creados: list[Vehiculo] = []
 
         for via in self.vias_entrada:
@@ -206,24 +397,131 @@ class MotorSimulacion:
                 break
             if self.randomizador.random() > probabilidad:
                 continue
-            self.contador_vehiculos += 1
-            vehiculo_id = f"VEH-{self.contador_vehiculos:05d}"
+            vehiculo_id = self._nuevo_id_vehiculo()
             velocidad = round(self.randomizador.uniform(velocidad_min, velocidad_max), 2)
             vehiculo = Vehiculo(
                 id_vehiculo=vehiculo_id,
-                via_actual=via.id_via,
+                via_actual=via.indice,
                 posicion_en_via=0.0,
                 velocidad=velocidad,
                 direccion_actual=via.direccion,
                 estado="CIRCULANDO",
             )
-            self.vehiculos[vehiculo_id] = vehiculo
+            self._registrar_vehiculo(vehiculo)
             creados.append(vehiculo)
 
         return creados
 
-    def _escoger_siguiente_via(self, via_actual: Via) -> Via | None:
-        opciones = self.ciudad_mapa.obtener_vias_salida(via_actual.destino)
+    def _generar_vehiculos_masivo(
+        self,
+        max_nuevos: int,
+        probabilidad: float,
+        velocidad_min: float,
+        velocidad_max: float,
+    ) -> list[Vehiculo]:
+        indices_vias, velocidades = self.generador_masivo.sortear(
+            len(self.vias_entrada), probabilidad, max_nuevos, velocidad_min, velocidad_max
+        )
+        creados = [
+            Vehiculo(
+                id_vehiculo=self._nuevo_id_vehiculo(),
+                via_actual=via.indice,
+                posicion_en_via=0.0,
+                velocidad=velocidad,
+                direccion_actual=via.direccion,
+                estado="CIRCULANDO",
+            )
+            for via, velocidad in zip(
+                [self.vias_entrada[indice] for indice in indices_vias.tolist()], velocidades.tolist()
+            )
+        ]
+        self._registrar_vehiculos(creados)
+        return creados
+
+    def _registrar_vehiculos(self, vehiculos: list[Vehiculo]) -> None:
+        for vehiculo in vehiculos:
+            self._registrar_vehiculo(vehiculo)
+
+    def _registrar_vehiculo(self, vehiculo: Vehiculo) -> None:
+        self.vehiculos[vehiculo.id_vehiculo] = vehiculo
+        self._ingresar_a_via(self.ciudad_mapa.vias_por_indice[vehiculo.via_actual], vehiculo)
+
+    def _descargar_colas(self) -> list[dict[str, int | str | float]]:
+        vehiculos_eliminados: list[dict[str, int | str | float]] = []
+        for via in self._vias_en_verde_con_cola():
+            descargados = 0
+            while via.cola and (self.descarga_cola_por_tick <= 0 or descargados < self.descarga_cola_por_tick):
+                vehiculo = self.vehiculos[via.cola[0]]
+                descargados += 1
+                siguiente_via = self._escoger_siguiente_via(via, vehiculo.destino)
+                if siguiente_via is None:
+                    vehiculos_eliminados.append(self._describir_retiro(vehiculo, via, "SIN_SALIDA_DISPONIBLE"))
+                    self._eliminar_vehiculo(vehiculo, via)
+                    continue
+                self._trasladar_vehiculo(vehiculo, via, siguiente_via)
+        return vehiculos_eliminados
+
+    def _vias_en_verde_con_cola(self) -> list[Via]:
+        return [
+            via
+            for interseccion in self.ciudad_mapa.intersecciones.values()
+            for via in self.ciudad_mapa.obtener_vias_por_eje(interseccion.indice, interseccion.fase_activa)
+            if via.cola
+        ]
+
+    def _eliminar_vehiculo(self, vehiculo: Vehiculo, via: Via) -> None:
+        self._retirar_de_via(via, vehiculo)
+        del self.vehiculos[vehiculo.id_vehiculo]
+
+    def _encolar_vehiculo(self, vehiculo: Vehiculo, via: Via) -> None:
+        self._retirar_de_via(via, vehiculo)
+        vehiculo.estado = "EN_COLA"
+        vehiculo.posicion_en_via = via.longitud
+        via.cola.append(vehiculo.id_vehiculo)
+        via.vehiculos_en_espera += 1
+
+    def _trasladar_vehiculo(self, vehiculo: Vehiculo, via_actual: Via, siguiente_via: Via) -> None:
+        via_actual.flujo_vehicular += 1
+        self._retirar_de_via(via_actual, vehiculo)
+        vehiculo.via_actual = siguiente_via.indice
+        vehiculo.direccion_actual = siguiente_via.direccion
+        vehiculo.posicion_en_via = 0.0
+        vehiculo.estado = "CIRCULANDO"
+        self._ingresar_a_via(siguiente_via, vehiculo)
+
+    def _ingresar_a_via(self, via: Via, vehiculo: Vehiculo) -> None:
+        via.vehiculos_en_circulacion += 1
+        via.suma_centesimas_velocidad += a_centesimas(vehiculo.velocidad)
+
+    def _retirar_de_via(self, via: Via, vehiculo: Vehiculo) -> None:
+        if vehiculo.estado == "EN_COLA":
+            if via.cola[0] == vehiculo.id_vehiculo:
+                via.cola.popleft()
+            else:
+                via.cola.remove(vehiculo.id_vehiculo)
+            via.vehiculos_en_espera -= 1
+            return
+        via.vehiculos_en_circulacion -= 1
+        via.suma_centesimas_velocidad -= a_centesimas(vehiculo.velocidad)
+
+    def _obtener_tabla_rutas(self) -> TablaRutas:
+        return self.ciudad_mapa.obtener_tabla_rutas()
+
+    def _escoger_siguiente_via(self, via_actual: Via, destino: int = -1) -> Via | None:
+        if not self.perfilador.activo:
+            return self._elegir_siguiente_via(via_actual, destino)
+        inicio = perf_counter_ns()
+        siguiente_via = self._elegir_siguiente_via(via_actual, destino)
+        self.perfilador.acumular("ruteo", inicio)
+        return siguiente_via
+
+    def _elegir_siguiente_via(self, via_actual: Via, destino: int = -1) -> Via | None:
+        if destino >= 0:
+            indice_via = self._obtener_tabla_rutas().siguiente_via(via_actual.indice_destino, destino)
+            if indice_via != SIN_RUTA:
+                return self.ciudad_mapa.vias_por_indice[indice_via]
+
+        opciones = self.ciudad_mapa.salidas_por_nodo[via_actual.indice_destino]
         if not opciones:
             return None
 
@@ -242,37 +540,22 @@ class MotorSimulacion:
 
     def _actualizar_metricas_vias(self) -> None:
         for via in self.ciudad_mapa.iterar_vias():
-            via.vehiculos_en_circulacion = 0
-            via.vehiculos_en_espera = 0
-            via.velocidad_promedio = 0.0
+            self._derivar_metricas_via(via)
+
+    def _derivar_metricas_via(self, via: Via) -> None:
+        via.velocidad_promedio = 0.0
+        if via.vehiculos_en_circulacion:
+            via.velocidad_promedio = round(via.suma_centesimas_velocidad / via.vehiculos_en_circulacion) / 100
+        via.score = min(via.vehiculos_en_espera / 10.0, 1.0)
+
+        if via.vehiculos_en_espera >= 8 or (
+            via.vehiculos_en_circulacion > 0 and via.velocidad_promedio < 15
+        ):
+            via.estado_congestion = "ALTA"
+        elif via.vehiculos_en_espera >= 4:
+            via.estado_congestion = "NORMAL"
+        else:
             via.estado_congestion = "BAJA"
-            via.score = 0.0
-
-        agrupados: dict[str, list[Vehiculo]] = {via.id_via: [] for via in self.ciudad_mapa.iterar_vias()}
-        for vehiculo in self.vehiculos.values():
-            agrupados[vehiculo.via_actual].append(vehiculo)
-
-        for via_id, vehiculos in agrupados.items():
-            via = self.ciudad_mapa.vias[via_id]
-            en_cola = [vehiculo for vehiculo in vehiculos if vehiculo.estado == "EN_COLA"]
-            circulando = [vehiculo for vehiculo in vehiculos if vehiculo.estado == "CIRCULANDO"]
-
-            via.vehiculos_en_circulacion = len(circulando)
-            via.vehiculos_en_espera = len(en_cola)
-            if circulando:
-                via.velocidad_promedio = round(
-                    sum(vehiculo.velocidad for vehiculo in circulando) / len(circulando), 2
-                )
-            via.score = min(via.vehiculos_en_espera / 10.0, 1.0)
-
-            if via.vehiculos_en_espera >= 8 or (
-                via.vehiculos_en_circulacion > 0 and via.velocidad_promedio < 15
-            ):
-                via.estado_congestion = "ALTA"
-            elif via.vehiculos_en_espera >= 4:
-                via.estado_congestion = "NORMAL"
-            else:
-                via.estado_congestion = "BAJA"
 
     def _actualizar_fases_semaforicas(self) -> None:
         for interseccion in self.ciudad_mapa.intersecciones.values():
@@ -289,3 +572,25 @@ class MotorSimulacion:
                 interseccion.duracion_fase_activa,
             )
             interseccion.ticks_restantes_fase = interseccion.duracion_fase_activa
+
+
+def crear_motor_simulacion(
+    ciudad_mapa: CiudadMapa,
+    config_simulacion: dict[str, object],
+) -> MotorSimulacion:
+    tipo_motor = str(config_simulacion.get("motor", "clasico"))
+    if tipo_motor == "clasico":
+        return MotorSimulacion(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+    if tipo_motor == "vectorizado":
+        from common.modelos.simulacion_vectorizada import MotorSimulacionVectorizado
+
+        return MotorSimulacionVectorizado(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+    if tipo_motor == "eventos":
+        from common.modelos.simulacion_eventos import MotorSimulacionEventos
+
+        return MotorSimulacionEventos(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+    if tipo_motor == "particionado":
+        from common.modelos.simulacion_particionada import MotorSimulacionParticionado
+
+        return MotorSimulacionParticionado(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+    raise ValueError(f"Motor de simulacion no soportado: {tipo_motor}")
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import heapq
+
+from common.mensajes.comandos import ComandoSemaforo
+from common.modelos.checkpoint import EstadoMotor
+from common.modelos.simulacion import MotorSimulacion, ResultadoTick
+from common.modelos.trafico import CiudadMapa, Via
+from common.modelos.vehiculos import Vehiculo
+
+
+def calcular_ticks_hasta_final(posicion: float, longitud: float, velocidad: float) -> int | None:
+    if velocidad <= 0:
+        return None
+    ticks = 0
+    while posicion < longitud:
+        posicion += velocidad
+        ticks += 1
+    return ticks
+
+
+class MotorSimulacionEventos(MotorSimulacion):
+    def __init__(self, ciudad_mapa: CiudadMapa, config_simulacion: dict[str, object]) -> None:
+        super().__init__(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+        self.agenda_fases: list[tuple[int, int, int]] = []
+        self.tick_cambio_fase: dict[int, int] = {}
+        self.version_fase: dict[int, int] = {}
+        self.vias_con_cola: dict[int, Via] = {}
+        self.rango_descarga_via = {
+            via.indice: (orden_interseccion, posicion)
+            for orden_interseccion, interseccion in enumerate(self.ciudad_mapa.intersecciones.values())
+            for eje in ("HORIZONTAL", "VERTICAL")
+            for posicion, via in enumerate(self.ciudad_mapa.obtener_vias_por_eje(interseccion.indice, eje))
+        }
+        self.vias_con_flujo: list[Via] = []
+        self.vias_modificadas: dict[int, Via] = {via.indice: via for via in self.ciudad_mapa.iterar_vias()}
+        self.primer_tick_movimiento = self.ciudad_mapa.tick_actual + 1
+        for interseccion in self.ciudad_mapa.intersecciones.values():
+            self._programar_cambio_fase(interseccion.indice)
+
+    def _inicializar_flota(self) -> None:
+        self.vehiculos: dict[int, Vehiculo] = {}
+        self.agenda_vehiculos: list[tuple[int, int, int]] = []
+        self.orden_vehiculo: dict[int, int] = {}
+        self.referencia_vehiculo: dict[int, tuple[int, float]] = {}
+        self.tick_llegada_vehiculo: dict[int, int] = {}
+        self.cantidad_en_cola = 0
+        self.contador_orden = 0
+
+    def avanzar_tick(self) -> ResultadoTick:
+        self.perfilador.iniciar()
+        self.ciudad_mapa.tick_actual += 1
+        tick = self.ciudad_mapa.tick_actual
+        for via in self.vias_con_flujo:
+            via.flujo_vehicular = 0
+        self.vias_con_flujo = []
+
+        self.primer_tick_movimiento = tick
+        vehiculos_creados = self._generar_vehiculos()
+        self.primer_tick_movimiento = tick + 1
+        self.perfilador.marcar("generacion")
+        movidos = len(self.vehiculos) - self.cantidad_en_cola
+
+        vehiculos_eliminados: list[dict[str, int | str | float]] = []
+        for vehiculo in self._extraer_llegadas(tick):
+            via_actual = self.ciudad_mapa.vias_por_indice[vehiculo.via_actual]
+            motivo = self._motivo_retiro_al_llegar(vehiculo, via_actual)
+            if motivo is not None:
+                vehiculos_eliminados.append(self._describir_retiro(vehiculo, via_actual, motivo))
+                self._eliminar_vehiculo(vehiculo, via_actual)
+                continue
+            self._encolar_vehiculo(vehiculo, via_actual)
+        self.perfilador.marcar("movimiento")
+
+        vehiculos_eliminados.extend(self._descargar_colas())
+        self.perfilador.marcar("descarga_colas")
+
+        self._actualizar_metricas_vias()
+        self.perfilador.marcar("metricas")
+        self._actualizar_fases_semaforicas()
+        self.perfilador.marcar("semaforos")
+        return ResultadoTick(
+            tick=tick,
+            creados=len(vehiculos_creados),
+            eliminados=len(vehiculos_eliminados),
+            movidos=movidos,
+            vehiculos_creados=vehiculos_creados,
+            vehiculos_eliminados=vehiculos_eliminados,
+            duraciones_fases=self.perfilador.cerrar(),
+        )
+
+    def aplicar_comando_semaforo(self, comando: ComandoSemaforo) -> None:
+        super().aplicar_comando_semaforo(comando)
+        self._programar_cambio_fase(self.ciudad_mapa.intersecciones[comando.interseccion].indice)
+
+    def _extraer_llegadas(self, tick: int) -> list[Vehiculo]:
+        llegadas: list[Vehiculo] = []
+        while self.agenda_vehiculos and self.agenda_vehiculos[0][0] <= tick:
+            tick_llegada, _, vehiculo_id = heapq.heappop(self.agenda_vehiculos)
+            if self.tick_llegada_vehiculo.get(vehiculo_id) != tick_llegada:
+                continue
+            del self.tick_llegada_vehiculo[vehiculo_id]
+            llegadas.append(self.vehiculos[vehiculo_id])
+        return llegadas
+
+    def _vias_en_verde_con_cola(self) -> list[Via]:
+        en_verde = [
+            via
+            for via in self.vias_con_cola.values()
+            if self.ciudad_mapa.intersecciones_por_indice[via.indice_destino].fase_activa == via.eje
+        ]
+        en_verde.sort(key=lambda via: self.rango_descarga_via[via.indice])
+        return en_verde
+
+    def _registrar_vehiculo(self, vehiculo: Vehiculo) -> None:
+        self.contador_orden += 1
+        self.orden_vehiculo[vehiculo.id_vehiculo] = self.contador_orden
+        super()._registrar_vehiculo(vehiculo)
+        self._programar_llegada(vehiculo, self.primer_tick_movimiento - 1)
+
+    def _eliminar_vehiculo(self, vehiculo: Vehiculo, via: Via) -> None:
+        super()._eliminar_vehiculo(vehiculo, via)
+        del self.orden_vehiculo[vehiculo.id_vehiculo]
+        del self.referencia_vehiculo[vehiculo.id_vehiculo]
+        self.tick_llegada_vehiculo.pop(vehiculo.id_vehiculo, None)
+
+    def _encolar_vehiculo(self, vehiculo: Vehiculo, via: Via) -> None:
+        super()._encolar_vehiculo(vehiculo, via)
+        self.vias_con_cola[via.indice] = via
+        self.cantidad_en_cola += 1
+
+    def _trasladar_vehiculo(self, vehiculo: Vehiculo, via_actual: Via, siguiente_via: Via) -> None:
+        self.vias_con_flujo.append(via_actual)
+        super()._trasladar_vehiculo(vehiculo, via_actual, siguiente_via)
+        self._programar_llegada(vehiculo, self.ciudad_mapa.tick_actual)
+
+    def _retirar_de_via(self, via: Via, vehiculo: Vehiculo) -> None:
+        en_cola = vehiculo.estado == "EN_COLA"
+        super()._retirar_de_via(via, vehiculo)
+        if en_cola:
+            self.cantidad_en_cola -= 1
+            if not via.cola:
+                del self.vias_con_cola[via.indice]
+        self.vias_modificadas[via.indice] = via
+
+    def _ingresar_a_via(self, via: Via, vehiculo: Vehiculo) -> None:
+        super()._ingresar_a_via(via, vehiculo)
+        self.vias_modificadas[via.indice] = via
+
+    def _programar_llegada(self, vehiculo: Vehiculo, tick_base: int) -> None:
+        self.referencia_vehiculo[vehiculo.id_vehiculo] = (tick_base, vehiculo.posicion_en_via)
+        via = self.ciudad_mapa.vias_por_indice[vehiculo.via_actual]
+        ticks = calcular_ticks_hasta_final(vehiculo.posicion_en_via, via.longitud, vehiculo.velocidad)
+        if ticks is None:
+            return
+        tick_llegada = tick_base + ticks
+        self.tick_llegada_vehiculo[vehiculo.id_vehiculo] = tick_llegada
+        heapq.heappush(
+            self.agenda_vehiculos,
+            (tick_llegada, self.orden_vehiculo[vehiculo.id_vehiculo], vehiculo.id_vehiculo),
+        )
+
+    def _programar_cambio_fase(self, indice_interseccion: int) -> None:
+        interseccion = self.ciudad_mapa.intersecciones_por_indice[indice_interseccion]
+        tick_cambio = self.ciudad_mapa.tick_actual + max(interseccion.ticks_restantes_fase, 1)
+        version = self.version_fase.get(indice_interseccion, 0) + 1
+        self.version_fase[indice_interseccion] = version
+        self.tick_cambio_fase[indice_interseccion] = tick_cambio
+        heapq.heappush(self.agenda_fases, (tick_cambio, indice_interseccion, version))
+
+    def _exportar_estado_local(self) -> EstadoMotor:
+        self.sincronizar_estado()
+        return super()._exportar_estado_local()
+
+    def _exportar_flota(self, estado: EstadoMotor) -> None:
+        super()._exportar_flota(estado)
+        for indice, vehiculo_id in enumerate(estado.ids_vehiculo):
+            if estado.estados[indice] == "EN_COLA":
+                continue
+            tick_base, posicion = self.referencia_vehiculo[vehiculo_id]
+            velocidad = estado.velocidades[indice]
+            for _ in range(self.ciudad_mapa.tick_actual - tick_base):
+                posicion += velocidad
+            estado.posiciones[indice] = posicion
+
+    def _restaurar_estado_local(self, estado: EstadoMotor) -> None:
+        self.agenda_fases = []
+        self.tick_cambio_fase = {}
+        self.version_fase = {}
+        self.vias_con_cola = {}
+        self.vias_con_flujo = []
+        self.vias_modificadas = {via.indice: via for via in self.ciudad_mapa.iterar_vias()}
+        self.primer_tick_movimiento = estado.tick_actual + 1
+        super()._restaurar_estado_local(estado)
+        for interseccion in self.ciudad_mapa.intersecciones.values():
+            self._programar_cambio_fase(interseccion.indice)
+
+    def _restaurar_flota(self, estado: EstadoMotor) -> None:
+        super()._restaurar_flota(estado)
+        for ids_en_cola in estado.colas.values():
+            for vehiculo_id in ids_en_cola:
+                self.tick_llegada_vehiculo.pop(vehiculo_id, None)
+
+    def _calcular_posicion(self, vehiculo: Vehiculo) -> float:
+        if vehiculo.estado == "EN_COLA":
+            return vehiculo.posicion_en_via
+        tick_base, posicion = self.referencia_vehiculo[vehiculo.id_vehiculo]
+        tick_actual = self.ciudad_mapa.tick_actual
+        if tick_actual > tick_base:
+            for _ in range(tick_actual - tick_base):
+                posicion += vehiculo.velocidad
+            self.referencia_vehiculo[vehiculo.id_vehiculo] = (tick_actual, posicion)
+        return posicion
+
+    def sincronizar_estado(self) -> None:
+        for vehiculo in self.vehiculos.values():
+            vehiculo.posicion_en_via = self._calcular_posicion(vehiculo)
+        for interseccion in self.ciudad_mapa.intersecciones.values():
+            interseccion.ticks_restantes_fase = self.tick_cambio_fase[interseccion.indice] - self.ciudad_mapa.tick_actual
+
+    def _describir_intersecciones(self) -> list[dict[str, object]]:
+        self.sincronizar_estado()
+        return super()._describir_intersecciones()
+
+    def _describir_vehiculos(self) -> list[dict[str, object]]:
+        self.sincronizar_estado()
+        return super()._describir_vehiculos()
+
+    def _actualizar_metricas_vias(self) -> None:
+        for via in self.vias_modificadas.values():
+            self._derivar_metricas_via(via)
+        self.vias_modificadas = {}
+
+    def _actualizar_fases_semaforicas(self) -> None:
+        tick = self.ciudad_mapa.tick_actual
+        while self.agenda_fases and self.agenda_fases[0][0] <= tick:
+            _, indice_interseccion, version = heapq.heappop(self.agenda_fases)
+            if self.version_fase[indice_interseccion] != version:
+                continue
+            interseccion = self.ciudad_mapa.intersecciones_por_indice[indice_interseccion]
+            interseccion.fase_activa, interseccion.fase_alterna = (
+                interseccion.fase_alterna,
+                interseccion.fase_activa,
+            )
+            interseccion.duracion_fase_activa, interseccion.duracion_fase_alterna = (
+                interseccion.duracion_fase_alterna,
+                interseccion.duracion_fase_activa,
+            )
+            interseccion.ticks_restantes_fase = interseccion.duracion_fase_activa
+            self._programar_cambio_fase(indice_interseccion)
@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import copy
+import multiprocessing
+import random
+from multiprocessing.connection import Connection, wait
+from time import perf_counter_ns
+
+from common.mensajes.comandos import ComandoSemaforo
+from common.modelos.checkpoint import EstadoMotor
+from common.modelos.generacion import GeneradorMasivo
+from common.modelos.identificadores import componer_id_vehiculo
+from common.modelos.rutas import TablaRutas
+from common.modelos.simulacion import MotorSimulacion, ResultadoTick
+from common.modelos.trafico import CiudadMapa, Via
+from common.modelos.vehiculos import Vehiculo
+
+DescripcionRegion = tuple[list[tuple[str, str, str, int, int, int]], list[dict[str, object]]]
+RespuestaRegion = tuple[
+    ResultadoTick,
+    list[tuple[int, Vehiculo]],
+    list[tuple[int, tuple[object, ...]]],
+    DescripcionRegion | None,
+]
+
+
+def asignar_regiones(ciudad_mapa: CiudadMapa, filas_region: int, columnas_region: int) -> dict[str, int]:
+    filas = max(interseccion.fila for interseccion in ciudad_mapa.intersecciones.values()) + 1
+    columnas = max(interseccion.columna for interseccion in ciudad_mapa.intersecciones.values()) + 1
+    filas_region = max(1, min(filas_region, filas))
+    columnas_region = max(1, min(columnas_region, columnas))
+    return {
+        interseccion.id_interseccion: (interseccion.fila * filas_region // filas) * columnas_region
+        + interseccion.columna * columnas_region // columnas
+        for interseccion in ciudad_mapa.intersecciones.values()
+    }
+
+
+def asignar_vias(ciudad_mapa: CiudadMapa, region_por_interseccion: dict[str, int]) -> list[int]:
+    region_por_via = [0] * len(ciudad_mapa.nombres_vias)
+    for via in ciudad_mapa.iterar_vias():
+        region_por_via[via.indice] = region_por_interseccion.get(
+            via.destino, region_por_interseccion.get(via.origen, 0)
+        )
+    return region_por_via
+
+
+def construir_submapa(
+    ciudad_mapa: CiudadMapa,
+    region_por_interseccion: dict[str, int],
+    region_por_via: list[int],
+    indice_region: int,
+) -> CiudadMapa:
+    intersecciones = {
+        interseccion_id: interseccion
+        for interseccion_id, interseccion in ciudad_mapa.intersecciones.items()
+        if region_por_interseccion[interseccion_id] == indice_region
+    }
+    vias = {
+        via.id_via: via
+        for via in ciudad_mapa.iterar_vias()
+        if region_por_via[via.indice] == indice_region or via.origen in intersecciones
+    }
+    submapa = CiudadMapa(
+        intersecciones=copy.deepcopy(intersecciones),
+        nodos_borde=copy.deepcopy(ciudad_mapa.nodos_borde),
+        vias=copy.deepcopy(vias),
+        tick_actual=ciudad_mapa.tick_actual,
+        nombres_nodos=ciudad_mapa.nombres_nodos,
+        nombres_vias=ciudad_mapa.nombres_vias,
+    )
+    submapa.indexar_vias()
+    return submapa
+
+
+class MotorSimulacionRegion(MotorSimulacion):
+    def __init__(
+        self,
+        ciudad_mapa: CiudadMapa,
+        config_simulacion: dict[str, object],
+        region_por_via: list[int],
+        indice_region: int,
+        cantidad_regiones: int,
+        rango_generacion: tuple[int, int] | None,
+        tabla_rutas: TablaRutas,
+    ) -> None:
+        super().__init__(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+        self.randomizador = random.Random(f"{int(config_simulacion.get('semilla', 0))}:{indice_region}")
+        if self.generador_masivo is not None:
+            self.generador_masivo = GeneradorMasivo(int(config_simulacion.get("semilla", 0)), indice_region + 1)
+        self.region_por_via = region_por_via
+        self.indice_region = indice_region
+        self.cantidad_regiones = cantidad_regiones
+        self.rango_generacion = rango_generacion
+        self.tabla_rutas = tabla_rutas
+        self.vias_propias = [
+            via for via in self.ciudad_mapa.iterar_vias() if region_por_via[via.indice] == indice_region
+        ]
+        self.vias_entrada = [via for via in self.vias_propias if self.ciudad_mapa.es_nodo_borde(via.origen)]
+        self.emigrantes: list[tuple[int, Vehiculo]] = []
+        self.valores_enviados: list[tuple[object, ...] | None] = [None] * len(region_por_via)
+
+    def _cupo_generacion(self) -> int:
+        if self.rango_generacion is None:
+            return 0
+        posicion, regiones_generadoras = self.rango_generacion
+        max_nuevos = super()._cupo_generacion()
+        base, resto = divmod(max_nuevos, regiones_generadoras)
+        turno = (posicion + self.ciudad_mapa.tick_actual) % regiones_generadoras
+        return base + (1 if turno < resto else 0)
+
+    def _nuevo_id_vehiculo(self) -> int:
+        self.contador_vehiculos += 1
+        numero = (self.contador_vehiculos - 1) * self.cantidad_regiones + self.indice_region + 1
+        return componer_id_vehiculo(numero)
+
+    def _obtener_tabla_rutas(self) -> TablaRutas:
+        return self.tabla_rutas
+
+    def _trasladar_vehiculo(self, vehiculo: Vehiculo, via_actual: Via, siguiente_via: Via) -> None:
+        super()._trasladar_vehiculo(vehiculo, via_actual, siguiente_via)
+        region_destino = self.region_por_via[siguiente_via.indice]
+        if region_destino != self.indice_region:
+            self._eliminar_vehiculo(vehiculo, siguiente_via)
+            self.emigrantes.append((region_destino, vehiculo))
+
+    def _actualizar_metricas_vias(self) -> None:
+        for via in self.vias_propias:
+            self._derivar_metricas_via(via)
+
+    def entregar_emigrantes(self) -> list[tuple[int, Vehiculo]]:
+        emigrantes, self.emigrantes = self.emigrantes, []
+        return emigrantes
+
+    def registrar_vehiculos(self, vehiculos: list[Vehiculo]) -> None:
+        vias_afectadas: dict[int, Via] = {}
+        for vehiculo in vehiculos:
+            self._registrar_vehiculo(vehiculo)
+            vias_afectadas[vehiculo.via_actual] = self.ciudad_mapa.vias_por_indice[vehiculo.via_actual]
+        for indice_via, via in vias_afectadas.items():
+            self._derivar_metricas_via(via)
+            self.valores_enviados[indice_via] = None
+
+    def resumir_cambios(self) -> list[tuple[int, tuple[object, ...]]]:
+        cambios: list[tuple[int, tuple[object, ...]]] = []
+        for via in self.vias_propias:
+            valores = (
+                via.vehiculos_en_circulacion,
+                via.vehiculos_en_espera,
+                via.suma_centesimas_velocidad,
+                via.velocidad_promedio,
+                via.flujo_vehicular,
+                via.score,
+                via.estado_congestion,
+            )
+            if valores != self.valores_enviados[via.indice]:
+                self.valores_enviados[via.indice] = valores
+                cambios.append((via.indice, valores))
+        return cambios
+
+    def restaurar_estado(self, estados: list[EstadoMotor]) -> None:
+        super().restaurar_estado(estados)
+        self.valores_enviados = [None] * len(self.valores_enviados)
+
+    def describir(self) -> DescripcionRegion:
+        return self._resumir_intersecciones(), self._describir_vehiculos()
+
+
+def ejecutar_region(conexion: Connection, motor: MotorSimulacionRegion) -> None:
+    while True:
+        orden, datos = conexion.recv()
+        if orden == "avanzar":
+            inmigrantes, comandos, ambulancias, ticks_omitidos, describir = datos
+            motor.registrar_vehiculos(inmigrantes)
+            motor.ticks_omitidos = ticks_omitidos
+            for comando in comandos:
+                motor.aplicar_comando_semaforo(comando)
+            motor.registrar_vehiculos(ambulancias)
+            resultado = motor.avanzar_tick()
+            inicio = perf_counter_ns()
+            cambios = motor.resumir_cambios()
+            descripcion = motor.describir() if describir else None
+            if motor.perfilador.activo:
+                resultado.duraciones_fases["resumen_region"] = perf_counter_ns() - inicio
+            conexion.send((resultado, motor.entregar_emigrantes(), cambios, descripcion))
+        elif orden == "describir":
+            conexion.send(motor.describir())
+        elif orden == "exportar":
+            motor.registrar_vehiculos(datos)
+            conexion.send(motor.exportar_estado()[0])
+        elif orden == "restaurar":
+            motor.restaurar_estado([datos])
+            conexion.send(motor.resumir_cambios())
+        elif orden == "cerrar":
+            conexion.close()
+            return
+
+
+class MotorSimulacionParticionado(MotorSimulacion):
+    def __init__(self, ciudad_mapa: CiudadMapa, config_simulacion: dict[str, object]) -> None:
+        super().__init__(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+        particiones = dict(config_simulacion.get("particiones", {}))
+        self.filas_region = int(particiones.get("filas", 2))
+        self.columnas_region = int(particiones.get("columnas", 2))
+        self.region_por_interseccion = asignar_regiones(
+            self.ciudad_mapa,
+            filas_region=self.filas_region,
+            columnas_region=self.columnas_region,
+        )
+        self.region_por_via = asignar_vias(self.ciudad_mapa, self.region_por_interseccion)
+        regiones = sorted(set(self.region_por_interseccion.values()))
+        indice_por_region = {region: indice for indice, region in enumerate(regiones)}
+        self.region_por_interseccion = {
+            interseccion_id: indice_por_region[region]
+            for interseccion_id, region in self.region_por_interseccion.items()
+        }
+        self.region_por_via = [indice_por_region[region] for region in self.region_por_via]
+        self.cantidad_regiones = len(regiones)
+        self.tick_ultima_descripcion = 0
+        self.intervalo_descripcion = 0
+        self.nanosegundos_por_region: list[int] = [0] * self.cantidad_regiones
+
+        vias_por_region: list[list[Via]] = [[] for _ in range(self.cantidad_regiones)]
+        for via in self.ciudad_mapa.iterar_vias():
+            vias_por_region[self.region_por_via[via.indice]].append(via)
+        generadoras = [
+            indice
+            for indice, vias in enumerate(vias_por_region)
+            if any(self.ciudad_mapa.es_nodo_borde(via.origen) for via in vias)
+        ]
+        tabla_rutas = self.ciudad_mapa.obtener_tabla_rutas()
+        contexto = multiprocessing.get_context("spawn")
+        self.procesos: list[multiprocessing.process.BaseProcess] = []
+        self.conexiones: list[Connection] = []
+        for indice in range(self.cantidad_regiones):
+            motor_region = MotorSimulacionRegion(
+                ciudad_mapa=construir_submapa(
+                    self.ciudad_mapa, self.region_por_interseccion, self.region_por_via, indice
+                ),
+                config_simulacion=config_simulacion,
+                region_por_via=self.region_por_via,
+                indice_region=indice,
+                cantidad_regiones=self.cantidad_regiones,
+                rango_generacion=(generadoras.index(indice), len(generadoras)) if indice in generadoras else None,
+                tabla_rutas=tabla_rutas,
+            )
+            extremo_coordinador, extremo_region = contexto.Pipe()
+            proceso = contexto.Process(
+                target=ejecutar_region,
+                args=(extremo_region, motor_region),
+                name=f"PC0-Region-{indice}",
+                daemon=True,
+            )
+            proceso.start()
+            extremo_region.close()
+            self.procesos.append(proceso)
+            self.conexiones.append(extremo_coordinador)
+
+    def _inicializar_flota(self) -> None:
+        self.comandos_pendientes: dict[int, list[ComandoSemaforo]] = {}
+        self.ambulancias_pendientes: dict[int, list[Vehiculo]] = {}
+        self.inmigrantes_pendientes: dict[int, list[Vehiculo]] = {}
+        self.descripciones_regiones: list[dict[str, object]] | None = None
+
+    def contar_vehiculos(self) -> int:
+        return sum(
+            via.vehiculos_en_circulacion + via.vehiculos_en_espera for via in self.ciudad_mapa.iterar_vias()
+        ) + sum(len(ambulancias) for ambulancias in self.ambulancias_pendientes.values())
+
+    def avanzar_tick(self) -> ResultadoTick:
+        self.perfilador.iniciar()
+        self.ciudad_mapa.tick_actual += 1
+        describir = (
+            self.intervalo_descripcion > 0
+            and self.ciudad_mapa.tick_actual - self.tick_ultima_descripcion == self.intervalo_descripcion
+        )
+        for indice, conexion in enumerate(self.conexiones):
+            conexion.send(
+                (
+                    "avanzar",
+                    (
+                        self.inmigrantes_pendientes.pop(indice, []),
+                        self.comandos_pendientes.pop(indice, []),
+                        self.ambulancias_pendientes.pop(indice, []),
+                        self.ticks_omitidos,
+                        describir,
+                    ),
+                )
+            )
+        self.descripciones_regiones = None
+        self.perfilador.marcar("envio")
+
+        respuestas: list[RespuestaRegion | None] = [None] * self.cantidad_regiones
+        pendientes = {conexion: indice for indice, conexion in enumerate(self.conexiones)}
+        while pendientes:
+            for conexion in wait(list(pendientes)):
+                indice = pendientes.pop(conexion)
+                respuestas[indice] = respuesta = conexion.recv()
+                self._aplicar_cambios_vias(respuesta[2])
+        self.perfilador.marcar("avance_regiones")
+
+        vias_afectadas: dict[int, Via] = {}
+        for _, emigrantes, _, _ in respuestas:
+            for region_destino, vehiculo in emigrantes:
+                self.inmigrantes_pendientes.setdefault(region_destino, []).append(vehiculo)
+                via = self.ciudad_mapa.vias_por_indice[vehiculo.via_actual]
+                self._ingresar_a_via(via, vehiculo)
+                vias_afectadas[via.indice] = via
+        for via in vias_afectadas.values():
+            self._derivar_metricas_via(via)
+        self.perfilador.marcar("migracion")
+
+        if describir:
+            self._sincronizar_con_descripciones([respuesta[3] for respuesta in respuestas])
+        resultados = [respuesta[0] for respuesta in respuestas]
+        vehiculos_creados = [vehiculo for resultado in resultados for vehiculo in resultado.vehiculos_creados]
+        vehiculos_eliminados = [
+            vehiculo for resultado in resultados for vehiculo in resultado.vehiculos_eliminados
+        ]
+        self.perfilador.marcar("fusion")
+        if self.perfilador.activo:
+            for indice, resultado in enumerate(resultados):
+                self.nanosegundos_por_region[indice] = sum(resultado.duraciones_fases.values())
+                for fase, duracion in resultado.duraciones_fases.items():
+                    self.perfilador.duraciones[fase] = max(self.perfilador.duraciones.get(fase, 0), duracion)
+        return ResultadoTick(
+            tick=self.ciudad_mapa.tick_actual,
+            creados=len(vehiculos_creados),
+            eliminados=len(vehiculos_eliminados),
+            movidos=sum(resultado.movidos for resultado in resultados),
+            vehiculos_creados=vehiculos_creados,
+            vehiculos_eliminados=vehiculos_eliminados,
+            duraciones_fases=self.perfilador.cerrar(),
+        )
+
+    def aplicar_comando_semaforo(self, comando: ComandoSemaforo) -> None:
+        super().aplicar_comando_semaforo(comando)
+        region = self.region_por_interseccion[comando.interseccion]
+        self.comandos_pendientes.setdefault(region, []).append(comando)
+
+    def _registrar_vehiculo(self, vehiculo: Vehiculo) -> None:
+        region = self.region_por_via[vehiculo.via_actual]
+        self.ambulancias_pendientes.setdefault(region, []).append(vehiculo)
+
+    def _aplicar_cambios_vias(self, cambios: list[tuple[int, tuple[object, ...]]]) -> None:
+        vias = self.ciudad_mapa.vias_por_indice
+        for indice_via, valores in cambios:
+            via = vias[indice_via]
+            (
+                via.vehiculos_en_circulacion,
+                via.vehiculos_en_espera,
+                via.suma_centesimas_velocidad,
+                via.velocidad_promedio,
+                via.flujo_vehicular,
+                via.score,
+                via.estado_congestion,
+            ) = valores
+
+    def _sincronizar_con_descripciones(self, descripciones: list[DescripcionRegion]) -> None:
+        for intersecciones, _ in descripciones:
+            self._restaurar_intersecciones(intersecciones)
+        for comandos in self.comandos_pendientes.values():
+            for comando in comandos:
+                MotorSimulacion.aplicar_comando_semaforo(self, comando)
+        self.descripciones_regiones = [
+            descripcion for _, vehiculos in descripciones for descripcion in vehiculos
+        ]
+
+    def sincronizar_estado(self) -> None:
+        if self.descripciones_regiones is not None:
+            return
+        for conexion in self.conexiones:
+            conexion.send(("describir", None))
+        self._sincronizar_con_descripciones([conexion.recv() for conexion in self.conexiones])
+
+    def exportar_estado(self) -> list[EstadoMotor]:
+        for indice, conexion in enumerate(self.conexiones):
+            conexion.send(("exportar", self.inmigrantes_pendientes.pop(indice, [])))
+        estados = [conexion.recv() for conexion in self.conexiones]
+        self._sincronizar_con_descripciones([(estado.intersecciones, []) for estado in estados])
+        self.descripciones_regiones = None
+        return [self._exportar_estado_local(), *estados]
+
+    def restaurar_estado(self, estados: list[EstadoMotor]) -> None:
+        if len(estados) != self.cantidad_regiones + 1:
+            raise ValueError(
+                f"El checkpoint tiene {len(estados)} partes y el motor espera {self.cantidad_regiones + 1}."
+            )
+        self._restaurar_estado_local(estados[0])
+        for conexion, estado in zip(self.conexiones, estados[1:]):
+            conexion.send(("restaurar", estado))
+        for conexion in self.conexiones:
+            self._aplicar_cambios_vias(conexion.recv())
+
+    def _tipo_checkpoint(self) -> str:
+        return f"particionado:{self.filas_region}x{self.columnas_region}"
+
+    def _exportar_flota(self, estado: EstadoMotor) -> None:
+        return None
+
+    def _restaurar_flota(self, estado: EstadoMotor) -> None:
+        return None
+
+    def _describir_intersecciones(self) -> list[dict[str, object]]:
+        self.sincronizar_estado()
+        return super()._describir_intersecciones()
+
+    def _describir_vehiculos(self) -> list[dict[str, object]]:
+        self.sincronizar_estado()
+        tick = self.ciudad_mapa.tick_actual
+        if tick != self.tick_ultima_descripcion:
+            self.intervalo_descripcion = tick - self.tick_ultima_descripcion
+            self.tick_ultima_descripcion = tick
+        en_transito = [vehiculo for inmigrantes in self.inmigrantes_pendientes.values() for vehiculo in inmigrantes]
+        return self.descripciones_regiones + self._describir_flota(en_transito)
+
+    def cerrar(self) -> None:
+        for conexion in self.conexiones:
+            conexion.send(("cerrar", None))
+            conexion.close()
+        for proceso in self.procesos:
+            proceso.join()
+        self.conexiones = []
+        self.procesos = []
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+
+from common.modelos.checkpoint import EstadoMotor
+from common.modelos.simulacion import MotorSimulacion, ResultadoTick, a_centesimas
+from common.modelos.trafico import CiudadMapa
+from common.modelos.vehiculos import Vehiculo
+
+ESTADOS_VEHICULO = ("CIRCULANDO", "EN_COLA")
+TIPOS_VEHICULO = ("NORMAL", "AMBULANCIA")
+CAPACIDAD_INICIAL = 1024
+
+
+class MotorSimulacionVectorizado(MotorSimulacion):
+    def __init__(self, ciudad_mapa: CiudadMapa, config_simulacion: dict[str, object]) -> None:
+        super().__init__(ciudad_mapa=ciudad_mapa, config_simulacion=config_simulacion)
+        self.lista_vias = self.ciudad_mapa.vias_por_indice
+        self.longitud_via = np.array([via.longitud for via in self.lista_vias], dtype=np.float64)
+        self.salida_via = np.array(
+            [self.ciudad_mapa.nodo_es_borde[via.indice_destino] for via in self.lista_vias], dtype=bool
+        )
+        self.nodo_destino_via = np.array([via.indice_destino for via in self.lista_vias], dtype=np.int32)
+        self.colas_via: list[deque[int]] = [deque() for _ in self.lista_vias]
+        self.indices_vias_por_eje = {
+            clave: [via.indice for via in vias]
+            for clave, vias in self.ciudad_mapa.vias_por_eje.items()
+        }
+
+    def _inicializar_flota(self) -> None:
+        self.cantidad_vehiculos = 0
+        self.contador_orden = 0
+        self.orden_vehiculo = np.zeros(CAPACIDAD_INICIAL, dtype=np.int64)
+        self.ids_vehiculo = np.zeros(CAPACIDAD_INICIAL, dtype=np.int64)
+        self.posicion = np.zeros(CAPACIDAD_INICIAL, dtype=np.float64)
+        self.velocidad = np.zeros(CAPACIDAD_INICIAL, dtype=np.float64)
+        self.centesimas_velocidad = np.zeros(CAPACIDAD_INICIAL, dtype=np.int64)
+        self.via_vehiculo = np.zeros(CAPACIDAD_INICIAL, dtype=np.int32)
+        self.estado_vehiculo = np.zeros(CAPACIDAD_INICIAL, dtype=np.int8)
+        self.tipo_vehiculo = np.zeros(CAPACIDAD_INICIAL, dtype=np.int8)
+        self.destino_vehiculo = np.full(CAPACIDAD_INICIAL, -1, dtype=np.int32)
+
+    @property
+    def vehiculos(self) -> dict[int, Vehiculo]:
+        return {
+            vehiculo.id_vehiculo: vehiculo
+            for vehiculo in (
+                self._materializar_vehiculo(indice) for indice in range(self.cantidad_vehiculos)
+            )
+        }
+
+    def contar_vehiculos(self) -> int:
+        return self.cantidad_vehiculos
+
+    def avanzar_tick(self) -> ResultadoTick:
+        self.perfilador.iniciar()
+        self.ciudad_mapa.tick_actual += 1
+        for via in self.lista_vias:
+            via.flujo_vehicular = 0
+        vehiculos_creados = self._generar_vehiculos()
+        self.perfilador.marcar("generacion")
+
+        total = self.cantidad_vehiculos
+        posicion = self.posicion[:total]
+        velocidad = self.velocidad[:total]
+        via_vehiculo = self.via_vehiculo[:total]
+        estado = self.estado_vehiculo[:total]
+
+        circulando = estado == 0
+        np.add(posicion, velocidad, out=posicion, where=circulando)
+        movidos = int(np.count_nonzero(circulando))
+
+        llegados = np.flatnonzero(circulando & (posicion >= self.longitud_via[via_vehiculo]))
+        indices_eliminados: list[int] = []
+        vehiculos_eliminados: list[dict[str, int | str | float]] = []
+        if llegados.size:
+            vias_llegada = via_vehiculo[llegados]
+            en_destino = self.destino_vehiculo[llegados] == self.nodo_destino_via[vias_llegada]
+            salen = self.salida_via[vias_llegada] | en_destino
+            for indice, llega_a_destino in zip(llegados[salen].tolist(), en_destino[salen].tolist()):
+                indices_eliminados.append(indice)
+                motivo = "LLEGADA_A_DESTINO" if llega_a_destino else "SALIDA_DE_LA_CIUDAD"
+                vehiculos_eliminados.append(self._describir_eliminado(indice, motivo))
+
+            encolados = llegados[~salen]
+            vias_encolados = vias_llegada[~salen]
+            estado[encolados] = 1
+            posicion[encolados] = self.longitud_via[vias_encolados]
+            self._agregar_a_colas(encolados, vias_encolados)
+        self.perfilador.marcar("movimiento")
+
+        for indice, descripcion in self._descargar_colas_vectorizadas():
+            indices_eliminados.append(indice)
+            vehiculos_eliminados.append(descripcion)
+
+        self._compactar_flota(sorted(indices_eliminados))
+        self.perfilador.marcar("descarga_colas")
+
+        self._actualizar_metricas_vias()
+        self.perfilador.marcar("metricas")
+        self._actualizar_fases_semaforicas()
+        self.perfilador.marcar("semaforos")
+        return ResultadoTick(
+            tick=self.ciudad_mapa.tick_actual,
+            creados=len(vehiculos_creados),
+            eliminados=len(vehiculos_eliminados),
+            movidos=movidos,
+            vehiculos_creados=vehiculos_creados,
+            vehiculos_eliminados=vehiculos_eliminados,
+            duraciones_fases=self.perfilador.cerrar(),
+        )
+
+    def _agregar_a_colas(self, encolados: np.ndarray, vias_encolados: np.ndarray) -> None:
+        if not encolados.size:
+            return
+        agrupados = np.argsort(vias_encolados, kind="stable")
+        vias_ordenadas = vias_encolados[agrupados]
+        ordenes = self.orden_vehiculo[encolados[agrupados]]
+        cortes = np.flatnonzero(np.diff(vias_ordenadas)) + 1
+        for via, ordenes_via in zip(
+            vias_ordenadas[np.concatenate(([0], cortes))].tolist(),
+            np.split(ordenes, cortes),
+        ):
+            self.colas_via[via].extend(ordenes_via.tolist())
+
+    def _descargar_colas_vectorizadas(self) -> list[tuple[int, dict[str, int | str | float]]]:
+        total = self.cantidad_vehiculos
+        ordenes = self.orden_vehiculo[:total]
+        eliminados: list[tuple[int, dict[str, int | str | float]]] = []
+        for interseccion in self.ciudad_mapa.intersecciones.values():
+            for indice_via in self.indices_vias_por_eje.get((interseccion.indice, interseccion.fase_activa), []):
+                cola = self.colas_via[indice_via]
+                descargados = 0
+                while cola and (self.descarga_cola_por_tick <= 0 or descargados < self.descarga_cola_por_tick):
+                    indice = int(np.searchsorted(ordenes, cola.popleft()))
+                    descargados += 1
+                    via_actual = self.lista_vias[indice_via]
+                    siguiente_via = self._escoger_siguiente_via(via_actual, int(self.destino_vehiculo[indice]))
+                    if siguiente_via is None:
+                        eliminados.append((indice, self._describir_eliminado(indice, "SIN_SALIDA_DISPONIBLE")))
+                        continue
+                    via_actual.flujo_vehicular += 1
+                    self.via_vehiculo[indice] = siguiente_via.indice
+                    self.posicion[indice] = 0.0
+                    self.estado_vehiculo[indice] = 0
+        return eliminados
+
+    def _exportar_flota(self, estado: EstadoMotor) -> None:
+        total = self.cantidad_vehiculos
+        estado.ids_vehiculo = self.ids_vehiculo[:total].tolist()
+        vias = self.via_vehiculo[:total].tolist()
+        estado.vias_vehiculo = vias
+        estado.posiciones = self.posicion[:total].tolist()
+        estado.velocidades = self.velocidad[:total].tolist()
+        estado.direcciones = [self.lista_vias[via].direccion for via in vias]
+        estado.estados = [ESTADOS_VEHICULO[valor] for valor in self.estado_vehiculo[:total].tolist()]
+        estado.tipos = [TIPOS_VEHICULO[valor] for valor in self.tipo_vehiculo[:total].tolist()]
+        estado.destinos = self.destino_vehiculo[:total].tolist()
+        id_por_orden = dict(zip(self.orden_vehiculo[:total].tolist(), estado.ids_vehiculo))
+        estado.colas = {
+            indice_via: [id_por_orden[orden] for orden in cola]
+            for indice_via, cola in enumerate(self.colas_via)
+            if cola
+        }
+
+    def _restaurar_flota(self, estado: EstadoMotor) -> None:
+        total = len(estado.ids_vehiculo)
+        if total > self.posicion.shape[0]:
+            self._ampliar_capacidad(total)
+        self.orden_vehiculo[:total] = np.arange(1, total + 1)
+        self.contador_orden = total
+        self.ids_vehiculo[:total] = estado.ids_vehiculo
+        self.posicion[:total] = estado.posiciones
+        self.velocidad[:total] = estado.velocidades
+        self.centesimas_velocidad[:total] = [a_centesimas(velocidad) for velocidad in estado.velocidades]
+        self.via_vehiculo[:total] = estado.vias_vehiculo
+        indice_estado = {valor: indice for indice, valor in enumerate(ESTADOS_VEHICULO)}
+        indice_tipo = {valor: indice for indice, valor in enumerate(TIPOS_VEHICULO)}
+        self.estado_vehiculo[:total] = [indice_estado[valor] for valor in estado.estados]
+        self.tipo_vehiculo[:total] = [indice_tipo[valor] for valor in estado.tipos]
+        self.destino_vehiculo[:total] = estado.destinos
+        self.cantidad_vehiculos = total
+        orden_por_id = {vehiculo_id: orden for orden, vehiculo_id in enumerate(estado.ids_vehiculo, start=1)}
+        for cola in self.colas_via:
+            cola.clear()
+        for indice_via, ids_en_cola in estado.colas.items():
+            self.colas_via[indice_via].extend(orden_por_id[vehiculo_id] for vehiculo_id in ids_en_cola)
+
+    def _registrar_vehiculo(self, vehiculo: Vehiculo) -> None:
+        indice = self.cantidad_vehiculos
+        if indice == self.posicion.shape[0]:
+            self._ampliar_capacidad(2 * indice)
+        self.contador_orden += 1
+        self.orden_vehiculo[indice] = self.contador_orden
+        self.ids_vehiculo[indice] = vehiculo.id_vehiculo
+        self.posicion[indice] = vehiculo.posicion_en_via
+        self.velocidad[indice] = vehiculo.velocidad
+        self.centesimas_velocidad[indice] = a_centesimas(vehiculo.velocidad)
+        self.via_vehiculo[indice] = vehiculo.via_actual
+        self.estado_vehiculo[indice] = ESTADOS_VEHICULO.index(vehiculo.estado)
+        self.tipo_vehiculo[indice] = TIPOS_VEHICULO.index(vehiculo.tipo)
+        self.destino_vehiculo[indice] = vehiculo.destino
+        self.cantidad_vehiculos += 1
+
+    def _registrar_vehiculos(self, vehiculos: list[Vehiculo]) -> None:
+        cantidad = len(vehiculos)
+        if not cantidad:
+            return
+        inicio = self.cantidad_vehiculos
+        fin = inicio + cantidad
+        if fin > self.posicion.shape[0]:
+            self._ampliar_capacidad(max(2 * self.posicion.shape[0], fin))
+        self.orden_vehiculo[inicio:fin] = np.arange(self.contador_orden + 1, self.contador_orden + cantidad + 1)
+        self.contador_orden += cantidad
+        self.ids_vehiculo[inicio:fin] = [vehiculo.id_vehiculo for vehiculo in vehiculos]
+        self.posicion[inicio:fin] = [vehiculo.posicion_en_via for vehiculo in vehiculos]
+        velocidades = [vehiculo.velocidad for vehiculo in vehiculos]
+        self.velocidad[inicio:fin] = velocidades
+        self.centesimas_velocidad[inicio:fin] = [a_centesimas(velocidad) for velocidad in velocidades]
+        self.via_vehiculo[inicio:fin] = [vehiculo.via_actual for vehiculo in vehiculos]
+        self.estado_vehiculo[inicio:fin] = [ESTADOS_VEHICULO.index(vehiculo.estado) for vehiculo in vehiculos]
+        self.tipo_vehiculo[inicio:fin] = [TIPOS_VEHICULO.index(vehiculo.tipo) for vehiculo in vehiculos]
+        self.destino_vehiculo[inicio:fin] = [vehiculo.destino for vehiculo in vehiculos]
+        self.cantidad_vehiculos = fin
+
+    def _ampliar_capacidad(self, capacidad: int) -> None:
+        for nombre in (
+            "orden_vehiculo",
+            "ids_vehiculo",
+            "posicion",
+            "velocidad",
+            "centesimas_velocidad",
+            "via_vehiculo",
+            "estado_vehiculo",
+            "tipo_vehiculo",
+            "destino_vehiculo",
+        ):
+            actual = getattr(self, nombre)
+            ampliado = np.empty(capacidad, dtype=actual.dtype)
+            ampliado[: actual.shape[0]] = actual
+            setattr(self, nombre, ampliado)
+
+    def _compactar_flota(self, indices_eliminados: list[int]) -> None:
+        if not indices_eliminados:
+            return
+        total = self.cantidad_vehiculos
+        conservar = np.ones(total, dtype=bool)
+        conservar[indices_eliminados] = False
+        restantes = total - len(indices_eliminados)
+        for arreglo in (
+            self.orden_vehiculo,
+            self.ids_vehiculo,
+            self.posicion,
+            self.velocidad,
+            self.centesimas_velocidad,
+            self.via_vehiculo,
+            self.estado_vehiculo,
+            self.tipo_vehiculo,
+            self.destino_vehiculo,
+        ):
+            arreglo[:restantes] = arreglo[:total][conservar]
+        self.cantidad_vehiculos = restantes
+
+    def _materializar_vehiculo(self, indice: int) -> Vehiculo:
+        via = self.lista_vias[int(self.via_vehiculo[indice])]
+        return Vehiculo(
+            id_vehiculo=int(self.ids_vehiculo[indice]),
+            via_actual=via.indice,
+            posicion_en_via=float(self.posicion[indice]),
+            velocidad=float(self.velocidad[indice]),
+            direccion_actual=via.direccion,
+            estado=ESTADOS_VEHICULO[int(self.estado_vehiculo[indice])],
+            tipo=TIPOS_VEHICULO[int(self.tipo_vehiculo[indice])],
+            destino=int(self.destino_vehiculo[indice]),
+        )
+
+    def _describir_eliminado(self, indice: int, motivo: str) -> dict[str, int | str | float]:
+        via = self.lista_vias[int(self.via_vehiculo[indice])]
+        return {
+            "vehiculo_id": int(self.ids_vehiculo[indice]),
+            "tipo": TIPOS_VEHICULO[int(self.tipo_vehiculo[indice])],
+            "via_actual": via.id_via,
+            "direccion_actual": via.direccion,
+            "velocidad": float(self.velocidad[indice]),
+            "motivo": motivo,
+            "nodo_final": via.destino,
+        }
+
+    def _describir_vehiculos(self) -> list[dict[str, object]]:
+        total = self.cantidad_vehiculos
+        return [
+            {
+                "vehiculo_id": vehiculo_id,
+                "via_actual": self.lista_vias[via].id_via,
+                "posicion_en_via": posicion,
+                "velocidad": velocidad,
+                "direccion_actual": self.lista_vias[via].direccion,
+                "estado": ESTADOS_VEHICULO[estado],
+                "tipo": TIPOS_VEHICULO[tipo],
+            }
+            for vehiculo_id, via, posicion, velocidad, estado, tipo in zip(
+                self.ids_vehiculo[:total].tolist(),
+                self.via_vehiculo[:total].tolist(),
+                self.posicion[:total].tolist(),
+                self.velocidad[:total].tolist(),
+                self.estado_vehiculo[:total].tolist(),
+                self.tipo_vehiculo[:total].tolist(),
+            )
+        ]
+
+    def _actualizar_metricas_vias(self) -> None:
+        total = self.cantidad_vehiculos
+        via_vehiculo = self.via_vehiculo[:total]
+        estado = self.estado_vehiculo[:total]
+        circulando = estado == 0
+        cantidad_vias = len(self.lista_vias)
+        vias_circulando = via_vehiculo[circulando]
+        conteo_circulando = np.bincount(vias_circulando, minlength=cantidad_vias).tolist()
+        conteo_en_cola = np.bincount(via_vehiculo[~circulando], minlength=cantidad_vias).tolist()
+        suma_centesimas = np.bincount(
+            vias_circulando,
+            weights=self.centesimas_velocidad[:total][circulando],
+            minlength=cantidad_vias,
+        ).tolist()
+
+        for via, en_circulacion, en_espera, suma in zip(
+            self.lista_vias, conteo_circulando, conteo_en_cola, suma_centesimas
+        ):
+            via.vehiculos_en_circulacion = en_circulacion
+            via.vehiculos_en_espera = en_espera
+            via.suma_centesimas_velocidad = int(suma)
+            self._derivar_metricas_via(via)
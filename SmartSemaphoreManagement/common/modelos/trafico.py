@@ -1,8 +1,14 @@
 from __future__ import annotations
 
 import random
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
+
+from common.modelos.identificadores import TablaNombres
+
+if TYPE_CHECKING:
+    from common.modelos.rutas import TablaRutas
 
 
 def indice_a_fila(indice: int) -> str:
@@ -50,6 +56,7 @@ class Interseccion:
     duracion_fase_activa: int = 15
     duracion_fase_alterna: int = 15
     ticks_restantes_fase: int = 15
+    indice: int = -1
 
 
 @dataclass(slots=True)
@@ -58,6 +65,7 @@ class NodoBorde:
     lado: str
     fila: int | None
     columna: int | None
+    indice: int = -1
 
 
 @dataclass(slots=True)
@@ -70,10 +78,15 @@ class Via:
     longitud: float
     vehiculos_en_circulacion: int = 0
     vehiculos_en_espera: int = 0
+    suma_centesimas_velocidad: int = 0
     velocidad_promedio: float = 0.0
     flujo_vehicular: int = 0
     score: float = 0.0
     estado_congestion: str = "NORMAL"
+    cola: deque[int] = field(default_factory=deque)
+    indice: int = -1
+    indice_origen: int = -1
+    indice_destino: int = -1
 
 
 @dataclass(slots=True)
@@ -82,6 +95,19 @@ class CiudadMapa:
     nodos_borde: dict[str, NodoBorde] = field(default_factory=dict)
     vias: dict[str, Via] = field(default_factory=dict)
     tick_actual: int = 0
+    vias_por_origen: dict[str, list[Via]] = field(default_factory=dict)
+    vias_por_destino: dict[str, list[Via]] = field(default_factory=dict)
+    vias_por_eje: dict[tuple[int, str], list[Via]] = field(default_factory=dict)
+    vias_instrumentadas: list[Via] = field(default_factory=list)
+    vias_por_indice: list[Via | None] = field(default_factory=list)
+    salidas_por_nodo: list[list[Via]] = field(default_factory=list)
+    entradas_por_nodo: list[list[Via]] = field(default_factory=list)
+    intersecciones_por_indice: list[Interseccion | None] = field(default_factory=list)
+    nodo_es_borde: list[bool] = field(default_factory=list)
+    nombres_nodos: TablaNombres = field(default_factory=TablaNombres, repr=False, compare=False)
+    nombres_vias: TablaNombres = field(default_factory=TablaNombres, repr=False, compare=False)
+    version_topologia: int = 0
+    tabla_rutas: TablaRutas | None = field(default=None, repr=False, compare=False)
 
     @classmethod
     def desde_config(cls, config_ciudad: dict[str, object]) -> "CiudadMapa":
@@ -101,8 +127,51 @@ class CiudadMapa:
             longitud_max=longitud_max,
             randomizador=randomizador,
         )
+        ciudad.indexar_vias()
         return ciudad
 
+    def indexar_vias(self) -> None:
+        self.vias_por_origen = {}
+        self.vias_por_destino = {}
+        self.vias_por_eje = {}
+        self.vias_instrumentadas = []
+        for interseccion in self.intersecciones.values():
+            interseccion.indice = self.nombres_nodos.registrar(interseccion.id_interseccion)
+        for nodo in self.nodos_borde.values():
+            nodo.indice = self.nombres_nodos.registrar(nodo.id_nodo)
+        for via in self.vias.values():
+            via.indice = self.nombres_vias.registrar(via.id_via)
+            via.indice_origen = self.nombres_nodos.registrar(via.origen)
+            via.indice_destino = self.nombres_nodos.registrar(via.destino)
+
+        cantidad_nodos = len(self.nombres_nodos)
+        self.vias_por_indice = [None] * len(self.nombres_vias)
+        self.salidas_por_nodo = [[] for _ in range(cantidad_nodos)]
+        self.entradas_por_nodo = [[] for _ in range(cantidad_nodos)]
+        self.intersecciones_por_indice = [None] * cantidad_nodos
+        self.nodo_es_borde = [False] * cantidad_nodos
+        for interseccion in self.intersecciones.values():
+            self.intersecciones_por_indice[interseccion.indice] = interseccion
+        for nodo in self.nodos_borde.values():
+            self.nodo_es_borde[nodo.indice] = True
+        for via in self.vias.values():
+            self.vias_por_indice[via.indice] = via
+            self.salidas_por_nodo[via.indice_origen].append(via)
+            self.entradas_por_nodo[via.indice_destino].append(via)
+            self.vias_por_origen.setdefault(via.origen, []).append(via)
+            self.vias_por_destino.setdefault(via.destino, []).append(via)
+            self.vias_por_eje.setdefault((via.indice_destino, via.eje), []).append(via)
+            if via.destino in self.intersecciones:
+                self.vias_instrumentadas.append(via)
+        self.version_topologia += 1
+
+    def obtener_tabla_rutas(self) -> TablaRutas:
+        if self.tabla_rutas is None or self.tabla_rutas.version_topologia != self.version_topologia:
+            from common.modelos.rutas import TablaRutas
+
+            self.tabla_rutas = TablaRutas(self)
+        return self.tabla_rutas
+
     @staticmethod
     def _crear_intersecciones(filas: int, columnas: int) -> dict[str, Interseccion]:
         resultado: dict[str, Interseccion] = {}
@@ -245,16 +314,16 @@ class CiudadMapa:
         return self.vias.values()
 
     def obtener_vias_de_entrada(self, interseccion: str) -> list[Via]:
-        return [via for via in self.vias.values() if via.destino == interseccion]
+        return self.vias_por_destino.get(interseccion, [])
 
     def obtener_vias_instrumentadas(self) -> list[Via]:
-        return [via for via in self.vias.values() if via.destino in self.intersecciones]
+        return self.vias_instrumentadas
 
-    def obtener_vias_por_eje(self, interseccion: str, eje: str) -> list[Via]:
-        return [via for via in self.obtener_vias_de_entrada(interseccion) if via.eje == eje]
+    def obtener_vias_por_eje(self, indice_interseccion: int, eje: str) -> list[Via]:
+        return self.vias_por_eje.get((indice_interseccion, eje), [])
 
     def obtener_vias_salida(self, nodo: str) -> list[Via]:
-        return [via for via in self.vias.values() if via.origen == nodo]
+        return self.vias_por_origen.get(nodo, [])
 
     def es_interseccion(self, nodo: str) -> bool:
         return nodo in self.intersecciones
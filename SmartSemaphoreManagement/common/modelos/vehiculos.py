@@ -2,13 +2,20 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from common.modelos.identificadores import nombre_vehiculo
+
 
 @dataclass(slots=True)
 class Vehiculo:
-    id_vehiculo: str
-    via_actual: str
+    id_vehiculo: int
+    via_actual: int
     posicion_en_via: float
     velocidad: float
     direccion_actual: str
     estado: str
     tipo: str = "NORMAL"
+    destino: int = -1
+
+    @property
+    def nombre(self) -> str:
+        return nombre_vehiculo(self.id_vehiculo)
@@ -5,10 +5,11 @@ from typing import Any
 import zmq
 
 from common.mensajes.ambulancias import SolicitudAmbulancia
+from common.mensajes.codec import codificar_mensaje, obtener_formato
 from common.mensajes.control_manual import SolicitudControlManual
 from common.utilidades.mensajeria_zmq import (
     configurar_emisor_mejor_esfuerzo,
-    enviar_json_mejor_esfuerzo,
+    enviar_bytes_mejor_esfuerzo,
 )
 from common.utilidades.persistencia_sqlite import RepositorioSQLite
 
@@ -26,6 +27,7 @@ class BackendOperativo:
         self.repositorio = repositorio
         self.rol_backend = rol_backend
         self.permitir_operaciones_activas = permitir_operaciones_activas
+        self.formato_mensajes = obtener_formato(config)
         self.contexto = zmq.Context.instance()
         self.emisor_ambulancias = self.contexto.socket(zmq.PUSH)
         self.emisor_ambulancias.connect(config["zmq"]["pc0"]["solicitudes_ambulancia"])
@@ -95,10 +97,15 @@ class BackendOperativo:
                     if solicitud.get("velocidad") is not None
                     else None
                 ),
+                nodo_destino=(
+                    str(solicitud["nodo_destino"])
+                    if solicitud.get("nodo_destino") is not None
+                    else None
+                ),
             )
-            aceptada = enviar_json_mejor_esfuerzo(
+            aceptada = enviar_bytes_mejor_esfuerzo(
                 self.emisor_ambulancias,
-                solicitud_ambulancia.a_dict(),
+                codificar_mensaje(solicitud_ambulancia, self.formato_mensajes),
             )
             return {
                 "ok": aceptada,
@@ -123,9 +130,9 @@ class BackendOperativo:
                 fase_ganadora=str(solicitud["fase_ganadora"]),
                 duracion_ticks=int(solicitud["duracion_ticks"]),
             )
-            aceptada = enviar_json_mejor_esfuerzo(
+            aceptada = enviar_bytes_mejor_esfuerzo(
                 self.emisor_control_manual,
-                solicitud_control.a_dict(),
+                codificar_mensaje(solicitud_control, self.formato_mensajes),
             )
             return {
                 "ok": aceptada,
@@ -9,3 +9,9 @@ def cargar_configuracion(ruta: str | Path) -> dict[str, Any]:
     ruta_config = Path(ruta)
     with ruta_config.open("r", encoding="utf-8") as archivo:
         return json.load(archivo)
+
+
+def quitar_comentarios(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        return {clave: quitar_comentarios(dato) for clave, dato in valor.items() if not clave.startswith("_")}
+    return valor
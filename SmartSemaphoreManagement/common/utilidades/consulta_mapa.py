@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import zmq
+
+from common.modelos.artefacto_mapa import IdentidadMapa
+from common.utilidades.logs import log
+
+TIPO_CONSULTA_MAPA = "consultar_mapa"
+
+
+def atender_consultas_mapa(servidor: zmq.Socket, identidad: IdentidadMapa) -> int:
+    atendidas = 0
+    while True:
+        try:
+            solicitud = servidor.recv_json(flags=zmq.NOBLOCK)
+        except zmq.Again:
+            return atendidas
+        if solicitud.get("tipo") == TIPO_CONSULTA_MAPA:
+            servidor.send_json({"ok": True, **identidad.a_dict()})
+        else:
+            servidor.send_json({"ok": False, "error": "tipo_no_soportado"})
+        atendidas += 1
+
+
+def verificar_mapa_con_simulacion(
+    contexto: zmq.Context,
+    endpoint: str,
+    identidad: IdentidadMapa,
+    origen: str,
+    espera_milisegundos: int = 1500,
+) -> None:
+    while True:
+        solicitante = contexto.socket(zmq.REQ)
+        solicitante.setsockopt(zmq.LINGER, 0)
+        solicitante.setsockopt(zmq.RCVTIMEO, espera_milisegundos)
+        solicitante.connect(endpoint)
+        try:
+            solicitante.send_json({"tipo": TIPO_CONSULTA_MAPA})
+            respuesta = solicitante.recv_json()
+        except zmq.Again:
+            log(origen, "PC0 no responde la consulta del mapa; se reintenta antes de arrancar.")
+            continue
+        finally:
+            solicitante.close()
+        if respuesta.get("ok"):
+            break
+        log(origen, f"PC0 rechazo la consulta del mapa: {respuesta.get('error')}; se reintenta.")
+
+    identidad_simulacion = IdentidadMapa.desde_dict(respuesta)
+    if not identidad.coincide_con(identidad_simulacion):
+        log(
+            origen,
+            (
+                f"Arranque rechazado: el mapa local ({identidad.describir()}) no coincide con el de la "
+                f"simulacion ({identidad_simulacion.describir()})."
+            ),
+        )
+        raise SystemExit(1)
+    log(origen, f"Mapa verificado con la simulacion: {identidad_simulacion.describir()}.")
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(slots=True)
+class FragmentoBroker:
+    indice: int
+    entrada: str
+    salida: str
+    instantaneas: str = ""
+
+
+def obtener_fragmentos_broker(config: dict[str, Any]) -> list[FragmentoBroker]:
+    config_pc1 = config["zmq"]["pc1"]
+    fragmentos = [
+        FragmentoBroker(
+            indice=indice,
+            entrada=str(fragmento["entrada"]),
+            salida=str(fragmento["salida"]),
+            instantaneas=str(fragmento.get("instantaneas", "")),
+        )
+        for indice, fragmento in enumerate(config_pc1.get("fragmentos_broker", []))
+    ]
+    if fragmentos:
+        return fragmentos
+    return [
+        FragmentoBroker(
+            indice=0,
+            entrada=config_pc1["publicador_sensores"],
+            salida=config_pc1["salida_broker"],
+            instantaneas=str(config_pc1.get("instantaneas_broker", "")),
+        )
+    ]
+
+
+def fragmento_de_interseccion(interseccion: str, cantidad_fragmentos: int) -> int:
+    if cantidad_fragmentos <= 1:
+        return 0
+    return zlib.crc32(interseccion.encode("utf-8")) % cantidad_fragmentos
+
+
+def seleccionar_fragmentos(fragmentos: list[FragmentoBroker], indices: list[int]) -> list[FragmentoBroker]:
+    if not indices:
+        return fragmentos
+    fuera_de_rango = [indice for indice in indices if not 0 <= indice < len(fragmentos)]
+    if fuera_de_rango:
+        raise ValueError(f"Fragmentos de broker inexistentes: {fuera_de_rango}; hay {len(fragmentos)} configurados.")
+    return [fragmentos[indice] for indice in sorted(set(indices))]
@@ -9,9 +9,25 @@ def configurar_emisor_mejor_esfuerzo(emisor: zmq.Socket) -> None:
     emisor.setsockopt(zmq.LINGER, 0)
 
 
-def enviar_json_mejor_esfuerzo(emisor: zmq.Socket, mensaje: dict[str, object]) -> bool:
+def crear_trama(carga: bytes) -> zmq.Frame:
+    return zmq.Frame(carga)
+
+
+def enviar_trama(emisor: zmq.Socket, trama: zmq.Frame) -> None:
+    emisor.send(trama, copy=False)
+
+
+def enviar_trama_mejor_esfuerzo(emisor: zmq.Socket, trama: zmq.Frame) -> bool:
+    try:
+        emisor.send(trama, flags=zmq.NOBLOCK, copy=False)
+    except zmq.Again:
+        return False
+    return True
+
+
+def enviar_bytes_mejor_esfuerzo(emisor: zmq.Socket, carga: bytes) -> bool:
     try:
-        emisor.send_json(mensaje, flags=zmq.NOBLOCK)
+        emisor.send(carga, flags=zmq.NOBLOCK)
     except zmq.Again:
         return False
     return True
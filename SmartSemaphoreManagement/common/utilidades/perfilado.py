@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from collections import deque
+from time import perf_counter_ns
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentil(ordenadas: list[int], porcentaje: int) -> int:
+    indice = max(0, -(-porcentaje * len(ordenadas) // 100) - 1)
+    return ordenadas[indice]
+
+
+class PerfiladorFases:
+    def __init__(self, activo: bool, ventana: int = 500) -> None:
+        self.activo = activo
+        self.ventana = max(1, ventana)
+        self.muestras: dict[str, deque[int]] = {}
+        self.duraciones: dict[str, int] = {}
+        self.instante = 0
+        self.anidado = 0
+
+    def iniciar(self) -> None:
+        if not self.activo:
+            return
+        self.duraciones = {}
+        self.anidado = 0
+        self.instante = perf_counter_ns()
+
+    def marcar(self, fase: str) -> None:
+        if not self.activo:
+            return
+        ahora = perf_counter_ns()
+        self.duraciones[fase] = self.duraciones.get(fase, 0) + ahora - self.instante - self.anidado
+        self.anidado = 0
+        self.instante = ahora
+
+    def acumular(self, fase: str, inicio: int) -> None:
+        duracion = perf_counter_ns() - inicio
+        self.duraciones[fase] = self.duraciones.get(fase, 0) + duracion
+        self.anidado += duracion
+
+    def cerrar(self) -> dict[str, int]:
+        if not self.activo:
+            return {}
+        for fase, duracion in self.duraciones.items():
+            self.registrar(fase, duracion)
+        return self.duraciones
+
+    def registrar(self, fase: str, duracion: int) -> None:
+        if not self.activo:
+            return
+        muestras = self.muestras.get(fase)
+        if muestras is None:
+            muestras = self.muestras[fase] = deque(maxlen=self.ventana)
+        muestras.append(duracion)
+
+    def percentiles(self) -> dict[str, tuple[float, ...]]:
+        resumen: dict[str, tuple[float, ...]] = {}
+        for fase, muestras in self.muestras.items():
+            ordenadas = sorted(muestras)
+            resumen[fase] = tuple(percentil(ordenadas, porcentaje) / 1_000_000 for porcentaje in PERCENTILES)
+        return resumen
+
+    def formatear_percentiles(self) -> str:
+        return ", ".join(
+            f"{fase}={p50:.3f}/{p95:.3f}/{p99:.3f}ms"
+            for fase, (p50, p95, p99) in self.percentiles().items()
+        )
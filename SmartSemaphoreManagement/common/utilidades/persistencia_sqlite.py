@@ -5,6 +5,9 @@ import sqlite3
 from pathlib import Path
 from typing import Any
 
+from common.mensajes.estado_operativo import TIPO_DELTA
+from common.modelos.identificadores import normalizar_nombre_vehiculo
+
 
 class RepositorioSQLite:
     def __init__(self, ruta_bd: str | Path) -> None:
@@ -14,6 +17,7 @@ class RepositorioSQLite:
         self.conexion.row_factory = sqlite3.Row
         self.conexion.execute("PRAGMA journal_mode=WAL")
         self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.tick_snapshot_aplicado: int | None = None
 
     def cerrar(self) -> None:
         self.conexion.close()
@@ -172,19 +176,26 @@ class RepositorioSQLite:
         )
         self.conexion.commit()
 
-    def guardar_snapshot_operativo(self, snapshot: dict[str, Any]) -> None:
+    def guardar_snapshot_operativo(self, snapshot: dict[str, Any]) -> bool:
+        es_delta = snapshot.get("tipo_snapshot") == TIPO_DELTA
+        if es_delta and (
+            self.tick_snapshot_aplicado is None or snapshot.get("tick_base") != self.tick_snapshot_aplicado
+        ):
+            self.tick_snapshot_aplicado = None
+            return False
+
         timestamp = str(snapshot["timestamp"])
         tick_actual = int(snapshot["tick_actual"])
         cursor = self.conexion.cursor()
 
-        for interseccion in snapshot["intersecciones"]:
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO estado_intersecciones (
-                    interseccion_id, fase_activa, fase_alterna, duracion_fase_activa,
-                    duracion_fase_alterna, ticks_restantes_fase, tick_actual, actualizado_en
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO estado_intersecciones (
+                interseccion_id, fase_activa, fase_alterna, duracion_fase_activa,
+                duracion_fase_alterna, ticks_restantes_fase, tick_actual, actualizado_en
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
                 (
                     interseccion["interseccion_id"],
                     interseccion["fase_activa"],
@@ -194,18 +205,20 @@ class RepositorioSQLite:
                     int(interseccion["ticks_restantes_fase"]),
                     tick_actual,
                     timestamp,
-                ),
-            )
+                )
+                for interseccion in snapshot["intersecciones"]
+            ],
+        )
 
-        for via in snapshot["vias"]:
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO estado_vias (
-                    via_id, origen, destino, direccion, eje, longitud,
-                    vehiculos_en_circulacion, vehiculos_en_espera, velocidad_promedio,
-                    flujo_vehicular, score, estado_congestion, tick_actual, actualizado_en
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO estado_vias (
+                via_id, origen, destino, direccion, eje, longitud,
+                vehiculos_en_circulacion, vehiculos_en_espera, velocidad_promedio,
+                flujo_vehicular, score, estado_congestion, tick_actual, actualizado_en
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
                 (
                     via["via_id"],
                     via["origen"],
@@ -221,20 +234,31 @@ class RepositorioSQLite:
                     via["estado_congestion"],
                     tick_actual,
                     timestamp,
-                ),
-            )
+                )
+                for via in snapshot["vias"]
+            ],
+        )
 
-        cursor.execute("DELETE FROM estado_vehiculos")
-        for vehiculo in snapshot["vehiculos"]:
-            cursor.execute(
-                """
-                INSERT INTO estado_vehiculos (
-                    vehiculo_id, via_actual, posicion_en_via, velocidad,
-                    direccion_actual, estado, tipo, tick_actual, actualizado_en
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+        if es_delta:
+            cursor.executemany(
+                "DELETE FROM estado_vehiculos WHERE vehiculo_id = ?",
+                [
+                    (normalizar_nombre_vehiculo(vehiculo_id),)
+                    for vehiculo_id in snapshot.get("vehiculos_eliminados", [])
+                ],
+            )
+        else:
+            cursor.execute("DELETE FROM estado_vehiculos")
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO estado_vehiculos (
+                vehiculo_id, via_actual, posicion_en_via, velocidad,
+                direccion_actual, estado, tipo, tick_actual, actualizado_en
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
                 (
-                    vehiculo["vehiculo_id"],
+                    normalizar_nombre_vehiculo(vehiculo["vehiculo_id"]),
                     vehiculo["via_actual"],
                     float(vehiculo["posicion_en_via"]),
                     float(vehiculo["velocidad"]),
@@ -243,27 +267,37 @@ class RepositorioSQLite:
                     vehiculo["tipo"],
                     tick_actual,
                     timestamp,
-                ),
-            )
+                )
+                for vehiculo in snapshot["vehiculos"]
+            ],
+        )
 
         self.conexion.commit()
+        self.tick_snapshot_aplicado = tick_actual
+        return True
 
     def guardar_evento_sensor(self, evento: dict[str, Any]) -> None:
-        self.conexion.execute(
+        self.guardar_eventos_sensores([evento])
+
+    def guardar_eventos_sensores(self, eventos: list[dict[str, Any]]) -> None:
+        self.conexion.executemany(
             """
             INSERT OR IGNORE INTO eventos_sensores (
                 timestamp, sensor_id, tipo_sensor, interseccion, via_id, tick_origen, datos_json
             ) VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (
-                evento["timestamp"],
-                evento["sensor_id"],
-                evento["tipo_sensor"],
-                evento["interseccion"],
-                evento["via_id"],
-                int(evento.get("tick_origen", 0)),
-                json.dumps(evento["datos"], sort_keys=True),
-            ),
+            [
+                (
+                    evento["timestamp"],
+                    evento["sensor_id"],
+                    evento["tipo_sensor"],
+                    evento["interseccion"],
+                    evento["via_id"],
+                    int(evento.get("tick_origen", 0)),
+                    json.dumps(evento["datos"], sort_keys=True),
+                )
+                for evento in eventos
+            ],
         )
         self.conexion.commit()
 
@@ -293,7 +327,7 @@ class RepositorioSQLite:
             (
                 timestamp,
                 tick_actual,
-                vehiculo["vehiculo_id"],
+                normalizar_nombre_vehiculo(vehiculo["vehiculo_id"]),
                 vehiculo["via_actual"],
                 float(vehiculo["posicion_en_via"]),
                 float(vehiculo["velocidad"]),
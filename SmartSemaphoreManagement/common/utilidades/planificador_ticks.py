@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+POLITICA_RECUPERAR = "recuperar"
+POLITICA_SALTAR = "saltar"
+POLITICAS_ATRASO = (POLITICA_RECUPERAR, POLITICA_SALTAR)
+
+
+class PlanificadorTicks:
+    def __init__(
+        self,
+        intervalo_segundos: float,
+        politica: str = POLITICA_RECUPERAR,
+        max_ticks_recuperacion: int = 10,
+        reloj: Callable[[], float] = time.monotonic,
+        dormir: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if politica not in POLITICAS_ATRASO:
+            raise ValueError(f"Politica de atraso no soportada: {politica}")
+        self.intervalo = intervalo_segundos
+        self.politica = politica
+        self.max_ticks_recuperacion = max(0, max_ticks_recuperacion)
+        self.reloj = reloj
+        self.dormir = dormir
+        self.vencimiento: float | None = None
+        self.ticks_con_retraso = 0
+        self.ticks_saltados = 0
+        self.retraso_actual = 0.0
+        self.retraso_maximo = 0.0
+
+    def esperar_siguiente_tick(self) -> int:
+        ahora = self.reloj()
+        if self.vencimiento is None:
+            self.vencimiento = ahora
+            return 0
+        self.vencimiento += self.intervalo
+        retraso = ahora - self.vencimiento
+        if retraso <= 0:
+            self.retraso_actual = 0.0
+            self.dormir(-retraso)
+            return 0
+
+        self.ticks_con_retraso += 1
+        atrasados = int(retraso // self.intervalo) if self.intervalo > 0 else 0
+        if self.politica == POLITICA_SALTAR:
+            saltados = atrasados
+        else:
+            saltados = max(0, atrasados - self.max_ticks_recuperacion)
+        if saltados:
+            self.ticks_saltados += saltados
+            self.vencimiento += saltados * self.intervalo
+            retraso = ahora - self.vencimiento
+        self.retraso_actual = retraso
+        self.retraso_maximo = max(self.retraso_maximo, retraso)
+        return saltados
+
+    def resumir(self) -> str:
+        return (
+            f"retraso_ms={self.retraso_actual * 1000:.1f}, retraso_max_ms={self.retraso_maximo * 1000:.1f}, "
+            f"ticks_con_retraso={self.ticks_con_retraso}, ticks_saltados={self.ticks_saltados}"
+        )
@@ -6,5 +6,6 @@ ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
 rm -f "$ROOT_DIR"/PC0/historic_db/bd_historica.sqlite3*
 rm -f "$ROOT_DIR"/PC2/replica_db/bd_replicada.sqlite3*
 rm -f "$ROOT_DIR"/PC3/main_db/bd_principal.sqlite3*
+rm -f "$ROOT_DIR"/PC0/simulation/checkpoint_simulacion.bin*
 
 echo "Bases de datos eliminadas."
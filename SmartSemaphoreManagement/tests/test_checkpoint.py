@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from PC0.simulation.servicio_simulacion import restaurar_desde_checkpoint
+from common.modelos.checkpoint import leer_checkpoint
+from common.modelos.simulacion import MotorSimulacion, crear_motor_simulacion
+from common.modelos.trafico import CiudadMapa
+from common.utilidades.configuracion import cargar_configuracion
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+def crear_motor(nombre_motor: str = "clasico", generacion: str = "secuencial") -> MotorSimulacion:
+    config = cargar_configuracion(RAIZ / "config/system_config.json")
+    config["ciudad"]["tamano_cuadricula"] = {"filas": 3, "columnas": 3}
+    config["simulacion"]["motor"] = nombre_motor
+    config["simulacion"]["generacion"] = generacion
+    config["simulacion"]["particiones"] = {"filas": 2, "columnas": 2}
+    config["simulacion"]["probabilidad_generacion_por_via"] = 0.5
+    return crear_motor_simulacion(CiudadMapa.desde_config(config["ciudad"]), config["simulacion"])
+
+
+def describir(motor: MotorSimulacion) -> tuple[object, ...]:
+    snapshot = motor.generar_snapshot_operativo()
+    return snapshot.tick_actual, snapshot.intersecciones, snapshot.vias, snapshot.vehiculos
+
+
+def inyectar_ambulancias_con_destino(motor: MotorSimulacion) -> None:
+    for nodo_origen, nodo_destino in (("BORDE-O-A", "BORDE-E-C"), ("BORDE-N-2", "INT-C3"), ("BORDE-S-3", "INT-A1")):
+        assert motor.inyectar_ambulancia(nodo_origen, velocidad=5.0, nodo_destino=nodo_destino) is not None
+
+
+def verificar_ida_y_vuelta(tmp_path: Path, nombre_motor: str, generacion: str = "secuencial") -> None:
+    original = crear_motor(nombre_motor, generacion)
+    restaurado = crear_motor(nombre_motor, generacion)
+    try:
+        for tick in range(40):
+            if tick == 25:
+                inyectar_ambulancias_con_destino(original)
+            original.avanzar_tick()
+        ruta = tmp_path / "checkpoint.bin"
+        original.guardar_checkpoint(ruta)
+
+        assert restaurado.cargar_checkpoint(ruta)
+        assert restaurado.exportar_estado() == original.exportar_estado()
+        for _ in range(30):
+            original.avanzar_tick()
+            restaurado.avanzar_tick()
+        assert describir(restaurado) == describir(original)
+        assert restaurado.exportar_estado() == original.exportar_estado()
+    finally:
+        original.cerrar()
+        restaurado.cerrar()
+
+
+@pytest.mark.parametrize("nombre_motor", ["clasico", "vectorizado", "eventos", "particionado"])
+def test_guardar_cargar_y_continuar(tmp_path: Path, nombre_motor: str) -> None:
+    verificar_ida_y_vuelta(tmp_path, nombre_motor)
+
+
+@pytest.mark.parametrize("nombre_motor", ["clasico", "vectorizado", "eventos", "particionado"])
+def test_guardar_cargar_y_continuar_con_generacion_masiva(tmp_path: Path, nombre_motor: str) -> None:
+    verificar_ida_y_vuelta(tmp_path, nombre_motor, "masiva")
+
+
+@pytest.mark.parametrize("nombre_motor", ["clasico", "vectorizado", "eventos", "particionado"])
+def test_vehiculos_con_destino_conservan_su_ruta(tmp_path: Path, nombre_motor: str) -> None:
+    motor = crear_motor(nombre_motor)
+    try:
+        inyectar_ambulancias_con_destino(motor)
+        motor.avanzar_tick()
+        ruta = tmp_path / "checkpoint.bin"
+        motor.guardar_checkpoint(ruta)
+    finally:
+        motor.cerrar()
+    nombres_nodos = motor.ciudad_mapa.nombres_nodos
+    destinos = sorted(
+        nombres_nodos.nombre(destino)
+        for estado in leer_checkpoint(ruta).estados
+        for destino in estado.destinos
+        if destino >= 0
+    )
+    assert destinos == ["BORDE-E-C", "INT-A1", "INT-C3"]
+
+
+def test_checkpoint_inexistente(tmp_path: Path) -> None:
+    assert leer_checkpoint(tmp_path / "no_existe.bin") is None
+
+
+@pytest.mark.parametrize(
+    "danar",
+    [
+        lambda contenido: contenido[:10],
+        lambda contenido: contenido[: len(contenido) // 2],
+        lambda contenido: contenido[:-1],
+        lambda contenido: contenido[:40] + bytes([contenido[40] ^ 0xFF]) + contenido[41:],
+        lambda contenido: contenido + b"\x00",
+    ],
+    ids=["diez_bytes", "mitad", "sin_ultimo_byte", "byte_alterado", "byte_sobrante"],
+)
+def test_checkpoint_corrupto_se_rechaza(tmp_path: Path, danar) -> None:
+    motor = crear_motor()
+    for _ in range(20):
+        motor.avanzar_tick()
+    ruta = tmp_path / "checkpoint.bin"
+    motor.guardar_checkpoint(ruta)
+    ruta.write_bytes(danar(ruta.read_bytes()))
+
+    with pytest.raises(ValueError):
+        leer_checkpoint(ruta)
+
+    nuevo = crear_motor()
+    restaurar_desde_checkpoint(nuevo, ruta)
+    assert nuevo.ciudad_mapa.tick_actual == 0
+    nuevo.avanzar_tick()
+    assert nuevo.ciudad_mapa.tick_actual == 1
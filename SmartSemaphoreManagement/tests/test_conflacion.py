@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from PC1.sensors.simulador_sensores import construir_tramas
+from PC2.analytics.servicio_analitica import SENSORES_REQUERIDOS, ServicioAnalitica
+from common.mensajes.codec import (
+    FORMATO_BINARIO,
+    FORMATO_JSON,
+    TIPO_TRAMA_SENSORES,
+    codificar_mensaje,
+    decodificar_mensaje,
+)
+from common.mensajes.eventos import EventoSensor, TramaSensores
+from common.utilidades.configuracion import cargar_configuracion
+
+RAIZ = Path(__file__).resolve().parents[1]
+INTERSECCION = "INT-A1"
+VIA_ESTE = "VIA-BORDE-O-A-A-INT-A1"
+VIA_NORTE = "VIA-INT-B1-A-INT-A1"
+
+
+def crear_servicio() -> ServicioAnalitica:
+    config = cargar_configuracion(RAIZ / "config/system_config.json")
+    config["ciudad"]["tamano_cuadricula"] = {"filas": 2, "columnas": 2}
+    return ServicioAnalitica(config, persistir_comandos=False, registrar_eventos=False)
+
+
+def describir_via(en_espera: int, en_circulacion: int, velocidad: float) -> dict[str, object]:
+    return {
+        "vehiculos_en_espera": en_espera,
+        "vehiculos_en_circulacion": en_circulacion,
+        "velocidad_promedio": velocidad,
+    }
+
+
+def lecturas_tick(tick: int, congestionada: str) -> list[EventoSensor]:
+    vias = {
+        via_id: describir_via(12, 10, 3.0) if via_id == congestionada else describir_via(0, 1, 50.0)
+        for via_id in (VIA_ESTE, VIA_NORTE)
+    }
+    ciudad_mapa = crear_servicio().ciudad_mapa
+    (trama,) = construir_tramas(
+        [ciudad_mapa.vias[via_id] for via_id in vias], vias, list(SENSORES_REQUERIDOS), tick, 10
+    )
+    return trama.eventos
+
+
+def comando_de_referencia(eventos: list[EventoSensor]) -> tuple[str, float, float]:
+    servicio = crear_servicio()
+    servicio.procesar_lote(eventos)
+    return servicio.ultimo_comando_por_interseccion[INTERSECCION]
+
+
+def test_tick_nuevo_incompleto_queda_pendiente() -> None:
+    tick_2 = lecturas_tick(2, VIA_ESTE)
+    tick_4 = lecturas_tick(4, VIA_NORTE)
+    assert comando_de_referencia(tick_2) != comando_de_referencia(tick_4)
+
+    servicio = crear_servicio()
+    servicio.procesar_lote(tick_2 + tick_4[:2])
+    assert servicio.ultimo_tick_decidido_por_interseccion[INTERSECCION] == 2
+    assert servicio.ultimo_comando_por_interseccion[INTERSECCION] == comando_de_referencia(tick_2)
+    assert servicio.ticks_conflacionados == 0
+    assert servicio.lecturas_conflacionadas == 0
+
+    servicio.procesar_lote(tick_4[2:])
+    assert servicio.ultimo_tick_decidido_por_interseccion[INTERSECCION] == 4
+    assert servicio.ultimo_comando_por_interseccion[INTERSECCION] == comando_de_referencia(tick_4)
+
+
+def test_ticks_completos_anteriores_se_descartan() -> None:
+    servicio = crear_servicio()
+    servicio.procesar_lote(lecturas_tick(1, VIA_NORTE) + lecturas_tick(2, VIA_NORTE) + lecturas_tick(3, VIA_ESTE))
+    assert servicio.ultimo_tick_decidido_por_interseccion[INTERSECCION] == 3
+    assert servicio.ultimo_comando_por_interseccion[INTERSECCION] == comando_de_referencia(lecturas_tick(3, VIA_ESTE))
+    assert servicio.ticks_conflacionados == 2
+    assert servicio.lecturas_conflacionadas == 2 * len(SENSORES_REQUERIDOS) * 2
+
+
+@pytest.mark.parametrize("formato", [FORMATO_JSON, FORMATO_BINARIO])
+def test_trama_conserva_indices_de_interseccion_y_via(formato: str) -> None:
+    ciudad_mapa = crear_servicio().ciudad_mapa
+    (trama,) = construir_tramas(
+        [ciudad_mapa.vias[VIA_ESTE]], {VIA_ESTE: describir_via(1, 2, 30.0)}, list(SENSORES_REQUERIDOS), 5, 10
+    )
+    _, recibida = decodificar_mensaje(codificar_mensaje(trama, formato), TIPO_TRAMA_SENSORES)
+    assert isinstance(recibida, TramaSensores)
+    assert recibida.indice_interseccion == ciudad_mapa.intersecciones[INTERSECCION].indice
+    assert {evento.indice_via for evento in recibida.eventos} == {ciudad_mapa.vias[VIA_ESTE].indice}
+    assert {evento.indice_interseccion for evento in recibida.eventos} == {recibida.indice_interseccion}
+
+
+def test_eventos_sin_indices_se_resuelven_por_nombre() -> None:
+    eventos = lecturas_tick(3, VIA_ESTE)
+    for evento in eventos:
+        evento.indice_interseccion = -1
+        evento.indice_via = -1
+    assert comando_de_referencia(eventos) == comando_de_referencia(lecturas_tick(3, VIA_ESTE))
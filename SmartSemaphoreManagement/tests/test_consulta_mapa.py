@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+import zmq
+
+from common.modelos.artefacto_mapa import IdentidadMapa
+from common.utilidades.consulta_mapa import atender_consultas_mapa, verificar_mapa_con_simulacion
+
+ENDPOINT = "inproc://consulta_mapa"
+IDENTIDAD_PC0 = IdentidadMapa(hash_contenido="a" * 64, huella_config="c" * 64)
+
+
+def verificar_contra_pc0(identidad_local: IdentidadMapa) -> None:
+    contexto = zmq.Context()
+    servidor = contexto.socket(zmq.REP)
+    servidor.bind(ENDPOINT)
+    detener = threading.Event()
+
+    def atender() -> None:
+        while not detener.is_set():
+            if servidor.poll(10):
+                atender_consultas_mapa(servidor, IDENTIDAD_PC0)
+
+    hilo = threading.Thread(target=atender)
+    hilo.start()
+    try:
+        verificar_mapa_con_simulacion(contexto, ENDPOINT, identidad_local, "PRUEBA", espera_milisegundos=500)
+    finally:
+        detener.set()
+        hilo.join()
+        servidor.close()
+        contexto.term()
+
+
+@pytest.mark.parametrize(
+    "identidad_local",
+    [
+        IdentidadMapa(hash_contenido="a" * 64, huella_config="c" * 64),
+        IdentidadMapa(hash_contenido="", huella_config="c" * 64),
+    ],
+    ids=["mismo_artefacto", "misma_configuracion"],
+)
+def test_mapa_coincidente_arranca(identidad_local: IdentidadMapa) -> None:
+    verificar_contra_pc0(identidad_local)
+
+
+@pytest.mark.parametrize(
+    "identidad_local",
+    [
+        IdentidadMapa(hash_contenido="b" * 64, huella_config="c" * 64),
+        IdentidadMapa(hash_contenido="", huella_config="d" * 64),
+    ],
+    ids=["otro_artefacto", "otra_configuracion"],
+)
+def test_mapa_distinto_rechaza_el_arranque(identidad_local: IdentidadMapa) -> None:
+    with pytest.raises(SystemExit):
+        verificar_contra_pc0(identidad_local)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from common.modelos.simulacion import crear_motor_simulacion
+from common.modelos.trafico import CiudadMapa
+from common.utilidades.configuracion import cargar_configuracion
+from common.utilidades.planificador_ticks import POLITICA_RECUPERAR, POLITICA_SALTAR, PlanificadorTicks
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+class RelojFalso:
+    def __init__(self) -> None:
+        self.ahora = 100.0
+        self.esperas: list[float] = []
+
+    def __call__(self) -> float:
+        return self.ahora
+
+    def dormir(self, segundos: float) -> None:
+        self.esperas.append(segundos)
+        self.ahora += segundos
+
+
+def crear_planificador(politica: str, max_ticks_recuperacion: int = 10) -> tuple[PlanificadorTicks, RelojFalso]:
+    reloj = RelojFalso()
+    planificador = PlanificadorTicks(
+        intervalo_segundos=1.0,
+        politica=politica,
+        max_ticks_recuperacion=max_ticks_recuperacion,
+        reloj=reloj,
+        dormir=reloj.dormir,
+    )
+    return planificador, reloj
+
+
+@pytest.mark.parametrize("politica", [POLITICA_RECUPERAR, POLITICA_SALTAR])
+def test_tick_a_tiempo_duerme_hasta_el_vencimiento(politica: str) -> None:
+    planificador, reloj = crear_planificador(politica)
+    assert planificador.esperar_siguiente_tick() == 0
+    reloj.ahora += 0.25
+    assert planificador.esperar_siguiente_tick() == 0
+    assert reloj.esperas == [pytest.approx(0.75)]
+    assert reloj.ahora == pytest.approx(101.0)
+
+
+def test_saltar_devuelve_los_vencimientos_descartados() -> None:
+    planificador, reloj = crear_planificador(POLITICA_SALTAR)
+    planificador.esperar_siguiente_tick()
+    reloj.ahora += 4.5
+    assert planificador.esperar_siguiente_tick() == 3
+    assert planificador.ticks_saltados == 3
+    assert planificador.esperar_siguiente_tick() == 0
+    assert reloj.ahora == pytest.approx(105.0)
+
+
+def test_recuperar_solo_descarta_el_exceso() -> None:
+    planificador, reloj = crear_planificador(POLITICA_RECUPERAR, max_ticks_recuperacion=2)
+    planificador.esperar_siguiente_tick()
+    reloj.ahora += 5.5
+    assert planificador.esperar_siguiente_tick() == 2
+    assert planificador.esperar_siguiente_tick() == 0
+    assert planificador.esperar_siguiente_tick() == 0
+    assert reloj.esperas == []
+    assert planificador.esperar_siguiente_tick() == 0
+    assert reloj.esperas == [pytest.approx(0.5)]
+    assert planificador.ticks_saltados == 2
+
+
+@pytest.mark.parametrize("politica", [POLITICA_RECUPERAR, POLITICA_SALTAR])
+def test_hora_simulada_sigue_al_reloj_real(politica: str) -> None:
+    config = cargar_configuracion(RAIZ / "config/system_config.json")
+    config["ciudad"]["tamano_cuadricula"] = {"filas": 2, "columnas": 2}
+    config["simulacion"]["minutos_simulados_por_tick"] = 1
+    motor = crear_motor_simulacion(CiudadMapa.desde_config(config["ciudad"]), config["simulacion"])
+    planificador, reloj = crear_planificador(politica, max_ticks_recuperacion=1)
+    inicio = reloj.ahora
+    for atraso in (0.0, 0.2, 6.3, 0.1, 0.0, 3.7, 0.0, 0.0):
+        motor.omitir_ticks(planificador.esperar_siguiente_tick())
+        motor.avanzar_tick()
+        reloj.ahora += atraso
+    motor.omitir_ticks(planificador.esperar_siguiente_tick())
+    motor.avanzar_tick()
+    transcurridos = round(reloj.ahora - inicio)
+    assert motor.ciudad_mapa.tick_actual + motor.ticks_omitidos == transcurridos + 1
+    hora, minuto = map(int, motor.obtener_hora_simulada_actual().split(":"))
+    inicio_hora, inicio_minuto = map(int, motor.hora_inicio_simulada.split(":"))
+    assert (hora - inicio_hora) * 60 + minuto - inicio_minuto == transcurridos + 1
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from common.mensajes.comandos import ComandoSemaforo
+from common.modelos.simulacion import MotorSimulacion, crear_motor_simulacion
+from common.modelos.trafico import CiudadMapa
+from common.utilidades.configuracion import cargar_configuracion
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+def crear_motor() -> MotorSimulacion:
+    config = cargar_configuracion(RAIZ / "config/system_config.json")
+    config["ciudad"]["tamano_cuadricula"] = {"filas": 4, "columnas": 4}
+    config["simulacion"]["motor"] = "particionado"
+    config["simulacion"]["particiones"] = {"filas": 2, "columnas": 2}
+    config["simulacion"]["probabilidad_generacion_por_via"] = 0.5
+    return crear_motor_simulacion(CiudadMapa.desde_config(config["ciudad"]), config["simulacion"])
+
+
+def test_vista_del_coordinador_coincide_con_las_regiones() -> None:
+    motor = crear_motor()
+    try:
+        for tick in range(60):
+            if tick % 9 == 0:
+                motor.aplicar_comando_semaforo(
+                    ComandoSemaforo.crear(
+                        interseccion="INT-B2",
+                        fase_ganadora="VERTICAL",
+                        tiempo_verde=4.0,
+                        tiempo_opuesto=2.0,
+                        razon="prueba",
+                        tick_origen=tick,
+                    )
+                )
+            motor.avanzar_tick()
+            if tick < 20 or tick % 3 == 0:
+                snapshot = motor.generar_snapshot_operativo()
+                ids = [vehiculo["vehiculo_id"] for vehiculo in snapshot.vehiculos]
+                assert len(ids) == len(set(ids)) == motor.contar_vehiculos()
+        snapshot = motor.generar_snapshot_operativo()
+        _, *regiones = motor.exportar_estado()
+        fases_regiones = {
+            interseccion_id: list(fases) for region in regiones for interseccion_id, *fases in region.intersecciones
+        }
+        assert {
+            interseccion["interseccion_id"]: [
+                interseccion["fase_activa"],
+                interseccion["fase_alterna"],
+                interseccion["duracion_fase_activa"],
+                interseccion["duracion_fase_alterna"],
+                interseccion["ticks_restantes_fase"],
+            ]
+            for interseccion in snapshot.intersecciones
+        } == fases_regiones
+        assert sum(len(region.ids_vehiculo) for region in regiones) == len(snapshot.vehiculos)
+        assert motor.generar_snapshot_operativo().vias == snapshot.vias
+    finally:
+        motor.cerrar()